@@ -0,0 +1,247 @@
+from __future__ import annotations
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.config.db_config import fetch_df
+from .connectivity import batched_reach
+from .route_graph import RouteGraph, gather, get_route_graph
+
+PAIR_STATUSES = ("direct", "one_stop", "multi_stop", "stranded")
+
+
+class AirlineRoutes:
+    """
+    Route positions of each airline, grouped once per graph snapshot.
+
+    `positions[indptr[i]:indptr[i + 1]]` are the `edge_*` positions flown by
+    `airline_ids[i]`, so a grounding mask is a scatter of a few slices
+    instead of a comparison over every route.
+    """
+
+    def __init__(self, graph: RouteGraph):
+        order = np.argsort(graph.edge_airline_ids, kind="stable")
+        airlines = graph.edge_airline_ids[order]
+        self.airline_ids, starts = np.unique(airlines, return_index=True)
+        self.indptr = np.append(starts, airlines.shape[0]).astype(np.int64)
+        self.positions = order.astype(np.int64)
+        self.version = graph.version
+
+    def routes_of(self, airline_id: int) -> np.ndarray:
+        i = int(np.searchsorted(self.airline_ids, airline_id))
+        if i >= self.airline_ids.shape[0] or self.airline_ids[i] != airline_id:
+            return np.empty(0, dtype=np.int64)
+        return self.positions[self.indptr[i]:self.indptr[i + 1]]
+
+    def mask(self, airline_ids: Iterable[int], num_routes: int) -> np.ndarray:
+        grounded = np.zeros(num_routes, dtype=bool)
+        for airline_id in airline_ids:
+            grounded[self.routes_of(int(airline_id))] = True
+        return grounded
+
+
+_airline_routes: Optional[AirlineRoutes] = None
+_lock = threading.Lock()
+
+
+def get_airline_routes(graph: RouteGraph) -> AirlineRoutes:
+    global _airline_routes
+    with _lock:
+        if _airline_routes is None or _airline_routes.version != graph.version:
+            _airline_routes = AirlineRoutes(graph)
+        return _airline_routes
+
+
+def _online_one_stop(
+    graph: RouteGraph, grounded: np.ndarray, origins: np.ndarray, destinations: np.ndarray
+) -> Dict[Tuple[int, int], List[int]]:
+    """
+    Carriers still able to fly origin -> M -> destination on their own
+    routes (both legs, same airline), for the given pairs.
+    """
+    n = max(graph.num_nodes, 1)
+    wanted = np.unique(origins * n + destinations)
+    positions = np.arange(graph.num_routes, dtype=np.int64)
+    keys, carriers = [], []
+    for origin in np.unique(origins):
+        first = positions[graph.route_slice(int(origin))]
+        first = first[~grounded[first]]
+        second, owner = gather(graph.edge_indptr, positions, graph.edge_dst[first].astype(np.int64))
+        airline = graph.edge_airline_ids[first[owner]]
+        ok = ~grounded[second] & (graph.edge_airline_ids[second] == airline) & (airline >= 0)
+        key = int(origin) * n + graph.edge_dst[second[ok]].astype(np.int64)
+        hit = np.isin(key, wanted)
+        keys.append(key[hit])
+        carriers.append(airline[ok][hit])
+    if not keys:
+        return {}
+    combined = np.unique(np.column_stack([np.concatenate(keys), np.concatenate(carriers)]), axis=0)
+    found: Dict[Tuple[int, int], List[int]] = {}
+    for key, airline in combined.tolist():
+        found.setdefault(divmod(key, n), []).append(airline)
+    return found
+
+
+def ground_carriers(
+    airline_ids: Iterable[int], graph: Optional[RouteGraph] = None
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Remove every route of the given airlines and classify each airport pair they flew.
+
+    A pair is "direct" when another carrier still flies it, "one_stop" or
+    "multi_stop" when the remaining network connects it with one or more
+    connections, and "stranded" when it is no longer reachable at all (one
+    batched BFS from all affected origins over the surviving links).
+
+    Args:
+        airline_ids (Iterable[int]): Carriers to ground.
+        graph (Optional[RouteGraph]): Snapshot to use (defaults to the shared graph).
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, Any]]: One row per affected pair (node
+        indices origin / destination, grounded_routes, grounded_passengers,
+        status, direct_carriers, one_stop_carriers) and summary counts.
+    """
+    graph = graph or get_route_graph()
+    airline_ids = sorted({int(a) for a in airline_ids})
+    grounded = get_airline_routes(graph).mask(airline_ids, graph.num_routes)
+    starts = graph.pair_edge_indptr[:-1]
+    pair_grounded = np.add.reduceat(grounded.astype(np.int64), starts) if graph.num_routes else np.zeros(0, np.int64)
+    pair_alive = np.logical_or.reduceat(~grounded, starts) if graph.num_routes else np.zeros(0, bool)
+    affected = np.flatnonzero(pair_grounded > 0)
+
+    origin = graph.pair_src[affected].astype(np.int64)
+    destination = graph.indices[affected].astype(np.int64)
+    lost = ~pair_alive[affected]
+    passengers = np.add.reduceat(np.where(grounded, graph.edge_passengers, 0.0), starts)[affected] \
+        if affected.size else np.zeros(0)
+
+    status = np.full(affected.size, "direct", dtype=object)
+    if lost.any():
+        # One stop on any remaining carriers: some M with both legs still flown
+        lo, ld = origin[lost], destination[lost]
+        one_stop = np.zeros(lo.size, dtype=bool)
+        for o in np.unique(lo):
+            rows = np.flatnonzero(lo == o)
+            row = np.arange(graph.indptr[o], graph.indptr[o + 1])
+            mids = graph.indices[row][pair_alive[row]].astype(np.int64)
+            pos, _ = gather(graph.indptr, np.arange(graph.num_edges), mids)
+            reach2 = np.zeros(graph.num_nodes, dtype=bool)
+            reach2[graph.indices[pos[pair_alive[pos]]]] = True
+            one_stop[rows] = reach2[ld[rows]]
+        # Anything further: pairs inside the surviving core (mutually reachable
+        # from the best-connected airport) are connected; one batched BFS from
+        # the origins of whatever is left settles the rest
+        connected = one_stop.copy()
+        degree = graph.out_degree() + graph.in_degree()
+        pivot = np.array([int(np.argmax(degree))], dtype=np.int64)
+        edges = np.arange(graph.num_edges)
+        core = (batched_reach(graph.indptr, graph.indices, edges, pair_alive, pivot, graph.num_nodes)
+                & batched_reach(graph.rev_indptr, graph.rev_indices, graph.rev_pairs, pair_alive, pivot, graph.num_nodes))[0]
+        connected |= core[lo] & core[ld]
+        open_rows = np.flatnonzero(~connected)
+        if open_rows.size:
+            sources, inverse = np.unique(lo[open_rows], return_inverse=True)
+            reach = batched_reach(graph.indptr, graph.indices, edges, pair_alive, sources, graph.num_nodes)
+            connected[open_rows] = reach[inverse, ld[open_rows]]
+        status[np.flatnonzero(lost)] = np.where(one_stop, "one_stop", np.where(connected, "multi_stop", "stranded"))
+
+    # Carriers that can absorb each pair: still flying it, or flying both legs of a connection
+    direct_carriers = []
+    for p, still in zip(affected, ~lost):
+        if not still:
+            direct_carriers.append([])
+            continue
+        routes = np.arange(graph.pair_edge_indptr[p], graph.pair_edge_indptr[p + 1])
+        carriers = graph.edge_airline_ids[routes[~grounded[routes]]]
+        direct_carriers.append(sorted({int(a) for a in carriers if a >= 0}))
+    online = _online_one_stop(graph, grounded, origin[lost], destination[lost]) if lost.any() else {}
+    one_stop_carriers = [
+        online.get((int(o), int(d)), []) if is_lost else []
+        for o, d, is_lost in zip(origin, destination, lost)
+    ]
+
+    pairs = pd.DataFrame({
+        "origin": origin,
+        "destination": destination,
+        "grounded_routes": pair_grounded[affected],
+        "grounded_passengers": passengers,
+        "status": status,
+        "direct_carriers": direct_carriers,
+        "one_stop_carriers": one_stop_carriers,
+    }).sort_values(["grounded_passengers", "grounded_routes"], ascending=False, kind="stable")
+
+    summary = {
+        "airline_ids": airline_ids,
+        "grounded_routes": int(grounded.sum()),
+        "affected_pairs": int(affected.size),
+        **{f"{s}_pairs": int((status == s).sum()) for s in PAIR_STATUSES},
+        "grounded_passengers": float(passengers.sum()),
+        "stranded_passengers": float(passengers[status == "stranded"].sum()),
+    }
+    return pairs.reset_index(drop=True), summary
+
+
+def absorbing_carriers(pairs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rank remaining carriers by how many affected pairs they can take over,
+    directly or with a connection on their own network, and the grounded
+    passengers on those pairs.
+    """
+    stats: Dict[int, List[float]] = {}
+    for direct, one_stop, passengers in zip(pairs["direct_carriers"], pairs["one_stop_carriers"], pairs["grounded_passengers"]):
+        for airline in direct:
+            stats.setdefault(airline, [0, 0, 0.0])[0] += 1
+        for airline in one_stop:
+            stats.setdefault(airline, [0, 0, 0.0])[1] += 1
+        for airline in set(direct) | set(one_stop):
+            stats[airline][2] += float(passengers)
+    ranked = pd.DataFrame(
+        [(airline, d, o, d + o, p) for airline, (d, o, p) in stats.items()],
+        columns=["airline_id", "direct_pairs", "one_stop_pairs", "pairs_absorbable", "passengers_absorbable"],
+    )
+    return ranked.sort_values(["pairs_absorbable", "passengers_absorbable"], ascending=False, kind="stable").reset_index(drop=True)
+
+
+def _airline_names(airline_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    if not airline_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(airline_ids))
+    df = fetch_df(f"SELECT airline_id, name, iata FROM airlines WHERE airline_id IN ({placeholders})",
+                  params=tuple(airline_ids))
+    return {int(r["airline_id"]): {"name": r["name"], "iata": r["iata"]} for r in df.to_dict(orient="records")}
+
+
+def simulate_carrier_grounding(airline_ids: Iterable[int], limit_pairs: Optional[int] = 500) -> Dict[str, Any]:
+    """
+    API payload for grounding carriers: summary, ranked absorbing carriers
+    and the affected pairs (busiest first, airport IDs and IATA codes).
+    """
+    graph = get_route_graph()
+    pairs, summary = ground_carriers(airline_ids, graph)
+    carriers = absorbing_carriers(pairs)
+    if limit_pairs is not None:
+        pairs = pairs.head(int(limit_pairs))
+    names = _airline_names(sorted(set(carriers["airline_id"].astype(int)) | set(summary["airline_ids"])))
+    carriers["airline"] = [names.get(int(a), {}).get("name") for a in carriers["airline_id"]]
+
+    origin = pairs["origin"].to_numpy(dtype=np.int64)
+    destination = pairs["destination"].to_numpy(dtype=np.int64)
+    out = pd.DataFrame({
+        "src_airport_id": graph.airport_ids[origin],
+        "dst_airport_id": graph.airport_ids[destination],
+        "src_airport": graph.labels[origin],
+        "dst_airport": graph.labels[destination],
+    })
+    for col in ("grounded_routes", "grounded_passengers", "status", "direct_carriers", "one_stop_carriers"):
+        out[col] = pairs[col].to_numpy()
+    summary["grounded_airlines"] = [
+        {"airline_id": a, **names.get(a, {"name": None, "iata": None})} for a in summary.pop("airline_ids")
+    ]
+    return {
+        "summary": summary,
+        "absorbing_carriers": carriers.to_dict(orient="records"),
+        "pairs": out.to_dict(orient="records"),
+    }
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import argparse
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.config.settings import (
+    BETWEENNESS_DELTA,
+    BETWEENNESS_EPSILON,
+    BETWEENNESS_EXACT_MAX_NODES,
+    HUB_CRITICALITY_PATH,
+)
+from .parallel import default_workers, get_graph_executor, worker_graph
+from .route_graph import RouteGraph, gather, get_route_graph
+
+
+def _source_dependencies(graph: RouteGraph, source: int, out: np.ndarray) -> None:
+    """
+    Add one source's Brandes dependencies to `out`.
+
+    Level-synchronous BFS: shortest-path counts are pushed one level at a
+    time with bincount, then dependencies flow back over the recorded
+    level edges in reverse order.
+    """
+    n = graph.num_nodes
+    dist = np.full(n, -1, dtype=np.int32)
+    sigma = np.zeros(n, dtype=np.float64)
+    dist[source] = 0
+    sigma[source] = 1.0
+    frontier = np.array([source], dtype=np.int64)
+    level_edges = []
+    depth = 0
+    while frontier.size:
+        nbrs, owner = gather(graph.indptr, graph.indices, frontier)
+        parents = frontier[owner]
+        fresh = dist[nbrs] == -1
+        dist[nbrs[fresh]] = depth + 1
+        on_path = dist[nbrs] == depth + 1
+        u, w = parents[on_path], nbrs[on_path].astype(np.int64)
+        sigma += np.bincount(w, weights=sigma[u], minlength=n)
+        level_edges.append((u, w))
+        frontier = np.unique(w)
+        depth += 1
+
+    delta = np.zeros(n, dtype=np.float64)
+    for u, w in reversed(level_edges):
+        delta += np.bincount(u, weights=sigma[u] / sigma[w] * (1.0 + delta[w]), minlength=n)
+    delta[source] = 0.0
+    out += delta
+
+
+def _dependencies_for(graph: RouteGraph, sources: np.ndarray) -> np.ndarray:
+    total = np.zeros(graph.num_nodes, dtype=np.float64)
+    for s in sources:
+        _source_dependencies(graph, int(s), total)
+    return total
+
+
+def _dependencies_in_worker(sources: np.ndarray) -> np.ndarray:
+    return _dependencies_for(worker_graph(), sources)
+
+
+def sample_size(n: int, epsilon: float, delta: float) -> int:
+    """
+    Sources needed so every normalized score is within `epsilon` with probability 1 - `delta`.
+
+    Hoeffding bound on the per-source dependency (scaled into [0, 1]) plus a
+    union bound over all n airports.
+    """
+    return int(math.ceil(math.log(2 * max(n, 1) / delta) / (2 * epsilon ** 2)))
+
+
+def betweenness(
+    graph: RouteGraph,
+    epsilon: float = BETWEENNESS_EPSILON,
+    delta: float = BETWEENNESS_DELTA,
+    exact_max_nodes: int = BETWEENNESS_EXACT_MAX_NODES,
+    workers: Optional[int] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Normalized betweenness centrality (hop-count shortest paths, Brandes).
+
+    Runs from every airport with routes when there are at most
+    `exact_max_nodes` of them or when the error bound would need that many
+    sources anyway; otherwise from `sample_size` random sources, scaled up.
+    Sources are split across the shared graph process pool.
+
+    Returns:
+        Dict[str, Any]: scores (per node, divided by (n-1)(n-2)), exact,
+        sources, epsilon, delta and seconds.
+    """
+    started = time.perf_counter()
+    active = np.flatnonzero((graph.out_degree() + graph.in_degree()) > 0)
+    n = active.size
+    needed = sample_size(n, epsilon, delta)
+    exact = n <= exact_max_nodes or needed >= n
+    if exact:
+        sources = active
+    else:
+        sources = np.sort(np.random.default_rng(seed).choice(active, size=needed, replace=False))
+
+    workers = workers or default_workers()
+    if workers > 1 and sources.size >= 4 * workers:
+        executor = get_graph_executor(graph)
+        chunks = np.array_split(sources, 4 * workers)
+        totals = sum(executor.map(_dependencies_in_worker, chunks))
+    else:
+        totals = _dependencies_for(graph, sources)
+
+    scale = 1.0 if exact else n / sources.size
+    norm = (n - 1) * (n - 2) if n > 2 else 1
+    return {
+        "scores": totals * scale / norm,
+        "exact": bool(exact),
+        "sources": int(sources.size),
+        "epsilon": 0.0 if exact else epsilon,
+        "delta": 0.0 if exact else delta,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _save(result: Dict[str, Any], version: str, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        np.savez(f, version=np.array(version), **{k: np.asarray(v) for k, v in result.items()})
+
+
+def _load(path: Path, version: str) -> Optional[Dict[str, Any]]:
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["version"]) != version:
+                return None
+            return {k: (data[k] if k == "scores" else data[k].item()) for k in data.files if k != "version"}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+_cache: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def get_betweenness(graph: Optional[RouteGraph] = None) -> Dict[str, Any]:
+    """
+    Betweenness for the current network version.
+
+    Kept in memory and in HUB_CRITICALITY_PATH; recomputed only when the
+    route graph version changes.
+    """
+    graph = graph or get_route_graph()
+    with _lock:
+        result = _cache.get(graph.version)
+        if result is None:
+            result = _load(HUB_CRITICALITY_PATH, graph.version) if HUB_CRITICALITY_PATH.exists() else None
+            if result is None:
+                result = betweenness(graph)
+                _save(result, graph.version, HUB_CRITICALITY_PATH)
+            _cache.clear()
+            _cache[graph.version] = result
+        return result
+
+
+def hub_criticality(limit: int = 20) -> pd.DataFrame:
+    """
+    Airports ranked by betweenness, next to their degree.
+
+    Returns:
+        pd.DataFrame: airport_id, iata, degree (distinct connections in + out),
+        betweenness, betweenness_rank, degree_rank.
+    """
+    graph = get_route_graph()
+    result = get_betweenness(graph)
+    scores = result["scores"]
+    degree = graph.out_degree() + graph.in_degree()
+    order = np.argsort(-scores, kind="stable")
+    degree_rank = np.empty(graph.num_nodes, dtype=np.int64)
+    degree_rank[np.argsort(-degree, kind="stable")] = np.arange(1, graph.num_nodes + 1)
+    top = order[:limit]
+    return pd.DataFrame({
+        "airport_id": graph.airport_ids[top],
+        "iata": graph.labels[top],
+        "degree": degree[top],
+        "betweenness": scores[top],
+        "betweenness_rank": np.arange(1, top.size + 1),
+        "degree_rank": degree_rank[top],
+    })
+
+
+def criticality_for(airport_ids) -> pd.DataFrame:
+    """betweenness and its rank for specific airports (e.g. to join onto busiest_hubs)."""
+    graph = get_route_graph()
+    scores = get_betweenness(graph)["scores"]
+    rank = np.empty(graph.num_nodes, dtype=np.int64)
+    rank[np.argsort(-scores, kind="stable")] = np.arange(1, graph.num_nodes + 1)
+    airport_ids = pd.to_numeric(pd.Series(list(airport_ids)), errors="coerce").fillna(-1).astype(np.int64).to_numpy()
+    nodes = graph.nodes(airport_ids)
+    found = nodes >= 0
+    return pd.DataFrame({
+        "airport_id": airport_ids,
+        "betweenness": np.where(found, scores[np.maximum(nodes, 0)], np.nan),
+        "betweenness_rank": np.where(found, rank[np.maximum(nodes, 0)], -1),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute hub betweenness for the current route graph")
+    parser.add_argument("--epsilon", type=float, default=BETWEENNESS_EPSILON)
+    parser.add_argument("--delta", type=float, default=BETWEENNESS_DELTA)
+    parser.add_argument("--exact", action="store_true", help="Use every airport as a source")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    route_graph = get_route_graph()
+    stats = betweenness(
+        route_graph, epsilon=args.epsilon, delta=args.delta,
+        exact_max_nodes=route_graph.num_nodes if args.exact else BETWEENNESS_EXACT_MAX_NODES,
+        workers=args.workers,
+    )
+    _save(stats, route_graph.version, HUB_CRITICALITY_PATH)
+    kind = "exact" if stats["exact"] else f"sampled (epsilon={stats['epsilon']}, delta={stats['delta']})"
+    print(f"{kind} betweenness from {stats['sources']} sources in {stats['seconds']:.1f}s -> {HUB_CRITICALITY_PATH}")
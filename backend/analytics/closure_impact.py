@@ -0,0 +1,302 @@
+from __future__ import annotations
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.config.data_version import bump_data_version
+from backend.config.db_config import execute_sql, executemany_sql, fetch_df, iter_df_chunks
+from backend.config.settings import CLOSURE_TOP_PAIRS
+from backend.pagination import Key, keyset_sql
+from .route_graph import RouteGraph, get_route_graph
+
+IMPACT_COLUMNS = ["airport_id", "impacted_routes", "est_passengers", "top_pairs", "routes_hash"]
+ROUTE_COLUMNS = ["airport_id", "route_id", "src_airport", "dst_airport", "est_passengers"]
+# Order of the routes of a closure (busiest first), also the keyset for paging through them
+ROUTE_KEYS = (Key("est_passengers", descending=True), Key("route_id"))
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _route_hashes(graph: RouteGraph) -> np.ndarray:
+    """64-bit fingerprint of each route's (route_id, endpoints, passengers), splitmix64-style."""
+    h = np.full(graph.num_routes, 0x9E3779B97F4A7C15, dtype=np.uint64)
+    columns = (
+        graph.edge_route_ids,
+        graph.airport_ids[graph.edge_src],
+        graph.airport_ids[graph.edge_dst],
+        np.round(graph.edge_passengers).astype(np.int64),
+    )
+    for col in columns:
+        h ^= col.astype(np.uint64)
+        h *= _MIX_1
+        h ^= h >> np.uint64(31)
+        h *= _MIX_2
+        h ^= h >> np.uint64(29)
+    return h
+
+
+def airport_route_hashes(graph: RouteGraph) -> np.ndarray:
+    """
+    Per-node fingerprint of every route touching the airport.
+
+    Order-independent (wrapping sum of route fingerprints), so it changes
+    exactly when a route to or from the airport is added, removed, moved or
+    its passenger count changes.
+    """
+    h = _route_hashes(graph)
+    acc = np.zeros(graph.num_nodes, dtype=np.uint64)
+    np.add.at(acc, graph.edge_src, h)
+    inbound = graph.edge_src != graph.edge_dst
+    np.add.at(acc, graph.edge_dst[inbound], h[inbound])
+    return acc
+
+
+def _format_hash(values: np.ndarray) -> np.ndarray:
+    return np.array([f"{int(v):016x}" for v in values], dtype=object)
+
+
+def _top_pairs(graph: RouteGraph, pair_passengers: np.ndarray, node: int, limit: int) -> str:
+    """
+    JSON list of the `limit` busiest connections A -> node -> B, straight
+    off the CSR rows. Unlike pathfinding.disrupted_pairs, pairs that also
+    have a direct flight are kept: this ranks the traffic through the hub.
+    """
+    preds = graph.predecessors(node)
+    succs = graph.successors(node)
+    leg_in = pair_passengers[graph.rev_pairs[graph.rev_indptr[node]:graph.rev_indptr[node + 1]]]
+    leg_out = pair_passengers[graph.indptr[node]:graph.indptr[node + 1]]
+    keep = (preds[:, None] != succs[None, :]) & (preds[:, None] != node) & (succs[None, :] != node)
+    connecting = np.where(keep, np.minimum(leg_in[:, None], leg_out[None, :]), -1.0).ravel()
+    count = min(limit, int(keep.sum()))
+    if count == 0:
+        return "[]"
+    best = np.argpartition(-connecting, count - 1)[:count]
+    best = best[np.argsort(-connecting[best], kind="stable")]
+    origin, destination = np.divmod(best, succs.size)
+    return json.dumps([
+        {
+            "origin": graph.labels[preds[o]],
+            "destination": graph.labels[succs[d]],
+            "connecting_passengers": float(connecting[b]),
+        }
+        for o, d, b in zip(origin, destination, best)
+    ])
+
+
+def build_closure_impact(
+    graph: RouteGraph,
+    nodes: Optional[np.ndarray] = None,
+    top_pairs: int = CLOSURE_TOP_PAIRS,
+) -> pd.DataFrame:
+    """
+    Graph-derived part of the closure impact of every airport (or `nodes`).
+
+    The route rows and their totals come from the same joins as the live
+    simulate_airport_closure (see save_closure_impact); the graph adds what
+    SQL cannot cheaply give: the busiest connections through the airport and
+    the fingerprint of its routes.
+
+    Args:
+        graph (RouteGraph): Network snapshot.
+        nodes (Optional[np.ndarray]): Node indices to build (default: every airport with routes).
+        top_pairs (int): Connections through the airport kept per airport, busiest first.
+
+    Returns:
+        pd.DataFrame: airport_id, top_pairs and routes_hash, one row per airport.
+    """
+    if nodes is None:
+        nodes = np.flatnonzero((graph.out_degree() + graph.in_degree()) > 0)
+    nodes = np.asarray(nodes, dtype=np.int64)
+    pair_passengers = graph.pair_passengers()
+    return pd.DataFrame({
+        "airport_id": graph.airport_ids[nodes],
+        "top_pairs": [_top_pairs(graph, pair_passengers, int(x), top_pairs) for x in nodes],
+        "routes_hash": _format_hash(airport_route_hashes(graph)[nodes]),
+    })
+
+
+# One row per (airport, route touching it) with the joins of the live query, so a
+# stored closure lists the same routes and passengers as simulate_airport_closure
+# (including routes whose other endpoint is unknown, which the graph leaves out)
+_ROUTES_INSERT_SQL = """
+    INSERT INTO airport_closure_routes ({columns}, computed_at)
+    SELECT t.airport_id, r.route_id, sa.name, da.name, COALESCE(ps.passengers, 0), %s
+    FROM (
+        SELECT route_id, source_airport_id AS airport_id FROM routes WHERE source_airport_id IN ({placeholders})
+        UNION
+        SELECT route_id, dest_airport_id AS airport_id FROM routes WHERE dest_airport_id IN ({placeholders})
+    ) t
+    JOIN routes r ON r.route_id = t.route_id
+    LEFT JOIN airports sa ON r.source_airport_id = sa.airport_id
+    LEFT JOIN airports da ON r.dest_airport_id = da.airport_id
+    LEFT JOIN (
+        SELECT route_id, SUM(passengers) AS passengers
+        FROM passenger_stats
+        GROUP BY route_id
+    ) ps ON ps.route_id = r.route_id
+"""
+
+
+def _chunks(airport_ids, size: int = 1000):
+    airport_ids = [int(a) for a in airport_ids]
+    for start in range(0, len(airport_ids), size):
+        yield airport_ids[start:start + size]
+
+
+def _delete_airports(airport_ids) -> None:
+    for chunk in _chunks(airport_ids):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        for table in ("airport_closure_routes", "airport_closure_impact"):
+            execute_sql(f"DELETE FROM {table} WHERE airport_id IN ({placeholders})", chunk)
+
+
+def _rows(df: pd.DataFrame, columns) -> list:
+    return [
+        tuple(v.item() if isinstance(v, np.generic) else v for v in row)
+        for row in df[columns].itertuples(index=False)
+    ]
+
+
+def save_closure_impact(impact: pd.DataFrame) -> None:
+    """
+    Replace the stored rows of the airports in `impact` (ColumnStore: delete,
+    then insert), all stamped with one computed_at.
+
+    The route rows are one INSERT ... SELECT per chunk of airports; the
+    summary rows take their impacted_routes / est_passengers from what was
+    just stored and top_pairs / routes_hash from build_closure_impact.
+    """
+    computed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    _delete_airports(impact["airport_id"].tolist())
+    totals = []
+    for chunk in _chunks(impact["airport_id"].tolist()):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        execute_sql(
+            _ROUTES_INSERT_SQL.format(columns=", ".join(ROUTE_COLUMNS), placeholders=placeholders),
+            [computed_at, *chunk, *chunk],
+        )
+        totals.append(fetch_df(
+            f"""
+            SELECT airport_id, COUNT(*) AS impacted_routes, SUM(est_passengers) AS est_passengers
+            FROM airport_closure_routes
+            WHERE airport_id IN ({placeholders})
+            GROUP BY airport_id
+            """,
+            params=chunk,
+        ))
+    summary = impact.merge(pd.concat(totals, ignore_index=True), on="airport_id", how="left")
+    summary = summary.fillna({"impacted_routes": 0, "est_passengers": 0.0}).astype({"impacted_routes": int})
+    executemany_sql(
+        f"INSERT INTO airport_closure_impact ({', '.join(IMPACT_COLUMNS)}, computed_at) "
+        f"VALUES ({', '.join(['%s'] * (len(IMPACT_COLUMNS) + 1))})",
+        [row + (computed_at,) for row in _rows(summary, IMPACT_COLUMNS)],
+    )
+
+
+def refresh_closure_impact(full: bool = False) -> Dict[str, Any]:
+    """
+    Bring the materialized closure-impact tables up to date.
+
+    Each stored airport keeps a fingerprint of the routes touching it; only
+    airports whose fingerprint changed (or that are new) are recomputed,
+    and airports that lost all their routes are dropped.
+
+    Returns:
+        Dict[str, Any]: recomputed and removed airport counts and seconds.
+    """
+    started = time.perf_counter()
+    graph = get_route_graph()
+    active = np.flatnonzero((graph.out_degree() + graph.in_degree()) > 0)
+    current = dict(zip(graph.airport_ids[active].tolist(), _format_hash(airport_route_hashes(graph)[active])))
+
+    stored: Dict[int, str] = {}
+    if not full:
+        for chunk in iter_df_chunks("SELECT airport_id, routes_hash FROM airport_closure_impact"):
+            stored.update(zip(chunk["airport_id"].astype(int), chunk["routes_hash"]))
+
+    changed = [a for a, h in current.items() if stored.get(a) != h]
+    removed = [a for a in stored if a not in current]
+    if full:
+        execute_sql("DELETE FROM airport_closure_routes")
+        execute_sql("DELETE FROM airport_closure_impact")
+    if removed:
+        _delete_airports(removed)
+    if changed:
+        save_closure_impact(build_closure_impact(graph, nodes=graph.nodes(changed)))
+    if changed or removed:
+        bump_data_version()
+    return {
+        "recomputed": len(changed),
+        "removed": len(removed),
+        "unchanged": len(current) - len(changed),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def materialized_summary(airport_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Stored closure-impact summary of one airport: impacted_routes,
+    est_passengers, top_pairs and computed_at (UTC), or None when the
+    airport has not been materialized.
+    """
+    summary = fetch_df(
+        "SELECT impacted_routes, est_passengers, top_pairs, computed_at FROM airport_closure_impact WHERE airport_id = %s",
+        params=(airport_id,),
+    )
+    if summary.empty:
+        return None
+    row = summary.iloc[0]
+    return {
+        "impacted_routes": int(row["impacted_routes"]),
+        "est_passengers": float(row["est_passengers"]),
+        "top_pairs": json.loads(row["top_pairs"] or "[]"),
+        "computed_at": pd.Timestamp(row["computed_at"]).tz_localize("UTC"),
+    }
+
+
+_ROUTES_SQL = """
+    SELECT route_id, src_airport, dst_airport, est_passengers
+    FROM airport_closure_routes
+    WHERE airport_id = %s
+"""
+
+
+def materialized_routes_page(airport_id: int, cursor: Optional[str], page_size: int) -> pd.DataFrame:
+    """The page of stored closure routes after `cursor` (ROUTE_KEYS order), plus one look-ahead row."""
+    sql, params = keyset_sql(_ROUTES_SQL, ROUTE_KEYS, cursor, page_size, base_params=(airport_id,))
+    return fetch_df(sql, params=params)
+
+
+def iter_materialized_routes(airport_id: int, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Every stored closure route of one airport, busiest first, streamed in chunks."""
+    return iter_df_chunks(_ROUTES_SQL + " ORDER BY est_passengers DESC, route_id", params=(airport_id,), chunksize=chunksize)
+
+
+def materialized_closure(airport_id: int) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Stored closure impact of one airport.
+
+    Returns:
+        Optional[Tuple[pd.DataFrame, Dict[str, Any]]]: The affected routes
+        (route_id, src_airport, dst_airport, est_passengers, busiest first)
+        and the materialized_summary row, or None when the airport has not
+        been materialized.
+    """
+    summary = materialized_summary(airport_id)
+    if summary is None:
+        return None
+    routes = fetch_df(_ROUTES_SQL + " ORDER BY est_passengers DESC, route_id", params=(airport_id,))
+    return routes, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the materialized airport closure-impact tables")
+    parser.add_argument("--full", action="store_true", help="Recompute every airport")
+    args = parser.parse_args()
+    print(refresh_closure_impact(full=args.full))
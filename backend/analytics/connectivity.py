@@ -0,0 +1,310 @@
+from __future__ import annotations
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from .route_graph import RouteGraph, gather
+
+
+def strong_components(
+    graph: RouteGraph, blocked: Optional[np.ndarray] = None, nodes: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Strongly connected components.
+
+    Airline networks have one giant component, so it is peeled off first
+    with a forward/backward search from the best-connected airport (two
+    vectorized BFS passes); only the remaining airports go through the
+    iterative Tarjan loop.
+
+    Args:
+        graph (RouteGraph): Network to decompose.
+        blocked (Optional[np.ndarray]): Boolean node mask of closed airports.
+        nodes (Optional[np.ndarray]): Only decompose the subgraph induced by these nodes.
+
+    Returns:
+        np.ndarray: Component label per node, -1 for blocked or excluded nodes.
+    """
+    n = graph.num_nodes
+    active = np.ones(n, dtype=bool) if nodes is None else np.zeros(n, dtype=bool)
+    if nodes is not None:
+        active[np.asarray(nodes, dtype=np.int64)] = True
+    if blocked is not None:
+        active &= ~blocked
+
+    comp = np.full(n, -1, dtype=np.int64)
+    label = 0
+    if active.any():
+        degree = np.where(active, graph.out_degree() + graph.in_degree(), -1)
+        pivot = int(np.argmax(degree))
+        giant = graph.reachable(pivot, ~active) & graph.reachable(pivot, ~active, reverse=True)
+        comp[giant] = 0
+        label = 1
+        active &= ~giant
+    if active.any():
+        _tarjan(graph, active, comp, label)
+    return comp
+
+
+def _tarjan(graph: RouteGraph, active: np.ndarray, out: np.ndarray, first_label: int) -> None:
+    """Label the SCCs of the subgraph induced by `active` into `out`, starting at `first_label`."""
+    n = graph.num_nodes
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    act = active.tolist()
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack = []
+    counter = 0
+    label = first_label
+
+    for root in np.flatnonzero(active).tolist():
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, indptr[root])]
+        while work:
+            v, i = work[-1]
+            end = indptr[v + 1]
+            while i < end:
+                w = indices[i]
+                i += 1
+                if not act[w]:
+                    continue
+                if index[w] == -1:
+                    work[-1] = (v, i)
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, indptr[w]))
+                    break
+                if on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        out[w] = label
+                        if w == v:
+                            break
+                    label += 1
+
+
+def component_sizes(labels: np.ndarray) -> np.ndarray:
+    return np.bincount(labels[labels >= 0]) if (labels >= 0).any() else np.zeros(0, dtype=np.int64)
+
+
+def connected_pair_count(labels: np.ndarray) -> int:
+    """Ordered airport pairs that can reach each other (sum of s * (s - 1) over components)."""
+    sizes = component_sizes(labels).astype(np.int64)
+    return int((sizes * (sizes - 1)).sum())
+
+
+def batched_reach(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    pair_of: np.ndarray,
+    pair_alive: np.ndarray,
+    pivots: np.ndarray,
+    n: int,
+) -> np.ndarray:
+    """
+    One BFS per start node, all searches advancing together.
+
+    Frontier entries are flat (search * n + node) ids, so a level of every
+    search is a single gather over the CSR arrays; an edge is followed only
+    if its airport pair still has service.
+
+    Args:
+        indptr, indices (np.ndarray): Forward or reverse pair CSR.
+        pair_of (np.ndarray): Distinct pair behind each CSR entry.
+        pair_alive (np.ndarray): Pair mask, (searches, pairs) or one (pairs,) mask shared by all.
+        pivots (np.ndarray): Start node of each search.
+        n (int): Number of nodes.
+
+    Returns:
+        np.ndarray: (searches, n) boolean reach mask.
+    """
+    trials = pivots.shape[0]
+    num_pairs = pair_alive.shape[-1]
+    # A shared mask is looked up with stride 0
+    stride = num_pairs if pair_alive.ndim == 2 else 0
+    alive = pair_alive.ravel()
+    positions = np.arange(indices.shape[0], dtype=np.int64)
+    seen = np.zeros(trials * n, dtype=bool)
+    frontier = np.arange(trials, dtype=np.int64) * n + pivots
+    seen[frontier] = True
+    while frontier.size:
+        trial, node = np.divmod(frontier, n)
+        pos, owner = gather(indptr, positions, node)
+        trial = trial[owner]
+        ok = alive[trial * stride + pair_of[pos]]
+        # Dedupe through the mask: one O(trials * n) pass beats sorting the candidates
+        before = seen.copy()
+        seen[trial[ok] * n + indices[pos[ok]]] = True
+        frontier = np.flatnonzero(seen & ~before)
+    return seen.reshape(trials, n)
+
+
+def undirected_csr(graph: RouteGraph) -> Tuple[np.ndarray, np.ndarray]:
+    """indptr/indices of the undirected view (airports linked by a route either way)."""
+    n = graph.num_nodes
+    src = np.concatenate([graph.pair_src, graph.indices]).astype(np.int64)
+    dst = np.concatenate([graph.indices, graph.pair_src]).astype(np.int64)
+    keys = np.unique(src * max(n, 1) + dst)
+    src, dst = keys // max(n, 1), keys % max(n, 1)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst
+
+
+def articulation_points_and_bridges(graph: RouteGraph) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cut airports and cut links of the undirected network (iterative low-link DFS).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Boolean node mask of articulation points
+        and a (k, 2) array of bridge node pairs (smaller index first).
+    """
+    n = graph.num_nodes
+    indptr_arr, indices_arr = undirected_csr(graph)
+    indptr = indptr_arr.tolist()
+    indices = indices_arr.tolist()
+    disc = [-1] * n
+    low = [0] * n
+    is_cut = [False] * n
+    bridges = []
+    timer = 0
+
+    for root in range(n):
+        if disc[root] != -1 or indptr[root] == indptr[root + 1]:
+            continue
+        disc[root] = low[root] = timer
+        timer += 1
+        root_children = 0
+        # (node, parent, next neighbour offset)
+        work = [(root, -1, indptr[root])]
+        while work:
+            v, parent, i = work[-1]
+            if i < indptr[v + 1]:
+                work[-1] = (v, parent, i + 1)
+                w = indices[i]
+                if disc[w] == -1:
+                    disc[w] = low[w] = timer
+                    timer += 1
+                    if v == root:
+                        root_children += 1
+                    work.append((w, v, indptr[w]))
+                elif w != parent and disc[w] < low[v]:
+                    low[v] = disc[w]
+                continue
+            work.pop()
+            if parent >= 0:
+                if low[v] < low[parent]:
+                    low[parent] = low[v]
+                if low[v] > disc[parent]:
+                    bridges.append((min(parent, v), max(parent, v)))
+                if parent != root and low[v] >= disc[parent]:
+                    is_cut[parent] = True
+        if root_children > 1:
+            is_cut[root] = True
+
+    bridge_arr = np.asarray(bridges, dtype=np.int64).reshape(-1, 2)
+    return np.asarray(is_cut, dtype=bool), bridge_arr
+
+
+def disrupted_pair_counts(graph: RouteGraph) -> np.ndarray:
+    """Per airport X: ordered pairs (A, B), A != B, with A -> X and X -> B service."""
+    reciprocal = graph.pair_index(graph.indices, graph.pair_src) >= 0
+    both_ways = np.bincount(graph.pair_src[reciprocal], minlength=graph.num_nodes)
+    return graph.in_degree().astype(np.int64) * graph.out_degree() - both_ways
+
+
+def isolated_counts(graph: RouteGraph) -> np.ndarray:
+    """Per airport X: airports whose only connection (either direction) is X."""
+    indptr, indices = undirected_csr(graph)
+    degree = np.diff(indptr)
+    lone = np.flatnonzero(degree == 1)
+    return np.bincount(indices[indptr[lone]], minlength=graph.num_nodes)
+
+
+def _sole_two_hop(graph: RouteGraph, origin: int, restrict: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Intermediate airport M of each pair origin -> B whose only path of at most
+    two flights is origin -> M -> B; returned as one entry per such pair.
+    """
+    n = graph.num_nodes
+    s1 = graph.successors(origin).astype(np.int64)
+    s1 = s1[s1 != origin]
+    nbrs, owner = gather(graph.indptr, graph.indices, s1)
+    mid = s1[owner]
+    valid = (nbrs != origin) & (nbrs != mid)
+    nbrs, mid = nbrs[valid], mid[valid]
+    two_hop = np.bincount(nbrs, minlength=n)
+    direct = np.zeros(n, dtype=bool)
+    direct[s1] = True
+    sole = (two_hop[nbrs] == 1) & ~direct[nbrs]
+    if restrict is not None:
+        sole &= restrict[mid]
+    return mid[sole]
+
+
+def detour_pair_counts(graph: RouteGraph, nodes: Optional[Iterable[int]] = None) -> np.ndarray:
+    """
+    Per airport X: connections A -> X -> B with no direct flight and no other
+    one-stop itinerary, i.e. pairs that need extra flights (or lose service)
+    when X closes.
+
+    With `nodes`, only those airports' counts are computed (others are 0);
+    the work is then limited to the origins that fly into them.
+    """
+    n = graph.num_nodes
+    counts = np.zeros(n, dtype=np.int64)
+    if nodes is None:
+        for origin in np.flatnonzero(graph.out_degree() > 0):
+            counts += np.bincount(_sole_two_hop(graph, int(origin)), minlength=n)
+        return counts
+    wanted = np.zeros(n, dtype=bool)
+    wanted[np.asarray(list(nodes), dtype=np.int64)] = True
+    origins = np.unique(gather(graph.rev_indptr, graph.rev_indices, np.flatnonzero(wanted))[0])
+    for origin in origins:
+        counts += np.bincount(_sole_two_hop(graph, int(origin), restrict=wanted), minlength=n)
+    return counts
+
+
+def disconnected_pair_counts(
+    graph: RouteGraph, nodes: Iterable[int], base_labels: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Per airport X in `nodes`: ordered pairs of other airports that can reach
+    each other both ways today and no longer can with X closed.
+
+    Only X's own strongly connected component is re-decomposed.
+
+    Returns:
+        np.ndarray: Counts aligned with `nodes`.
+    """
+    nodes = np.asarray(list(nodes), dtype=np.int64)
+    labels = strong_components(graph) if base_labels is None else base_labels
+    sizes = component_sizes(labels).astype(np.int64)
+    out = np.zeros(nodes.size, dtype=np.int64)
+    for i, x in enumerate(nodes):
+        if labels[x] < 0 or sizes[labels[x]] < 3:
+            continue
+        members = np.flatnonzero(labels == labels[x])
+        blocked = np.zeros(graph.num_nodes, dtype=bool)
+        blocked[x] = True
+        s = int(sizes[labels[x]])
+        out[i] = (s - 1) * (s - 2) - connected_pair_count(strong_components(graph, blocked, members))
+    return out
@@ -0,0 +1,238 @@
+from __future__ import annotations
+import argparse
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.config.data_version import bump_data_version, current_data_version
+from backend.config.db_config import execute_sql, executemany_sql, fetch_df
+from backend.config.settings import CONNECTIVITY_EDGES_PATH, CONNECTIVITY_INCREMENTAL_MAX_CHANGES
+from .connectivity import (
+    articulation_points_and_bridges,
+    detour_pair_counts,
+    disconnected_pair_counts,
+    disrupted_pair_counts,
+    isolated_counts,
+    strong_components,
+)
+from .parallel import default_workers, get_graph_executor, worker_cache, worker_graph
+from .route_graph import RouteGraph, get_route_graph
+
+INDEX_COLUMNS = [
+    "airport_id",
+    "is_articulation_point",
+    "bridge_count",
+    "isolated_airports",
+    "disrupted_pairs",
+    "detour_pairs",
+    "disconnected_pairs",
+    "network_version",
+]
+
+
+def _disconnected_in_worker(nodes: np.ndarray) -> np.ndarray:
+    cache = worker_cache()
+    if "scc_labels" not in cache:
+        cache["scc_labels"] = strong_components(worker_graph())
+    return disconnected_pair_counts(worker_graph(), nodes, cache["scc_labels"])
+
+
+def _disconnected(graph: RouteGraph, nodes: np.ndarray, workers: Optional[int] = None) -> np.ndarray:
+    workers = workers or default_workers()
+    if workers > 1 and nodes.size >= 8 * workers:
+        executor = get_graph_executor(graph)
+        return np.concatenate(list(executor.map(_disconnected_in_worker, np.array_split(nodes, 4 * workers))))
+    return disconnected_pair_counts(graph, nodes)
+
+
+def build_connectivity_index(
+    graph: RouteGraph, nodes: Optional[np.ndarray] = None, workers: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Closure impact indicators per airport (all airports with routes, or `nodes`).
+
+    * is_articulation_point / bridge_count: cut airport and cut links of the
+      undirected network (closing it splits the network into pieces).
+    * isolated_airports: airports left without any service.
+    * disrupted_pairs: connections A -> X -> B through the airport.
+    * detour_pairs: of those, the ones with no direct flight and no other
+      one-stop itinerary, i.e. that need extra flights or lose service.
+    * disconnected_pairs: ordered pairs of other airports that can reach each
+      other both ways today and no longer can.
+
+    Returns:
+        pd.DataFrame: INDEX_COLUMNS (node indices mapped back to airport IDs).
+    """
+    if nodes is None:
+        nodes = np.flatnonzero((graph.out_degree() + graph.in_degree()) > 0)
+    nodes = np.asarray(nodes, dtype=np.int64)
+    is_cut, bridges = articulation_points_and_bridges(graph)
+    bridge_count = np.bincount(bridges.ravel(), minlength=graph.num_nodes)
+    full = nodes.size == int(((graph.out_degree() + graph.in_degree()) > 0).sum())
+    detours = detour_pair_counts(graph, None if full else nodes)
+    return pd.DataFrame({
+        "airport_id": graph.airport_ids[nodes],
+        "is_articulation_point": is_cut[nodes].astype(int),
+        "bridge_count": bridge_count[nodes],
+        "isolated_airports": isolated_counts(graph)[nodes],
+        "disrupted_pairs": disrupted_pair_counts(graph)[nodes],
+        "detour_pairs": detours[nodes],
+        "disconnected_pairs": _disconnected(graph, nodes, workers),
+        "network_version": graph.version,
+    })
+
+
+def _pair_ids(graph: RouteGraph) -> np.ndarray:
+    """Distinct (source, destination) airport-ID pairs, as a (k, 2) array."""
+    return np.column_stack([graph.airport_ids[graph.pair_src], graph.airport_ids[graph.indices]])
+
+
+def _dirty_airports(graph: RouteGraph, old_pairs: np.ndarray) -> np.ndarray:
+    """
+    Airport IDs whose local indicators can change after the route pairs changed.
+
+    For a link u -> v that appeared or disappeared: u and v themselves, and
+    their current neighbours, which covers the airports X on one-stop
+    itineraries u -> X -> v and the isolated_airports counts.
+    """
+    old_keys = {tuple(p) for p in old_pairs.tolist()}
+    new_keys = {tuple(p) for p in _pair_ids(graph).tolist()}
+    dirty = set()
+    for u_id, v_id in old_keys ^ new_keys:
+        dirty.update((u_id, v_id))
+        for node in (graph.node(u_id), graph.node(v_id)):
+            if node is None:
+                continue
+            dirty.update(graph.airport_ids[graph.successors(node)].tolist())
+            dirty.update(graph.airport_ids[graph.predecessors(node)].tolist())
+    return np.asarray(sorted(dirty), dtype=np.int64)
+
+
+def save_connectivity_index(df: pd.DataFrame, graph: RouteGraph, replace: bool) -> None:
+    """Upsert index rows; with `replace`, rows of other network versions are dropped afterwards."""
+    sql = f"""
+        INSERT INTO airport_connectivity ({", ".join(INDEX_COLUMNS)})
+        VALUES ({", ".join(["%s"] * len(INDEX_COLUMNS))})
+        ON DUPLICATE KEY UPDATE
+            {", ".join(f"{c}=VALUES({c})" for c in INDEX_COLUMNS[1:])},
+            computed_at=CURRENT_TIMESTAMP(6)
+    """
+    rows = [
+        tuple(int(v) if isinstance(v, np.integer) else v for v in row)
+        for row in df[INDEX_COLUMNS].itertuples(index=False)
+    ]
+    if rows:
+        executemany_sql(sql, rows)
+    if replace:
+        # Upsert first, delete after, so readers never see an empty table
+        execute_sql("DELETE FROM airport_connectivity WHERE network_version <> %s", (graph.version,))
+
+    # Artifact of the network the rows describe, diffed by the next incremental refresh
+    CONNECTIVITY_EDGES_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with CONNECTIVITY_EDGES_PATH.open("wb") as f:
+        np.savez(f, pairs=_pair_ids(graph), version=np.array(graph.version))
+
+
+def refresh_connectivity_index(full: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Bring `airport_connectivity` up to date with the route graph.
+
+    Incremental by default: the route pairs the index was built from are
+    diffed against the current graph and only airports near a changed link
+    are recomputed; articulation/bridge flags (a single linear pass) are
+    refreshed for every airport. disconnected_pairs of airports far from
+    the change is a global quantity and is only corrected by a full run,
+    which also happens automatically when more than
+    CONNECTIVITY_INCREMENTAL_MAX_CHANGES airports are affected or no
+    previous artifact exists.
+
+    Returns:
+        Dict[str, Any]: mode, airports recomputed, network_version and seconds.
+    """
+    started = time.perf_counter()
+    graph = get_route_graph()
+    old_pairs = None
+    if not full and CONNECTIVITY_EDGES_PATH.exists():
+        with np.load(CONNECTIVITY_EDGES_PATH, allow_pickle=False) as data:
+            if str(data["version"]) == graph.version:
+                return {"mode": "unchanged", "airports": 0, "network_version": graph.version, "seconds": 0.0}
+            old_pairs = data["pairs"]
+
+    dirty = None if old_pairs is None else _dirty_airports(graph, old_pairs)
+    if dirty is None or dirty.size > CONNECTIVITY_INCREMENTAL_MAX_CHANGES:
+        df = build_connectivity_index(graph, workers=workers)
+        save_connectivity_index(df, graph, replace=True)
+        mode = "full"
+    else:
+        nodes = graph.nodes(dirty)
+        gone = dirty[nodes < 0]
+        if gone.size:
+            placeholders = ", ".join(["%s"] * gone.size)
+            execute_sql(f"DELETE FROM airport_connectivity WHERE airport_id IN ({placeholders})", [int(a) for a in gone])
+        df = build_connectivity_index(graph, nodes=nodes[nodes >= 0], workers=workers)
+        # Cut flags are global: rewrite them everywhere, then the dirty rows in full
+        is_cut, bridges = articulation_points_and_bridges(graph)
+        bridge_count = np.bincount(bridges.ravel(), minlength=graph.num_nodes)
+        active = np.flatnonzero((graph.out_degree() + graph.in_degree()) > 0)
+        executemany_sql(
+            "UPDATE airport_connectivity SET is_articulation_point = %s, bridge_count = %s WHERE airport_id = %s",
+            [(int(is_cut[n]), int(bridge_count[n]), int(graph.airport_ids[n])) for n in active],
+        )
+        save_connectivity_index(df, graph, replace=False)
+        mode = "incremental"
+    invalidate_connectivity_cache()
+    bump_data_version()
+    return {
+        "mode": mode,
+        "airports": int(len(df)),
+        "network_version": graph.version,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+_index: Optional[Dict[int, Dict[str, Any]]] = None
+_index_version: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_connectivity_index() -> Dict[int, Dict[str, Any]]:
+    """
+    airport_id -> stored indicators.
+
+    Reloaded whenever data_version moves (refresh_connectivity_index bumps it,
+    including from another process); an empty table is not kept, so airports
+    show up as soon as the index is first built.
+    """
+    global _index, _index_version
+    version = current_data_version()
+    with _lock:
+        if _index is None or _index_version != version:
+            df = fetch_df(f"SELECT {', '.join(INDEX_COLUMNS)}, computed_at FROM airport_connectivity")
+            df["computed_at"] = df["computed_at"].astype(str)
+            index = {int(row["airport_id"]): row for row in df.to_dict(orient="records")}
+            if not index:
+                return index
+            _index, _index_version = index, version
+        return _index
+
+
+def invalidate_connectivity_cache() -> None:
+    global _index
+    with _lock:
+        _index = None
+
+
+def closure_connectivity(airport_id: int) -> Optional[Dict[str, Any]]:
+    """Precomputed connectivity impact of closing one airport (None if not indexed)."""
+    return get_connectivity_index().get(int(airport_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the airport_connectivity closure index")
+    parser.add_argument("--full", action="store_true", help="Recompute every airport")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    print(refresh_connectivity_index(full=args.full, workers=args.workers))
@@ -1,7 +1,9 @@
 from __future__ import annotations
+from typing import Iterator
+
 import pandas as pd
 
-from backend.config.db_config import fetch_df
+from backend.config.db_config import fetch_df, iter_df_chunks
 
 
 def busiest_routes(limit: int = 50) -> pd.DataFrame:
@@ -14,7 +16,7 @@ def busiest_routes(limit: int = 50) -> pd.DataFrame:
         LEFT JOIN airports da ON r.dest_airport_id = da.airport_id
         GROUP BY r.route_id, route_name
         ORDER BY frequency DESC
-        LIMIT ?
+        LIMIT %s
     """
     return fetch_df(sql, params=(limit,))
 
@@ -32,6 +34,24 @@ def delay_risk_overview(limit: int = 100) -> pd.DataFrame:
         LEFT JOIN airports sa ON r.source_airport_id = sa.airport_id
         LEFT JOIN airports da ON r.dest_airport_id = da.airport_id
         ORDER BY dr.overall_risk DESC
-        LIMIT ?
+        LIMIT %s
     """
     return fetch_df(sql, params=(limit,))
+
+
+def iter_delay_risks(chunksize: int = 10000) -> Iterator[pd.DataFrame]:
+    """Full delay-risk listing (no LIMIT), streamed in chunks for exports."""
+    sql = """
+        SELECT r.route_id,
+               CONCAT(sa.city, ' → ', da.city) AS route_name,
+               dr.overall_risk,
+               dr.weather_risk,
+               dr.congestion_risk,
+               dr.infra_risk
+        FROM delay_risks dr
+        JOIN routes r ON r.route_id = dr.route_id
+        LEFT JOIN airports sa ON r.source_airport_id = sa.airport_id
+        LEFT JOIN airports da ON r.dest_airport_id = da.airport_id
+        ORDER BY dr.route_id
+    """
+    return iter_df_chunks(sql, chunksize=chunksize)
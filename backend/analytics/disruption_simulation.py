@@ -1,9 +1,20 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Iterator, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from backend.config.db_config import fetch_df
+from backend.pagination import page_frame, split_page
+from .closure_impact import (
+    ROUTE_KEYS,
+    iter_materialized_routes,
+    materialized_closure,
+    materialized_routes_page,
+    materialized_summary,
+)
+from .pathfinding import reroute_disrupted_pairs
+from .route_graph import get_route_graph
 
 
 def simulate_airport_closure(airport_id: int) -> pd.DataFrame:
@@ -34,47 +45,116 @@ def simulate_airport_closure(airport_id: int) -> pd.DataFrame:
     return fetch_df(sql, params=(airport_id, airport_id))
 
 
-def suggest_alternate_routes(airport_id: int, top_k: int = 10) -> pd.DataFrame:
+def closure_impact(airport_id: int, live: bool = False) -> Tuple[pd.DataFrame, Optional[pd.Timestamp]]:
     """
-    Suggest alternate routes avoiding the closed airport.
+    Routes affected by closing an airport, served from the materialized
+    airport_closure_routes table when the airport has been computed there.
+
+    Args:
+        airport_id (int): The ID of the airport to simulate closure for.
+        live (bool): Skip the materialized table and run the join now.
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[pd.Timestamp]]: The simulate_airport_closure
+        rows and when they were computed (UTC; None for a live result).
+    """
+    if not live:
+        stored = materialized_closure(airport_id)
+        if stored is not None:
+            routes, summary = stored
+            return routes, summary["computed_at"]
+    return simulate_airport_closure(airport_id), None
+
+
+def closure_impact_page(
+    airport_id: int, cursor: Optional[str], page_size: int, live: bool = False
+) -> Tuple[pd.DataFrame, Optional[str], Optional[pd.Timestamp]]:
+    """
+    One page of closure_impact, busiest route first.
+
+    Materialized airports page with a keyset query, so a hub with thousands
+    of routes costs one page per request; live results are paged in memory
+    with the same keys, so cursors work the same either way.
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[str], Optional[pd.Timestamp]]: The page,
+        the cursor of the next page (None on the last one) and computed_at.
+    """
+    summary = None if live else materialized_summary(airport_id)
+    if summary is not None:
+        rows = materialized_routes_page(airport_id, cursor, page_size)
+        computed_at = summary["computed_at"]
+    else:
+        rows = page_frame(simulate_airport_closure(airport_id), ROUTE_KEYS, cursor, page_size)
+        computed_at = None
+    page, next_cursor = split_page(rows, ROUTE_KEYS, page_size)
+    return page, next_cursor, computed_at
+
+
+def iter_closure_impact(
+    airport_id: int, chunksize: int, live: bool = False
+) -> Tuple[Iterator[pd.DataFrame], Optional[pd.Timestamp]]:
+    """closure_impact as a stream of chunks (read off the materialized table as they are consumed)."""
+    summary = None if live else materialized_summary(airport_id)
+    if summary is not None:
+        return iter_materialized_routes(airport_id, chunksize), summary["computed_at"]
+    df = simulate_airport_closure(airport_id)
+    return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize)), None
+
+
+def suggest_alternate_routes(
+    airport_id: int,
+    top_k: int = 3,
+    max_hops: int = 3,
+    limit_pairs: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Re-route every connection broken by closing an airport.
+
+    Each origin -> destination pair that connected through the closed
+    airport, and has neither a direct flight nor another one-stop
+    connection left, gets its `top_k` best itineraries over the remaining
+    network, ranked by number of flights and then great-circle distance
+    (see pathfinding.k_best_paths). Pairs that keep a one-stop connection
+    are counted by scenarios.evaluate_closure (one_stop_pairs) instead.
 
     Args:
         airport_id (int): Closed airport ID.
-        top_k (int): Number of alternate routes.
+        top_k (int): Re-routings per disrupted pair.
+        max_hops (int): Longest itinerary considered (1-3 flights).
+        limit_pairs (Optional[int]): Only the pairs with the most connecting passengers.
 
     Returns:
-        pd.DataFrame: Suggested alternate routes.
+        pd.DataFrame: One row per (pair, rank) with airport IDs, the itinerary,
+        hops, distance_km and detour_km versus the original connection.
+        Pairs with no alternative within max_hops have rank 0.
     """
-    # Step 1: Get city and country of closed airport
-    airport_sql = "SELECT city, country FROM airports WHERE airport_id = %s"
-    closed_airport = fetch_df(airport_sql, params=(airport_id,))
-    
-    if closed_airport.empty:
+    graph = get_route_graph()
+    closed = graph.node(airport_id)
+    if closed is None:
         return pd.DataFrame()  # no such airport
 
-    city = closed_airport.at[0, "city"]
-    country = closed_airport.at[0, "country"]
+    paths = reroute_disrupted_pairs(graph, [closed], k=top_k, max_hops=max_hops, limit_pairs=limit_pairs)
+    if paths.empty:
+        return pd.DataFrame()
 
-    # Step 2: Query routes avoiding this airport
-    sql = """
-        SELECT
-            r.route_id,
-            sa.name AS src_airport,
-            da.name AS dst_airport,
-            sa.city AS src_city,
-            da.city AS dst_city,
-            sa.country AS src_country,
-            da.country AS dst_country
-        FROM routes r
-        JOIN airports sa ON r.source_airport_id = sa.airport_id
-        JOIN airports da ON r.dest_airport_id = da.airport_id
-        WHERE (
-            sa.city = %s OR da.city = %s
-            OR sa.country = %s OR da.country = %s
-        )
-        AND sa.airport_id <> %s
-        AND da.airport_id <> %s
-        LIMIT %s
-    """
-    params = (city, city, country, country, airport_id, airport_id, top_k)
-    return fetch_df(sql, params=params)
\ No newline at end of file
+    origin = paths["origin"].to_numpy(dtype=np.int64)
+    destination = paths["destination"].to_numpy(dtype=np.int64)
+    hops = [origin, paths["via_1"].to_numpy(dtype=np.int64), paths["via_2"].to_numpy(dtype=np.int64), destination]
+    labels = [np.where(h >= 0, graph.labels[np.maximum(h, 0)], None) for h in hops]
+    itinerary = [
+        " → ".join(code for code in stops if code is not None) if rank > 0 else None
+        for rank, *stops in zip(paths["rank"], labels[0], labels[1], labels[2], labels[3])
+    ]
+    return pd.DataFrame({
+        "src_airport_id": graph.airport_ids[origin],
+        "dst_airport_id": graph.airport_ids[destination],
+        "src_airport": labels[0],
+        "dst_airport": labels[3],
+        "connecting_passengers": paths["connecting_passengers"].to_numpy(),
+        "rank": paths["rank"].to_numpy(),
+        "hops": paths["hops"].to_numpy(),
+        "itinerary": itinerary,
+        "distance_km": paths["distance_km"].round(1).to_numpy(),
+        "detour_km": paths["detour_km"].round(1).to_numpy(),
+    })
@@ -3,44 +3,42 @@ import pandas as pd
 
 from backend.config.db_config import fetch_df
 
+# Full-table aggregates, shared by the live queries below and the
+# materialized summaries in hub_summaries.py
+BUSIEST_HUBS_SQL = """
+    SELECT a.airport_id, a.name, a.city, a.country,
+           COUNT(*) AS degree
+    FROM routes r
+    LEFT JOIN airports a ON r.source_airport_id = a.airport_id
+    GROUP BY a.airport_id, a.name, a.city, a.country
+"""
+
+CITY_PAIRS_SQL = """
+    SELECT sa.city AS source_city, da.city AS dest_city, COUNT(*) AS flights
+    FROM routes r
+    LEFT JOIN airports sa ON r.source_airport_id = sa.airport_id
+    LEFT JOIN airports da ON r.dest_airport_id = da.airport_id
+    GROUP BY sa.city, da.city
+"""
+
+HUB_LOAD_DELAY_SQL = """
+    SELECT a.airport_id, a.name, a.city, a.country,
+           SUM(ps.passengers) AS total_passengers,
+           AVG(ps.avg_delay_minutes) AS avg_delay
+    FROM routes r
+    JOIN passenger_stats ps ON ps.route_id = r.route_id
+    JOIN airports a ON a.airport_id = r.source_airport_id
+    GROUP BY a.airport_id, a.name, a.city, a.country
+"""
 
-def busiest_hubs(limit: int = 20) -> pd.DataFrame:
-    sql = """
-        SELECT a.airport_id, a.name, a.city, a.country,
-               COUNT(*) AS degree
-        FROM routes r
-        LEFT JOIN airports a ON r.source_airport_id = a.airport_id
-        GROUP BY a.airport_id, a.name, a.city, a.country
-        ORDER BY degree DESC
-        LIMIT %s
-    """
-    return fetch_df(sql, params=(limit,))
 
+def busiest_hubs(limit: int = 20) -> pd.DataFrame:
+    return fetch_df(BUSIEST_HUBS_SQL + " ORDER BY degree DESC LIMIT %s", params=(limit,))
 
 
 def top_city_pairs_by_frequency(limit: int = 20) -> pd.DataFrame:
-    sql = """
-SELECT sa.city AS source_city, da.city AS dest_city, COUNT(*) AS flights
-FROM routes r
-LEFT JOIN airports sa ON r.source_airport_id = sa.airport_id
-LEFT JOIN airports da ON r.dest_airport_id = da.airport_id
-GROUP BY sa.city, da.city
-ORDER BY flights DESC
-LIMIT %s
-"""
-    return fetch_df(sql, params=(limit,))
+    return fetch_df(CITY_PAIRS_SQL + " ORDER BY flights DESC LIMIT %s", params=(limit,))
 
 
 def hub_load_and_delay(limit: int = 50) -> pd.DataFrame:
-    sql = """
-        SELECT a.airport_id, a.name, a.city, a.country,
-               SUM(ps.passengers) AS total_passengers,
-               AVG(ps.avg_delay_minutes) AS avg_delay
-        FROM routes r
-        JOIN passenger_stats ps ON ps.route_id = r.route_id
-        JOIN airports a ON a.airport_id = r.source_airport_id
-        GROUP BY a.airport_id, a.name, a.city, a.country
-        ORDER BY total_passengers DESC
-        LIMIT %s
-    """
-    return fetch_df(sql, params=(limit,))
+    return fetch_df(HUB_LOAD_DELAY_SQL + " ORDER BY total_passengers DESC LIMIT %s", params=(limit,))
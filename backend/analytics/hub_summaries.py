@@ -0,0 +1,177 @@
+from __future__ import annotations
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from backend.config.data_version import bump_data_version
+from backend.config.db_config import execute_sql, fetch_df, iter_df_chunks
+from backend.config.settings import HUB_SUMMARY_REFRESH_SECONDS
+from backend.pagination import Key, keyset_sql, split_page
+from .hub_analysis import (
+    BUSIEST_HUBS_SQL,
+    CITY_PAIRS_SQL,
+    HUB_LOAD_DELAY_SQL,
+    busiest_hubs,
+    hub_load_and_delay,
+    top_city_pairs_by_frequency,
+)
+
+
+class Summary(NamedTuple):
+    table: str
+    source_sql: str
+    columns: List[str]
+    order_by: str
+    live: Callable[..., pd.DataFrame]
+    # Unique sort order (order_by first) used to page through the rows
+    keys: Tuple[Key, ...]
+
+
+SUMMARIES: Dict[str, Summary] = {
+    "busiest_hubs": Summary(
+        "hub_degree_summary", BUSIEST_HUBS_SQL,
+        ["airport_id", "name", "city", "country", "degree"], "degree", busiest_hubs,
+        (Key("degree", descending=True), Key("airport_id", null_as=-1)),
+    ),
+    "top_city_pairs": Summary(
+        "city_pair_frequency", CITY_PAIRS_SQL,
+        ["source_city", "dest_city", "flights"], "flights", top_city_pairs_by_frequency,
+        (Key("flights", descending=True), Key("source_city", null_as=""), Key("dest_city", null_as="")),
+    ),
+    "hub_load_delay": Summary(
+        "hub_load_delay_summary", HUB_LOAD_DELAY_SQL,
+        ["airport_id", "name", "city", "country", "total_passengers", "avg_delay"], "total_passengers",
+        hub_load_and_delay,
+        (Key("total_passengers", descending=True, null_as=0.0), Key("airport_id")),
+    ),
+}
+
+
+def refresh_hub_summaries(names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Rebuild the materialized dashboard aggregates.
+
+    Each summary is one INSERT ... SELECT of the same GROUP BY the live
+    query runs, stamped with a single UTC computed_at (ColumnStore: delete,
+    then insert; readers fall back to the live query while a table is empty).
+
+    Args:
+        names (Optional[Iterable[str]]): Keys of SUMMARIES to rebuild (default: all).
+
+    Returns:
+        Dict[str, Any]: Seconds taken per summary.
+    """
+    timings = {}
+    for name in names or SUMMARIES:
+        summary = SUMMARIES[name]
+        started = time.perf_counter()
+        computed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        columns = ", ".join(summary.columns)
+        execute_sql(f"DELETE FROM {summary.table}")
+        execute_sql(
+            f"INSERT INTO {summary.table} ({columns}, computed_at) "
+            f"SELECT {columns}, %s FROM ({summary.source_sql}) s",
+            (computed_at,),
+        )
+        timings[name] = time.perf_counter() - started
+    bump_data_version()
+    return timings
+
+
+def hub_summary(name: str, limit: int, live: bool = False) -> Tuple[pd.DataFrame, Optional[pd.Timestamp]]:
+    """
+    Top `limit` rows of a dashboard aggregate, read from its summary table.
+
+    Args:
+        name (str): Key of SUMMARIES.
+        limit (int): Rows to return, largest first.
+        live (bool): Skip the summary table and run the aggregate now.
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[pd.Timestamp]]: The same columns as the
+        live query and when they were computed (UTC; None for a live result,
+        also used when the summary has not been built yet).
+    """
+    summary = SUMMARIES[name]
+    if not live:
+        df = fetch_df(
+            f"SELECT {', '.join(summary.columns)}, computed_at FROM {summary.table} "
+            f"ORDER BY {summary.order_by} DESC LIMIT %s",
+            params=(limit,),
+        )
+        if not df.empty:
+            computed_at = pd.Timestamp(df["computed_at"].min()).tz_localize("UTC")
+            return df.drop(columns="computed_at"), computed_at
+    return summary.live(limit=limit), None
+
+
+def city_pair_filters(
+    source_city: Optional[str] = None, dest_city: Optional[str] = None, min_flights: Optional[int] = None
+) -> List[Tuple[str, Any]]:
+    """Server-side filters for the top_city_pairs pages (city substrings, minimum flights)."""
+    where: List[Tuple[str, Any]] = []
+    if source_city:
+        where.append(("source_city LIKE %s", f"%{source_city}%"))
+    if dest_city:
+        where.append(("dest_city LIKE %s", f"%{dest_city}%"))
+    if min_flights:
+        where.append(("flights >= %s", int(min_flights)))
+    return where
+
+
+def _summary_source(summary: Summary, live: bool) -> Tuple[str, Optional[pd.Timestamp]]:
+    """SELECT to read a summary from (its table, or the live aggregate when empty or `live`) and computed_at."""
+    if not live:
+        df = fetch_df(f"SELECT MIN(computed_at) AS computed_at FROM {summary.table}")
+        if not df.empty and pd.notna(df.at[0, "computed_at"]):
+            computed_at = pd.Timestamp(df.at[0, "computed_at"]).tz_localize("UTC")
+            return f"SELECT {', '.join(summary.columns)} FROM {summary.table}", computed_at
+    return summary.source_sql, None
+
+
+def hub_summary_page(
+    name: str,
+    cursor: Optional[str],
+    page_size: int,
+    where: Sequence[Tuple[str, Any]] = (),
+    live: bool = False,
+) -> Tuple[pd.DataFrame, Optional[str], Optional[pd.Timestamp]]:
+    """
+    One keyset page of a dashboard aggregate, largest first.
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[str], Optional[pd.Timestamp]]: The page,
+        the cursor of the next page (None on the last one) and computed_at
+        as in hub_summary.
+    """
+    summary = SUMMARIES[name]
+    source, computed_at = _summary_source(summary, live)
+    sql, params = keyset_sql(source, summary.keys, cursor, page_size, where=where)
+    page, next_cursor = split_page(fetch_df(sql, params=params), summary.keys, page_size)
+    return page, next_cursor, computed_at
+
+
+def iter_hub_summary(
+    name: str, chunksize: int, where: Sequence[Tuple[str, Any]] = (), live: bool = False
+) -> Tuple[Iterator[pd.DataFrame], Optional[pd.Timestamp]]:
+    """Every row of a dashboard aggregate in page order, streamed in chunks."""
+    summary = SUMMARIES[name]
+    source, computed_at = _summary_source(summary, live)
+    sql, params = keyset_sql(source, summary.keys, None, None, where=where)
+    return iter_df_chunks(sql, params=params, chunksize=chunksize), computed_at
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the materialized hub and city-pair aggregates")
+    parser.add_argument("--only", nargs="*", choices=sorted(SUMMARIES), help="Summaries to rebuild (default: all)")
+    parser.add_argument("--watch", action="store_true", help="Keep refreshing on a schedule")
+    parser.add_argument("--interval", type=float, default=HUB_SUMMARY_REFRESH_SECONDS, help="Seconds between refreshes")
+    args = parser.parse_args()
+    while True:
+        print(refresh_hub_summaries(args.only))
+        if not args.watch:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,294 @@
+from __future__ import annotations
+import argparse
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.config.db_config import fetch_df
+from backend.config.settings import CASCADE_FAILURE_SHARE, DELAY_RISK_SCALE, MONTE_CARLO_BATCH_SIZE
+from .connectivity import batched_reach
+from .parallel import default_workers, get_graph_executor, worker_cache, worker_graph
+from .route_graph import RouteGraph, get_route_graph
+
+RISK_COLUMNS = ("overall", "weather", "congestion", "infra")
+FAILURE_LEVELS = ("route", "airport")
+TRIAL_METRICS = (
+    "failed_routes",
+    "closed_airports",
+    "disrupted_passengers",
+    "stranded_passengers",
+    "unreachable_pairs",
+    "airports_cut_off",
+)
+# Cascades settle within a few rounds; the cap only guards against pathological inputs
+MAX_CASCADE_ROUNDS = 20
+
+
+def failure_probabilities(graph: RouteGraph, level: str = "route", risk: str = "overall") -> np.ndarray:
+    """
+    Per-route or per-airport failure probabilities from `delay_risks`.
+
+    Scores are divided by DELAY_RISK_SCALE and clipped to [0, 1]; several
+    rows for one route are averaged and routes without a row never fail.
+    An airport's probability is the mean over the routes touching it.
+
+    Args:
+        graph (RouteGraph): Network whose routes the scores are aligned to.
+        level (str): "route" (one probability per graph edge) or "airport" (per node).
+        risk (str): Score column: "overall", "weather", "congestion" or "infra".
+
+    Returns:
+        np.ndarray: float64 probabilities in graph edge or node order.
+    """
+    if level not in FAILURE_LEVELS:
+        raise ValueError(f"level must be one of {FAILURE_LEVELS}")
+    if risk not in RISK_COLUMNS:
+        raise ValueError(f"risk must be one of {RISK_COLUMNS}")
+    df = fetch_df(f"""
+        SELECT route_id, AVG({risk}_risk) AS risk
+        FROM delay_risks
+        WHERE {risk}_risk IS NOT NULL
+        GROUP BY route_id
+    """)
+    scores = pd.Series(df["risk"].astype(float).to_numpy(), index=df["route_id"].astype(np.int64).to_numpy())
+    edge_p = scores.reindex(graph.edge_route_ids).fillna(0.0).to_numpy() / DELAY_RISK_SCALE
+    edge_p = np.clip(edge_p, 0.0, 1.0)
+    if level == "route":
+        return edge_p
+    touching = np.bincount(graph.edge_src, minlength=graph.num_nodes) + np.bincount(graph.edge_dst, minlength=graph.num_nodes)
+    total = (np.bincount(graph.edge_src, weights=edge_p, minlength=graph.num_nodes)
+             + np.bincount(graph.edge_dst, weights=edge_p, minlength=graph.num_nodes))
+    return total / np.maximum(touching, 1)
+
+
+def _graph_arrays(graph: RouteGraph) -> Dict[str, Any]:
+    """Per-snapshot arrays shared by all batches (pair of each edge, reverse pair lookup, core size)."""
+    n = graph.num_nodes
+    degree = graph.out_degree() + graph.in_degree()
+    arrays = {
+        "edge_pair": np.repeat(np.arange(graph.num_edges), np.diff(graph.pair_edge_indptr)),
+        "fwd_pair": np.arange(graph.num_edges),
+        "rev_pair": graph.rev_pairs,
+        "incident": np.bincount(graph.edge_src, minlength=n) + np.bincount(graph.edge_dst, minlength=n),
+        "order": np.argsort(-degree, kind="stable"),
+    }
+    everything = np.ones((1, graph.num_edges), dtype=bool)
+    pivot = arrays["order"][:1]
+    core = (batched_reach(graph.indptr, graph.indices, arrays["fwd_pair"], everything, pivot, n)
+            & batched_reach(graph.rev_indptr, graph.rev_indices, arrays["rev_pair"], everything, pivot, n))
+    arrays["core_size"] = int(core.sum())
+    return arrays
+
+
+_arrays: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _shared_arrays(graph: RouteGraph) -> Dict[str, Any]:
+    with _lock:
+        arrays = _arrays.get(graph.version)
+        if arrays is None:
+            _arrays.clear()
+            arrays = _arrays[graph.version] = _graph_arrays(graph)
+        return arrays
+
+
+def _run_batch(
+    graph: RouteGraph,
+    arrays: Dict[str, Any],
+    probabilities: np.ndarray,
+    level: str,
+    trials: int,
+    cascade_share: Optional[float],
+    seed: np.random.SeedSequence,
+) -> Dict[str, np.ndarray]:
+    """
+    Simulate `trials` independent disruptions as (trials, routes) masks.
+
+    1. Initial failures: each route (or airport, closing all its routes)
+       fails with its probability.
+    2. Cascade: an airport whose share of failed routes reaches
+       `cascade_share` closes, failing its remaining routes; repeated
+       until no airport is added.
+    3. Impact: the core (largest mutually reachable group, found from the
+       busiest open airport by batched forward/backward BFS) is compared
+       with the undisrupted core. A failed route's passengers are stranded
+       when no other airline flies the pair and its endpoints are not both
+       left in the core.
+    """
+    src, dst, n = graph.edge_src, graph.edge_dst, graph.num_nodes
+    rng = np.random.default_rng(seed)
+    if level == "route":
+        route_failed = rng.random((trials, graph.num_routes), dtype=np.float32) < probabilities
+        closed = np.zeros((trials, n), dtype=bool)
+    else:
+        closed = rng.random((trials, n), dtype=np.float32) < probabilities
+        route_failed = closed[:, src] | closed[:, dst]
+
+    if cascade_share is not None and cascade_share <= 1.0:
+        incident = arrays["incident"]
+        for _ in range(MAX_CASCADE_ROUNDS):
+            trial, route = np.nonzero(route_failed)
+            hits = (np.bincount(trial * n + src[route], minlength=trials * n)
+                    + np.bincount(trial * n + dst[route], minlength=trials * n)).reshape(trials, n)
+            newly = ~closed & (incident > 0) & (hits >= cascade_share * incident)
+            if not newly.any():
+                break
+            closed |= newly
+            route_failed |= closed[:, src] | closed[:, dst]
+
+    pair_alive = np.logical_or.reduceat(~route_failed, graph.pair_edge_indptr[:-1], axis=1)
+    order = arrays["order"]
+    pivots = order[np.argmax(~closed[:, order], axis=1)]
+    core = (batched_reach(graph.indptr, graph.indices, arrays["fwd_pair"], pair_alive, pivots, n)
+            & batched_reach(graph.rev_indptr, graph.rev_indices, arrays["rev_pair"], pair_alive, pivots, n))
+    core &= ~closed
+    core_size = core.sum(axis=1).astype(np.int64)
+
+    stranded = route_failed & ~pair_alive[:, arrays["edge_pair"]] & ~(core[:, src] & core[:, dst])
+    passengers = graph.edge_passengers.astype(np.float64)
+    base = arrays["core_size"]
+    return {
+        "failed_routes": route_failed.sum(axis=1),
+        "closed_airports": closed.sum(axis=1),
+        "disrupted_passengers": route_failed @ passengers,
+        "stranded_passengers": stranded @ passengers,
+        "unreachable_pairs": base * (base - 1) - core_size * np.maximum(core_size - 1, 0),
+        "airports_cut_off": base - core_size,
+    }
+
+
+def _batch_in_worker(task: Tuple[np.ndarray, str, int, Optional[float], np.random.SeedSequence]) -> Dict[str, np.ndarray]:
+    graph = worker_graph()
+    cache = worker_cache()
+    if "monte_carlo_arrays" not in cache:
+        cache["monte_carlo_arrays"] = _graph_arrays(graph)
+    probabilities, level, trials, cascade_share, seed = task
+    return _run_batch(graph, cache["monte_carlo_arrays"], probabilities, level, trials, cascade_share, seed)
+
+
+def simulate_cascading_failures(
+    trials: int = 1000,
+    level: str = "route",
+    risk: str = "overall",
+    cascade_share: Optional[float] = CASCADE_FAILURE_SHARE,
+    seed: Optional[int] = None,
+    batch_size: int = MONTE_CARLO_BATCH_SIZE,
+    workers: Optional[int] = None,
+    graph: Optional[RouteGraph] = None,
+    probabilities: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """
+    Monte Carlo simulation of cascading disruptions driven by delay risk.
+
+    Trials run in NumPy batches of `batch_size` (no per-trial Python loop);
+    each batch has its own random stream spawned from `seed`, so a seed
+    reproduces the same trials whether batches run in-process or on the
+    shared graph pool.
+
+    Args:
+        trials (int): Number of trials.
+        level (str): Fail "route"s or whole "airport"s at random.
+        risk (str): delay_risks score used as the probability (see failure_probabilities).
+        cascade_share (Optional[float]): Share of an airport's routes that must
+            fail for it to close; None (or above 1) disables cascades.
+        seed (Optional[int]): RNG seed; a fresh one is drawn (and returned) when None.
+        batch_size (int): Trials per vectorized batch.
+        workers (Optional[int]): Pool workers to split batches for (defaults to GRAPH_POOL_WORKERS
+            or the CPU count; 1 runs in-process). The shared pool itself is sized once from settings.
+        graph (Optional[RouteGraph]): Snapshot to use (defaults to the shared graph).
+        probabilities (Optional[np.ndarray]): Override the delay_risks probabilities
+            (per edge for "route", per node for "airport").
+
+    Returns:
+        Dict[str, Any]: trials (a DataFrame with one row of TRIAL_METRICS per
+        trial), seed, level, risk, cascade_share, seconds and trials_per_second.
+    """
+    started = time.perf_counter()
+    graph = graph or get_route_graph()
+    if probabilities is None:
+        probabilities = failure_probabilities(graph, level, risk)
+    elif level not in FAILURE_LEVELS:
+        raise ValueError(f"level must be one of {FAILURE_LEVELS}")
+    if cascade_share is not None and not cascade_share > 0:
+        raise ValueError("cascade_share must be above 0 (a share of 0 or less closes every airport)")
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % (2 ** 32))
+
+    sizes = [min(batch_size, trials - start) for start in range(0, trials, batch_size)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers or default_workers()
+    if workers > 1 and len(sizes) > 1:
+        executor = get_graph_executor(graph)
+        tasks = [(probabilities, level, size, cascade_share, stream) for size, stream in zip(sizes, streams)]
+        batches = list(executor.map(_batch_in_worker, tasks))
+    else:
+        arrays = _shared_arrays(graph)
+        batches = [
+            _run_batch(graph, arrays, probabilities, level, size, cascade_share, stream)
+            for size, stream in zip(sizes, streams)
+        ]
+
+    results = pd.DataFrame({m: np.concatenate([b[m] for b in batches]) if batches else [] for m in TRIAL_METRICS})
+    seconds = time.perf_counter() - started
+    return {
+        "trials": results,
+        "seed": seed,
+        "level": level,
+        "risk": risk,
+        "cascade_share": cascade_share,
+        "seconds": seconds,
+        "trials_per_second": len(results) / seconds if seconds > 0 else 0.0,
+    }
+
+
+def summarize_trials(results: pd.DataFrame, bins: int = 20) -> Dict[str, Any]:
+    """
+    Distribution of each metric over the trials.
+
+    Returns:
+        Dict[str, Any]: summary (mean, std, min, p50, p90, p95, p99, max per
+        metric) and histograms (bin edges and counts per metric).
+    """
+    summary, histograms = {}, {}
+    for metric in TRIAL_METRICS:
+        values = results[metric].to_numpy(dtype=np.float64)
+        if values.size == 0:
+            continue
+        p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99])
+        summary[metric] = {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(values.max()),
+        }
+        counts, edges = np.histogram(values, bins=bins)
+        histograms[metric] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    return {"summary": summary, "histograms": histograms}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo cascading-disruption simulation from delay_risks")
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--level", choices=FAILURE_LEVELS, default="route")
+    parser.add_argument("--risk", choices=RISK_COLUMNS, default="overall")
+    parser.add_argument("--cascade-share", type=float, default=CASCADE_FAILURE_SHARE)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=MONTE_CARLO_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    run = simulate_cascading_failures(
+        trials=args.trials, level=args.level, risk=args.risk, cascade_share=args.cascade_share,
+        seed=args.seed, batch_size=args.batch_size, workers=args.workers,
+    )
+    print(f"{len(run['trials'])} trials in {run['seconds']:.2f}s ({run['trials_per_second']:.0f} trials/s, seed={run['seed']})")
+    print(pd.DataFrame(summarize_trials(run["trials"])["summary"]).T.to_string())
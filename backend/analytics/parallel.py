@@ -0,0 +1,72 @@
+from __future__ import annotations
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from backend.config.settings import GRAPH_POOL_WORKERS
+from .route_graph import RouteGraph
+
+# Worker-process state: one read-only graph snapshot per process, set by the
+# pool initializer, plus per-worker caches of values derived from it
+_worker_graph: Optional[RouteGraph] = None
+_worker_cache: Dict[str, Any] = {}
+
+
+def _init_worker(graph: RouteGraph) -> None:
+    global _worker_graph
+    _worker_graph = graph
+    _worker_cache.clear()
+
+
+def worker_graph() -> RouteGraph:
+    """The snapshot held by this worker process (call only from pool tasks)."""
+    if _worker_graph is None:
+        raise RuntimeError("worker_graph() called outside a graph pool worker")
+    return _worker_graph
+
+
+def worker_cache() -> Dict[str, Any]:
+    """Scratch dict living as long as the worker's snapshot (e.g. base SCC labels)."""
+    return _worker_cache
+
+
+def default_workers() -> int:
+    return GRAPH_POOL_WORKERS or os.cpu_count() or 1
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_version: Optional[str] = None
+_lock = threading.Lock()
+
+
+def get_graph_executor(graph: RouteGraph) -> ProcessPoolExecutor:
+    """
+    Process pool of default_workers() workers, each holding one copy of `graph`.
+
+    The graph is shipped once per worker through the initializer rather
+    than with every task. The pool is shared by all graph analytics and is
+    replaced when the graph version changes; the old pool is retired
+    without cancelling, so requests already queued on it still finish.
+    """
+    global _executor, _executor_version
+    with _lock:
+        if _executor is None or _executor_version != graph.version:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=default_workers(), initializer=_init_worker, initargs=(graph,))
+            _executor_version = graph.version
+        return _executor
+
+
+def shutdown_graph_pool() -> None:
+    global _executor, _executor_version
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_version = None
+
+
+atexit.register(shutdown_graph_pool)
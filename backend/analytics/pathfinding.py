@@ -0,0 +1,283 @@
+from __future__ import annotations
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .route_graph import RouteGraph, gather
+
+PATH_COLUMNS = ["origin", "destination", "rank", "hops", "via_1", "via_2", "distance_km"]
+
+
+def disrupted_pairs(graph: RouteGraph, closed: Iterable[int]) -> pd.DataFrame:
+    """
+    Origin-destination connections broken by closing airports.
+
+    A pair (A, B) is disrupted when some closed airport X had both A -> X
+    and X -> B service, i.e. passengers could connect through X, and there
+    is no direct A -> B flight. Pairs with either end closed are left out
+    (there is nothing to re-route). one_stop_left marks the pairs another
+    open airport still connects in one stop; only the others need extra
+    flights (or lose service).
+
+    Args:
+        graph (RouteGraph): Network to inspect.
+        closed (Iterable[int]): Closed node indices.
+
+    Returns:
+        pd.DataFrame: origin, destination (node indices), hub (the closed node
+        they connected through, the busiest if several), connecting_passengers,
+        the smaller of the two legs' passengers, and one_stop_left.
+    """
+    closed = np.unique(np.asarray(list(closed), dtype=np.int64))
+    is_closed = np.zeros(graph.num_nodes, dtype=bool)
+    is_closed[closed] = True
+    pair_passengers = graph.pair_passengers()
+
+    def leg_passengers(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        return pair_passengers[graph.pair_index(u, v)]
+
+    frames = []
+    for x in closed:
+        preds = graph.predecessors(x)
+        succs = graph.successors(x)
+        preds = preds[~is_closed[preds]]
+        succs = succs[~is_closed[succs]]
+        if preds.size == 0 or succs.size == 0:
+            continue
+        origin = np.repeat(preds, succs.size)
+        destination = np.tile(succs, preds.size)
+        keep = (origin != destination) & (graph.pair_index(origin, destination) < 0)
+        leg_in = np.repeat(leg_passengers(preds, np.full(preds.size, x)), succs.size)
+        leg_out = np.tile(leg_passengers(np.full(succs.size, x), succs), preds.size)
+        frames.append(pd.DataFrame({
+            "origin": origin[keep],
+            "destination": destination[keep],
+            "hub": x,
+            "connecting_passengers": np.minimum(leg_in, leg_out)[keep],
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["origin", "destination", "hub", "connecting_passengers", "one_stop_left"])
+    pairs = pd.concat(frames, ignore_index=True)
+    pairs = pairs.sort_values("connecting_passengers", ascending=False, kind="stable")
+    pairs = pairs.drop_duplicates(["origin", "destination"]).reset_index(drop=True)
+    pairs["one_stop_left"] = _one_stop_left(
+        graph, pairs["origin"].to_numpy(dtype=np.int64), pairs["destination"].to_numpy(dtype=np.int64), is_closed
+    )
+    return pairs
+
+
+def _one_stop_left(graph: RouteGraph, origin: np.ndarray, destination: np.ndarray, blocked: np.ndarray) -> np.ndarray:
+    """Whether each pair origin[i] -> destination[i] still has an origin -> M -> destination itinerary via an open M."""
+    n = max(graph.num_nodes, 1)
+    origins = np.unique(origin)
+    mid, owner = gather(graph.indptr, graph.indices, origins)
+    mid = mid.astype(np.int64)
+    start = origins[owner]
+    ok = ~blocked[mid] & (mid != start)
+    mid, start = mid[ok], start[ok]
+    is_destination = np.zeros(graph.num_nodes, dtype=bool)
+    is_destination[destination] = True
+    end, owner = gather(graph.indptr, graph.indices, mid)
+    keep = is_destination[end]
+    reached = np.unique(start[owner[keep]] * n + end[keep])
+    return np.isin(origin * n + destination, reached)
+
+
+def _group_rank(keys: np.ndarray, order_cols: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort by keys then order_cols; return the permutation and each row's rank within its key."""
+    perm = np.lexsort(tuple(reversed(order_cols)) + (keys,))
+    sorted_keys = keys[perm]
+    starts = np.ones(sorted_keys.shape[0], dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(sorted_keys.shape[0]), 0))
+    return perm, np.arange(sorted_keys.shape[0]) - group_start
+
+
+def k_best_paths(
+    graph: RouteGraph,
+    origins: np.ndarray,
+    targets: np.ndarray,
+    blocked: Optional[np.ndarray] = None,
+    k: int = 3,
+    max_hops: int = 3,
+) -> pd.DataFrame:
+    """
+    The k best loop-free paths for each pair (origins[i], targets[i]).
+
+    Paths rank by number of flights, then total great-circle distance. One-
+    and two-hop paths are enumerated outright; three-hop paths meet in the
+    middle (origin -> M1 -> M2 forward, M2 -> target backward) and are only
+    searched for pairs that still lack k shorter paths. All pairs go through
+    one vectorized pass over the CSR arrays.
+
+    Args:
+        graph (RouteGraph): Network to search.
+        origins (np.ndarray): Start node of each pair.
+        targets (np.ndarray): Destination node of each pair.
+        blocked (Optional[np.ndarray]): Boolean node mask of airports paths may not use.
+        k (int): Paths per pair.
+        max_hops (int): Longest itinerary considered (1-3 flights).
+
+    Returns:
+        pd.DataFrame: PATH_COLUMNS plus pair (the position in `origins`), with
+        node indices (via_* are -1 when unused), ordered by pair then rank.
+    """
+    n = graph.num_nodes
+    blocked = np.zeros(n, dtype=bool) if blocked is None else blocked
+    origins = np.asarray(origins, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    # Pairs with a blocked end or origin == target have no path
+    live = np.flatnonzero(~blocked[origins] & ~blocked[targets] & (origins != targets))
+    # Leg distances are read from the stored per-pair distances via CSR
+    # positions; unknown distances count as "far" so such paths rank last
+    def km(positions):
+        return np.nan_to_num(graph.pair_km[positions], nan=1e7)
+
+    def none(size):
+        return np.full(size, -1, dtype=np.int64)
+
+    parts = []
+    direct = graph.pair_index(origins[live], targets[live])
+    hit = direct >= 0
+    parts.append((live[hit], np.ones(hit.sum()), none(hit.sum()), none(hit.sum()), km(direct[hit])))
+    found = np.bincount(live[hit], minlength=origins.size)
+
+    if max_hops >= 2 and live.size:
+        # First legs of every live pair, then the second leg to its target
+        pos, owner = gather(graph.indptr, np.arange(graph.num_edges), origins[live])
+        pair = live[owner]
+        mid = graph.indices[pos].astype(np.int64)
+        ok = ~blocked[mid] & (mid != origins[pair]) & (mid != targets[pair])
+        pos, pair, mid = pos[ok], pair[ok], mid[ok]
+        second = graph.pair_index(mid, targets[pair])
+        hit = second >= 0
+        parts.append((pair[hit], np.full(hit.sum(), 2), mid[hit], none(hit.sum()), km(pos[hit]) + km(second[hit])))
+        found += np.bincount(pair[hit], minlength=origins.size)
+
+        need = live[found[live] < k]
+        if max_hops >= 3 and need.size:
+            parts.append(_three_hop(graph, origins, targets, need, blocked, k, km))
+
+    pair, hops, via_1, via_2, distance = (np.concatenate(cols) for cols in zip(*parts))
+    if pair.size == 0:
+        return pd.DataFrame(columns=["pair"] + PATH_COLUMNS)
+    perm, rank = _group_rank(pair, (hops, distance))
+    keep = rank < k
+    perm = perm[keep]
+    pair = pair[perm]
+    distance = distance[perm]
+    return pd.DataFrame({
+        "pair": pair,
+        "origin": origins[pair],
+        "destination": targets[pair],
+        "rank": rank[keep] + 1,
+        "hops": hops[perm].astype(int),
+        "via_1": via_1[perm],
+        "via_2": via_2[perm],
+        "distance_km": np.where(distance >= 1e7, np.nan, distance),
+    })
+
+
+def _three_hop(graph, origins, targets, need, blocked, k, km):
+    """origin -> M1 -> M2 -> target for the `need` pairs (see k_best_paths)."""
+    n = max(graph.num_nodes, 1)
+    # Backward half: (pair, M2) for each predecessor M2 of the pair's target
+    back_pos, owner = gather(graph.rev_indptr, graph.rev_pairs, targets[need])
+    pair = need[owner]
+    m2 = graph.pair_src[back_pos].astype(np.int64)
+    ok = ~blocked[m2] & (m2 != origins[pair]) & (m2 != targets[pair])
+    back_pos, pair, m2 = back_pos[ok], pair[ok], m2[ok]
+    is_m2 = np.zeros(graph.num_nodes, dtype=bool)
+    is_m2[m2] = True
+
+    # Forward half: (origin, M1, M2) with distance origin..M2, only the k+1 best
+    # M1 per (origin, M2) (one spare in case the best M1 is the target itself)
+    starts = np.unique(origins[need])
+    pos1, owner = gather(graph.indptr, np.arange(graph.num_edges), starts)
+    start = starts[owner]
+    m1 = graph.indices[pos1].astype(np.int64)
+    ok = ~blocked[m1] & (m1 != start)
+    pos1, start, m1 = pos1[ok], start[ok], m1[ok]
+    pos2, owner = gather(graph.indptr, np.arange(graph.num_edges), m1)
+    fwd_m2 = graph.indices[pos2].astype(np.int64)
+    ok = is_m2[fwd_m2] & ~blocked[fwd_m2] & (fwd_m2 != start[owner]) & (fwd_m2 != m1[owner])
+    pos2, owner, fwd_m2 = pos2[ok], owner[ok], fwd_m2[ok]
+    fwd_key = start[owner] * n + fwd_m2
+    fwd_km = km(pos1[owner]) + km(pos2)
+    perm, rank = _group_rank(fwd_key, (fwd_km,))
+    perm = perm[rank <= k]
+    fwd_key, fwd_m1, fwd_km = fwd_key[perm], m1[owner[perm]], fwd_km[perm]  # sorted by key
+
+    # Join on (origin, M2): every backward entry meets the kept forward entries
+    key = origins[pair] * n + m2
+    lo = np.searchsorted(fwd_key, key, side="left")
+    hi = np.searchsorted(fwd_key, key, side="right")
+    counts = hi - lo
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty, np.empty(0)
+    row = np.repeat(np.arange(key.size), counts)
+    fwd = np.repeat(lo, counts) + (np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts))
+    ok = fwd_m1[fwd] != targets[pair[row]]
+    row, fwd = row[ok], fwd[ok]
+    distance = fwd_km[fwd] + km(back_pos[row])
+    return pair[row], np.full(row.size, 3), fwd_m1[fwd], m2[row], distance
+
+
+def reroute_disrupted_pairs(
+    graph: RouteGraph,
+    closed: Iterable[int],
+    k: int = 3,
+    max_hops: int = 3,
+    limit_pairs: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    k best re-routings for every pair disrupted by closing `closed`.
+
+    Pairs another open airport still connects in one stop keep their
+    service and are not re-routed (see disrupted_pairs, one_stop_left).
+
+    Args:
+        graph (RouteGraph): Network to search.
+        closed (Iterable[int]): Closed node indices.
+        k (int): Re-routings per pair.
+        max_hops (int): Longest itinerary considered.
+        limit_pairs (Optional[int]): Only the pairs with the most connecting passengers.
+
+    Returns:
+        pd.DataFrame: One row per (pair, rank) with node indices, hops,
+        distance_km, the original distance through the hub and the detour.
+        Pairs with no path within max_hops appear once with rank 0.
+    """
+    closed = list(closed)
+    blocked = np.zeros(graph.num_nodes, dtype=bool)
+    blocked[np.asarray(closed, dtype=np.int64)] = True
+    pairs = disrupted_pairs(graph, closed)
+    pairs = pairs[~pairs["one_stop_left"].to_numpy(dtype=bool)].drop(columns="one_stop_left")
+    if limit_pairs is not None:
+        pairs = pairs.head(int(limit_pairs))
+    if pairs.empty:
+        return pd.DataFrame(columns=PATH_COLUMNS + ["hub", "connecting_passengers", "original_km", "detour_km"])
+
+    pairs = pairs.reset_index(drop=True)
+    paths = k_best_paths(
+        graph, pairs["origin"].to_numpy(dtype=np.int64), pairs["destination"].to_numpy(dtype=np.int64),
+        blocked, k, max_hops,
+    )
+    # Pairs without any path get one rank-0 row; rows stay busiest pair first, then by rank
+    missing = np.setdiff1d(np.arange(len(pairs)), paths["pair"].to_numpy(dtype=np.int64))
+    paths = pd.concat([
+        paths.drop(columns=["origin", "destination"]),
+        pd.DataFrame({"pair": missing, "rank": 0, "hops": 0, "via_1": -1, "via_2": -1, "distance_km": np.nan}),
+    ], ignore_index=True).sort_values(["pair", "rank"], kind="stable")
+    result = pairs.iloc[paths["pair"].to_numpy(dtype=np.int64)].reset_index(drop=True)
+    for col, dtype in (("rank", int), ("hops", int), ("via_1", np.int64), ("via_2", np.int64), ("distance_km", float)):
+        result[col] = paths[col].to_numpy().astype(dtype)
+    origin = result["origin"].to_numpy(dtype=np.int64)
+    hub = result["hub"].to_numpy(dtype=np.int64)
+    destination = result["destination"].to_numpy(dtype=np.int64)
+    result["original_km"] = graph.link_km(origin, hub) + graph.link_km(hub, destination)
+    result["detour_km"] = result["distance_km"] - result["original_km"]
+    return result
@@ -0,0 +1,447 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.config.data_version import current_data_version
+from backend.config.db_config import fetch_df, iter_df_chunks
+from backend.config.settings import (
+    OPENFLIGHTS_AIRPORTS,
+    OPENFLIGHTS_ROUTES,
+    ROUTE_GRAPH_REFRESH_SECONDS,
+    ROUTE_GRAPH_SOURCE,
+)
+from .geo import haversine_km
+
+
+def _csr(src: np.ndarray, dst: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """indptr/indices for edges already sorted by (src, dst)."""
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst.astype(np.int32)
+
+
+def gather(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenated CSR rows of `nodes` without a Python loop.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Neighbour node indices and, for each,
+        the position in `nodes` it came from.
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+    owner = np.repeat(np.arange(nodes.shape[0]), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return indices[starts[owner] + offsets], owner
+
+
+class RouteGraph:
+    """
+    Directed airport network in compressed sparse row (CSR) form.
+
+    Airports are renumbered 0..n-1 (`airport_ids[node]` maps back). Two
+    adjacencies are kept:
+
+    * `indptr` / `indices`: distinct airport-to-airport connections, the
+      simple digraph used for reachability and path searches, plus the
+      reverse (`rev_indptr` / `rev_indices`) for predecessor lookups.
+    * `edge_indptr` / `edge_dst` with the parallel `edge_*` arrays: one entry
+      per row of `routes` (several airlines can fly the same pair), sorted
+      by source then destination.
+
+    All arrays are read-only once built, so one instance can be shared by
+    request threads and copied into worker processes.
+    """
+
+    def __init__(
+        self,
+        airport_ids: np.ndarray,
+        src: np.ndarray,
+        dst: np.ndarray,
+        route_ids: np.ndarray,
+        airline_ids: np.ndarray,
+        stops: np.ndarray,
+        passengers: Optional[np.ndarray] = None,
+        latitude: Optional[np.ndarray] = None,
+        longitude: Optional[np.ndarray] = None,
+        labels: Optional[np.ndarray] = None,
+        distance_km: Optional[np.ndarray] = None,
+        version: str = "",
+    ):
+        """
+        Args:
+            airport_ids (np.ndarray): Sorted airport IDs, one per node.
+            src, dst (np.ndarray): Node indices of each route's endpoints.
+            route_ids, airline_ids, stops (np.ndarray): Per-route attributes (airline_id -1 if unknown).
+            passengers (Optional[np.ndarray]): Passengers per route (zeros if absent).
+            latitude, longitude (Optional[np.ndarray]): Per-node coordinates, NaN if unknown.
+            labels (Optional[np.ndarray]): Per-node display codes (IATA, else the airport ID).
+            distance_km (Optional[np.ndarray]): Per-route great-circle distance stored at
+                ingest; missing values are computed from the coordinates.
+            version (str): Identifies the source data, used to key derived caches.
+        """
+        self.airport_ids = np.ascontiguousarray(airport_ids, dtype=np.int64)
+        n = self.airport_ids.shape[0]
+        m = len(src)
+
+        order = np.lexsort((dst, src))
+        src = np.asarray(src, dtype=np.int64)[order]
+        dst = np.asarray(dst, dtype=np.int64)[order]
+        self.edge_indptr, self.edge_dst = _csr(src, dst, n)
+        self.edge_src = src.astype(np.int32)
+        self.edge_route_ids = np.asarray(route_ids, dtype=np.int64)[order]
+        self.edge_airline_ids = np.asarray(airline_ids, dtype=np.int64)[order]
+        self.edge_stops = np.asarray(stops, dtype=np.int16)[order]
+        self.edge_passengers = (
+            np.zeros(m, dtype=np.float64) if passengers is None
+            else np.asarray(passengers, dtype=np.float64)[order]
+        )
+
+        # Distinct pairs: routes are sorted by (src, dst), so duplicates are adjacent
+        distinct = np.ones(m, dtype=bool)
+        distinct[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        pair_src, pair_dst = src[distinct], dst[distinct]
+        self.indptr, self.indices = _csr(pair_src, pair_dst, n)
+        self.pair_src = pair_src.astype(np.int32)
+        # Sorted u * n + v keys for vectorized pair lookups
+        self.pair_keys = pair_src * max(n, 1) + pair_dst
+        # Routes backing distinct pair p are edge_*[pair_edge_indptr[p]:pair_edge_indptr[p + 1]]
+        self.pair_edge_indptr = np.append(np.flatnonzero(distinct), m).astype(np.int64)
+        rev = np.lexsort((pair_src, pair_dst))
+        self.rev_indptr, self.rev_indices = _csr(pair_dst[rev], pair_src[rev], n)
+        # Distinct pair behind each reverse entry (pair_src[rev_pairs] == rev_indices)
+        self.rev_pairs = rev.astype(np.int64)
+
+        nan = np.full(n, np.nan)
+        self.latitude = nan if latitude is None else np.asarray(latitude, dtype=np.float64)
+        self.longitude = nan.copy() if longitude is None else np.asarray(longitude, dtype=np.float64)
+        # Per-route and per-pair distances, so path costs are array reads
+        computed = haversine_km(self.latitude[src], self.longitude[src], self.latitude[dst], self.longitude[dst])
+        if distance_km is not None:
+            stored = np.asarray(distance_km, dtype=np.float64)[order]
+            computed = np.where(np.isnan(stored), computed, stored)
+        self.edge_km = computed
+        self.pair_km = self.edge_km[self.pair_edge_indptr[:-1]] if m else np.zeros(0, dtype=np.float64)
+        self.labels = self.airport_ids.astype(str).astype(object) if labels is None else np.asarray(labels, dtype=object)
+        self.version = version
+
+        for arr in self.__dict__.values():
+            if isinstance(arr, np.ndarray):
+                arr.flags.writeable = False
+
+    @property
+    def num_nodes(self) -> int:
+        return int(self.airport_ids.shape[0])
+
+    @property
+    def num_edges(self) -> int:
+        """Distinct directed airport pairs."""
+        return int(self.indices.shape[0])
+
+    @property
+    def num_routes(self) -> int:
+        return int(self.edge_dst.shape[0])
+
+    def node(self, airport_id: int) -> Optional[int]:
+        """Node index of an airport, or None if it has no routes and no coordinates."""
+        pos = int(np.searchsorted(self.airport_ids, airport_id))
+        if pos < self.num_nodes and self.airport_ids[pos] == airport_id:
+            return pos
+        return None
+
+    def nodes(self, airport_ids) -> np.ndarray:
+        """Vectorized `node`: -1 for unknown airports."""
+        airport_ids = np.asarray(airport_ids, dtype=np.int64)
+        if self.num_nodes == 0:
+            return np.full(airport_ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.airport_ids, airport_ids), self.num_nodes - 1)
+        return np.where(self.airport_ids[pos] == airport_ids, pos, -1)
+
+    def successors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def predecessors(self, node: int) -> np.ndarray:
+        return self.rev_indices[self.rev_indptr[node]:self.rev_indptr[node + 1]]
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def in_degree(self) -> np.ndarray:
+        return np.diff(self.rev_indptr)
+
+    def pair_index(self, u, v) -> np.ndarray:
+        """Index of each distinct pair (u[i], v[i]) in `indices`, -1 where there is no service."""
+        keys = np.asarray(u, dtype=np.int64) * max(self.num_nodes, 1) + np.asarray(v, dtype=np.int64)
+        if self.num_edges == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.pair_keys, keys), self.num_edges - 1)
+        return np.where(self.pair_keys[pos] == keys, pos, -1)
+
+    def pair_passengers(self) -> np.ndarray:
+        """Passengers summed over all routes of each distinct pair."""
+        if self.num_routes == 0:
+            return np.zeros(0, dtype=np.float64)
+        return np.add.reduceat(self.edge_passengers, self.pair_edge_indptr[:-1])
+
+    def route_slice(self, node: int) -> slice:
+        """Positions in the `edge_*` arrays of routes departing `node`."""
+        return slice(int(self.edge_indptr[node]), int(self.edge_indptr[node + 1]))
+
+    def has_edge(self, u: int, v: int) -> bool:
+        return bool(self.pair_index([u], [v])[0] >= 0)
+
+    def distance_km(self, u, v) -> np.ndarray:
+        """Great-circle distance between node arrays `u` and `v` (NaN without coordinates)."""
+        return haversine_km(self.latitude[u], self.longitude[u], self.latitude[v], self.longitude[v])
+
+    def link_km(self, u, v) -> np.ndarray:
+        """Stored distance of the links u[i] -> v[i] (NaN where there is no service or no coordinates)."""
+        pos = self.pair_index(u, v)
+        return np.where(pos >= 0, self.pair_km[np.maximum(pos, 0)], np.nan) if self.num_edges else np.full(pos.shape, np.nan)
+
+    def routes_touching(self, nodes) -> np.ndarray:
+        """Boolean mask over route edges that depart from or arrive at any of `nodes`."""
+        closed = np.zeros(self.num_nodes, dtype=bool)
+        closed[np.asarray(nodes, dtype=np.int64)] = True
+        return closed[self.edge_src] | closed[self.edge_dst]
+
+    def reachable(self, source: int, blocked: Optional[np.ndarray] = None, reverse: bool = False) -> np.ndarray:
+        """
+        Airports reachable from `source` (or that reach it, with `reverse`).
+
+        Args:
+            source (int): Start node.
+            blocked (Optional[np.ndarray]): Boolean node mask of airports that cannot be visited.
+            reverse (bool): Follow edges backwards.
+
+        Returns:
+            np.ndarray: Boolean node mask, including `source`.
+        """
+        indptr, indices = (self.rev_indptr, self.rev_indices) if reverse else (self.indptr, self.indices)
+        seen = np.zeros(self.num_nodes, dtype=bool) if blocked is None else blocked.copy()
+        seen[source] = True
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        visited[source] = True
+        frontier = np.array([source], dtype=np.int64)
+        while frontier.size:
+            nbrs, _ = gather(indptr, indices, frontier)
+            nbrs = np.unique(nbrs[~seen[nbrs]])
+            seen[nbrs] = True
+            visited[nbrs] = True
+            frontier = nbrs
+        return visited
+
+    def hops_from(self, source: int, blocked: Optional[np.ndarray] = None, max_hops: Optional[int] = None) -> np.ndarray:
+        """Breadth-first hop counts from `source` (-1 where unreachable)."""
+        hops = np.full(self.num_nodes, -1, dtype=np.int32)
+        seen = np.zeros(self.num_nodes, dtype=bool) if blocked is None else blocked.copy()
+        hops[source] = 0
+        seen[source] = True
+        frontier = np.array([source], dtype=np.int64)
+        level = 0
+        while frontier.size and (max_hops is None or level < max_hops):
+            level += 1
+            nbrs, _ = gather(self.indptr, self.indices, frontier)
+            nbrs = np.unique(nbrs[~seen[nbrs]])
+            seen[nbrs] = True
+            hops[nbrs] = level
+            frontier = nbrs
+        return hops
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "airports": self.num_nodes,
+            "airport_pairs": self.num_edges,
+            "routes": self.num_routes,
+            "airports_with_routes": int(((self.out_degree() + self.in_degree()) > 0).sum()),
+            "megabytes": sum(a.nbytes for a in self.__dict__.values() if isinstance(a, np.ndarray)) / 1e6,
+        }
+
+    @classmethod
+    def from_frames(cls, routes: pd.DataFrame, airports: Optional[pd.DataFrame] = None, version: str = "") -> "RouteGraph":
+        """
+        Build from route rows (route_id, source_airport_id, dest_airport_id,
+        airline_id, stops and optionally passengers, distance_km) and airport rows
+        (airport_id, latitude, longitude, optionally iata). Routes missing either endpoint are dropped.
+        """
+        routes = routes.dropna(subset=["source_airport_id", "dest_airport_id"])
+        src_ids = routes["source_airport_id"].to_numpy(dtype=np.int64)
+        dst_ids = routes["dest_airport_id"].to_numpy(dtype=np.int64)
+        known = [src_ids, dst_ids]
+        if airports is not None and not airports.empty:
+            airports = airports.dropna(subset=["airport_id"])
+            known.append(airports["airport_id"].to_numpy(dtype=np.int64))
+        airport_ids = np.unique(np.concatenate(known))
+
+        latitude = longitude = labels = None
+        if airports is not None and not airports.empty:
+            pos = np.searchsorted(airport_ids, airports["airport_id"].to_numpy(dtype=np.int64))
+            latitude = np.full(airport_ids.shape[0], np.nan)
+            longitude = np.full(airport_ids.shape[0], np.nan)
+            latitude[pos] = pd.to_numeric(airports["latitude"], errors="coerce").to_numpy(dtype=np.float64)
+            longitude[pos] = pd.to_numeric(airports["longitude"], errors="coerce").to_numpy(dtype=np.float64)
+            if "iata" in airports:
+                labels = airport_ids.astype(str).astype(object)
+                iata = airports["iata"].to_numpy(dtype=object)
+                named = pd.notna(iata) & (iata != "")
+                labels[pos[named]] = iata[named]
+
+        passengers = routes["passengers"].fillna(0).to_numpy(dtype=np.float64) if "passengers" in routes else None
+        distance_km = (
+            pd.to_numeric(routes["distance_km"], errors="coerce").to_numpy(dtype=np.float64)
+            if "distance_km" in routes else None
+        )
+        return cls(
+            airport_ids,
+            np.searchsorted(airport_ids, src_ids),
+            np.searchsorted(airport_ids, dst_ids),
+            routes["route_id"].to_numpy(dtype=np.int64),
+            routes["airline_id"].fillna(-1).to_numpy(dtype=np.int64),
+            routes["stops"].fillna(0).to_numpy(dtype=np.int64),
+            passengers=passengers,
+            latitude=latitude,
+            longitude=longitude,
+            labels=labels,
+            distance_km=distance_km,
+            version=version,
+        )
+
+
+ROUTES_SQL = """
+    SELECT r.route_id, r.source_airport_id, r.dest_airport_id, r.airline_id, r.stops, r.distance_km,
+           COALESCE(ps.passengers, 0) AS passengers
+    FROM routes r
+    LEFT JOIN (
+        SELECT route_id, SUM(passengers) AS passengers
+        FROM passenger_stats
+        GROUP BY route_id
+    ) ps ON ps.route_id = r.route_id
+    WHERE r.source_airport_id IS NOT NULL AND r.dest_airport_id IS NOT NULL
+"""
+
+
+# One aggregate row per source table; column sums register in-place updates and
+# delete+insert swaps as well as new rows
+GRAPH_SIGNATURE_SQL = (
+    """
+    SELECT COUNT(*), MAX(route_id), SUM(source_airport_id), SUM(dest_airport_id), SUM(airline_id),
+           SUM(stops), ROUND(SUM(distance_km), 3)
+    FROM routes
+    """,
+    "SELECT COUNT(*), MAX(stat_id), SUM(route_id), SUM(passengers) FROM passenger_stats",
+    "SELECT COUNT(*), ROUND(SUM(latitude), 6), ROUND(SUM(longitude), 6) FROM airports",
+)
+
+
+def fetch_graph_signature() -> str:
+    """
+    Cheap change marker for everything the graph is built from: `routes`
+    (including the distance_km backfill), summed `passenger_stats` and the
+    airport coordinates.
+    """
+    parts = []
+    for sql in GRAPH_SIGNATURE_SQL:
+        df = fetch_df(sql)
+        parts.append(":".join("" if pd.isna(v) else str(v) for v in df.iloc[0]) if not df.empty else "0")
+    # Digest, so the version fits the network_version columns it is stored in
+    return "db:" + hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def load_route_graph_from_db(chunksize: int = 50000) -> RouteGraph:
+    version = fetch_graph_signature()
+    routes = pd.concat(list(iter_df_chunks(ROUTES_SQL, chunksize=chunksize)), ignore_index=True)
+    airports = fetch_df("SELECT airport_id, iata, latitude, longitude FROM airports")
+    return RouteGraph.from_frames(routes, airports, version=version)
+
+
+def load_route_graph_from_files(
+    routes_path: Path = OPENFLIGHTS_ROUTES, airports_path: Optional[Path] = OPENFLIGHTS_AIRPORTS
+) -> RouteGraph:
+    """
+    Build straight from the OpenFlights files, no database needed.
+
+    route_id is the 1-based row number, which matches the AUTO_INCREMENT IDs
+    `load_routes` assigns on a fresh table. No passenger counts are available.
+    """
+    from backend.data_ingestion.load_airports import read_airports
+    from backend.data_ingestion.load_routes import read_routes
+
+    rows = list(read_routes(Path(routes_path)))
+    routes = pd.DataFrame(
+        [(i + 1, r[1], r[3], r[5], r[7]) for i, r in enumerate(rows)],
+        columns=["route_id", "airline_id", "source_airport_id", "dest_airport_id", "stops"],
+    )
+    airports = None
+    if airports_path is not None and Path(airports_path).exists():
+        airports = pd.DataFrame(
+            [(a[0], a[4], a[6], a[7]) for a in read_airports(Path(airports_path))],
+            columns=["airport_id", "iata", "latitude", "longitude"],
+        )
+    stat = Path(routes_path).stat()
+    return RouteGraph.from_frames(routes, airports, version=f"file:{stat.st_size}:{int(stat.st_mtime)}")
+
+
+def load_route_graph(source: str = ROUTE_GRAPH_SOURCE) -> RouteGraph:
+    if source == "file":
+        return load_route_graph_from_files()
+    return load_route_graph_from_db()
+
+
+_graph: Optional[RouteGraph] = None
+_checked_at: float = 0.0
+_checked_version: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_route_graph() -> RouteGraph:
+    """
+    Return the shared route graph, building it on first use.
+
+    With the database source, the fetch_graph_signature of the source tables
+    is re-read as soon as data_version moves (so responses cached under the
+    new stamp are computed from the new data) and otherwise at most every
+    ROUTE_GRAPH_REFRESH_SECONDS; the graph is rebuilt only if it changed.
+    """
+    global _graph, _checked_at, _checked_version
+    version = current_data_version() if ROUTE_GRAPH_SOURCE != "file" else None
+    with _lock:
+        now = time.monotonic()
+        if _graph is None:
+            _graph = load_route_graph()
+            _checked_at, _checked_version = now, version
+        elif ROUTE_GRAPH_SOURCE != "file" and (
+            version != _checked_version or now - _checked_at >= ROUTE_GRAPH_REFRESH_SECONDS
+        ):
+            _checked_at, _checked_version = now, version
+            if fetch_graph_signature() != _graph.version:
+                _graph = load_route_graph()
+        return _graph
+
+
+def invalidate_route_graph() -> None:
+    """Drop the shared graph so the next caller rebuilds it (call after loading routes)."""
+    global _graph
+    with _lock:
+        _graph = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the in-memory route graph and print its size")
+    parser.add_argument("--source", choices=("db", "file"), default=ROUTE_GRAPH_SOURCE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = load_route_graph(args.source)
+    print(f"Built in {time.perf_counter() - start:.2f}s: {graph.summary()}")
@@ -0,0 +1,205 @@
+from __future__ import annotations
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from backend.config.settings import SCENARIO_PARALLEL_MIN_BATCH
+from .connectivity import connected_pair_count, component_sizes, strong_components
+from .parallel import default_workers, get_graph_executor, worker_cache, worker_graph
+from .pathfinding import disrupted_pairs
+from .route_graph import RouteGraph, get_route_graph
+
+# A scenario is a list of closed airport IDs or {"name": ..., "airport_ids": [...]}
+Scenario = Union[Sequence[int], Dict[str, Any]]
+
+CLOSURE_METRICS = (
+    "impacted_routes",
+    "impacted_passengers",
+    "disrupted_pairs",
+    "one_stop_pairs",
+    "stranded_pairs",
+    "stranded_passengers",
+    "connected_pairs_lost",
+)
+
+
+def evaluate_closure(graph: RouteGraph, closed: Iterable[int], base_labels: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Network impact of closing a set of airports together.
+
+    Only the strongly connected components that contain a closed airport
+    are re-decomposed (a closure cannot merge or split any other
+    component), so large components are the only real cost.
+
+    Args:
+        graph (RouteGraph): Network snapshot.
+        closed (Iterable[int]): Closed node indices.
+        base_labels (Optional[np.ndarray]): strong_components(graph), reused across scenarios.
+
+    Returns:
+        Dict[str, Any]: impacted_routes / impacted_passengers (routes to or from
+        a closed airport), disrupted_pairs (connections through a closed
+        airport with no direct flight and no other one-stop itinerary left),
+        one_stop_pairs (those another open airport still connects in one
+        stop), stranded_pairs / stranded_passengers (disrupted pairs with no
+        path left at all), and connected_pairs_before / _after / _lost with the
+        largest component before and after.
+    """
+    closed = np.unique(np.asarray(list(closed), dtype=np.int64))
+    blocked = np.zeros(graph.num_nodes, dtype=bool)
+    blocked[closed] = True
+    if base_labels is None:
+        base_labels = strong_components(graph)
+
+    removed = graph.routes_touching(closed)
+
+    # Re-split only the components the closed airports belonged to
+    labels = base_labels.copy()
+    touched = np.isin(base_labels, np.unique(base_labels[closed]))
+    labels[touched] = -1
+    sub = strong_components(graph, blocked=blocked, nodes=np.flatnonzero(touched))
+    relabel = sub >= 0
+    labels[relabel] = sub[relabel] + base_labels.max() + 1
+
+    # A disrupted pair is stranded when no path is left; same component means
+    # reachable, anything else needs a search from the origin
+    pairs = disrupted_pairs(graph, closed)
+    one_stop = pairs["one_stop_left"].to_numpy(dtype=bool)
+    pairs = pairs[~one_stop]
+    origin = pairs["origin"].to_numpy(dtype=np.int64)
+    destination = pairs["destination"].to_numpy(dtype=np.int64)
+    connected = labels[origin] == labels[destination]
+    for o in np.unique(origin[~connected]):
+        rows = np.flatnonzero((origin == o) & ~connected)
+        connected[rows] = graph.reachable(int(o), blocked)[destination[rows]]
+    stranded = ~connected
+
+    before = connected_pair_count(base_labels)
+    after = connected_pair_count(labels)
+    sizes_before = component_sizes(base_labels)
+    sizes_after = component_sizes(labels)
+    return {
+        "closed_airports": int(closed.size),
+        "impacted_routes": int(removed.sum()),
+        "impacted_passengers": float(graph.edge_passengers[removed].sum()),
+        "disrupted_pairs": int(len(pairs)),
+        "one_stop_pairs": int(one_stop.sum()),
+        "stranded_pairs": int(stranded.sum()),
+        "stranded_passengers": float(pairs["connecting_passengers"].to_numpy()[stranded].sum()),
+        "connected_pairs_before": before,
+        "connected_pairs_after": after,
+        "connected_pairs_lost": before - after,
+        "largest_component_before": int(sizes_before.max()) if sizes_before.size else 0,
+        "largest_component_after": int(sizes_after.max()) if sizes_after.size else 0,
+    }
+
+
+def _evaluate_in_worker(closed: np.ndarray) -> Dict[str, Any]:
+    cache = worker_cache()
+    if "scc_labels" not in cache:
+        cache["scc_labels"] = strong_components(worker_graph())
+    return evaluate_closure(worker_graph(), closed, cache["scc_labels"])
+
+
+_base_labels: Dict[str, np.ndarray] = {}
+_lock = threading.Lock()
+
+
+def _base_components(graph: RouteGraph) -> np.ndarray:
+    with _lock:
+        labels = _base_labels.get(graph.version)
+        if labels is None:
+            _base_labels.clear()
+            labels = _base_labels[graph.version] = strong_components(graph)
+        return labels
+
+
+def _normalize(scenarios: Iterable[Scenario]) -> List[Tuple[str, List[int]]]:
+    normalized = []
+    for i, scenario in enumerate(scenarios):
+        if isinstance(scenario, dict):
+            name = str(scenario.get("name") or f"scenario_{i + 1}")
+            airport_ids = scenario.get("airport_ids", [])
+        else:
+            name, airport_ids = f"scenario_{i + 1}", scenario
+        normalized.append((name, [int(a) for a in airport_ids]))
+    return normalized
+
+
+def run_scenarios(
+    scenarios: Iterable[Scenario],
+    workers: Optional[int] = None,
+    graph: Optional[RouteGraph] = None,
+) -> pd.DataFrame:
+    """
+    Evaluate a batch of closure scenarios, in parallel when it pays off.
+
+    Batches of at least SCENARIO_PARALLEL_MIN_BATCH scenarios go to a
+    process pool whose workers each hold one copy of the route graph
+    (shipped once through the pool initializer, not per task); smaller
+    batches run in-process.
+
+    Args:
+        scenarios (Iterable[Scenario]): Lists of airport IDs or {"name", "airport_ids"} dicts.
+        workers (Optional[int]): Pool workers to split the batch for (defaults to GRAPH_POOL_WORKERS
+            or the CPU count; 1 runs in-process). The shared pool itself is sized once from settings.
+        graph (Optional[RouteGraph]): Snapshot to use (defaults to the shared graph).
+
+    Returns:
+        pd.DataFrame: One row per scenario: name, airport_ids, unknown_airport_ids
+        and the evaluate_closure metrics.
+    """
+    graph = graph or get_route_graph()
+    normalized = _normalize(scenarios)
+    node_sets = []
+    for _, airport_ids in normalized:
+        nodes = graph.nodes(airport_ids)
+        node_sets.append(nodes[nodes >= 0])
+
+    workers = workers or default_workers()
+    if workers > 1 and len(node_sets) >= SCENARIO_PARALLEL_MIN_BATCH:
+        executor = get_graph_executor(graph)
+        chunksize = max(1, len(node_sets) // (4 * workers))
+        metrics = list(executor.map(_evaluate_in_worker, node_sets, chunksize=chunksize))
+    else:
+        labels = _base_components(graph)
+        metrics = [evaluate_closure(graph, nodes, labels) for nodes in node_sets]
+
+    rows = []
+    for (name, airport_ids), nodes, result in zip(normalized, node_sets, metrics):
+        known = set(graph.airport_ids[nodes].tolist())
+        rows.append({
+            "scenario": name,
+            "airport_ids": airport_ids,
+            "unknown_airport_ids": [a for a in airport_ids if a not in known],
+            **result,
+        })
+    return pd.DataFrame(rows)
+
+
+def rank_airport_closures(
+    limit: int = 25,
+    sort_by: str = "connected_pairs_lost",
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Close each of the `limit` best-connected airports on its own and rank them by impact.
+
+    Returns:
+        pd.DataFrame: run_scenarios output plus airport_id and airport label,
+        sorted by `sort_by` (descending).
+    """
+    if sort_by not in CLOSURE_METRICS:
+        raise ValueError(f"sort_by must be one of {CLOSURE_METRICS}")
+    graph = get_route_graph()
+    degree = graph.out_degree() + graph.in_degree()
+    candidates = np.argsort(-degree, kind="stable")[:limit]
+    candidates = candidates[degree[candidates] > 0]
+    airport_ids = graph.airport_ids[candidates].tolist()
+    scenarios = [{"name": graph.labels[node], "airport_ids": [a]} for node, a in zip(candidates, airport_ids)]
+    df = run_scenarios(scenarios, workers=workers, graph=graph)
+    df.insert(0, "airport_id", airport_ids)
+    df.insert(1, "degree", degree[candidates])
+    return df.sort_values(sort_by, ascending=False, kind="stable").reset_index(drop=True)
@@ -0,0 +1,239 @@
+from __future__ import annotations
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from backend.config.settings import WHATIF_MAX_SESSIONS, WHATIF_SESSION_TTL_SECONDS
+from .connectivity import component_sizes, connected_pair_count, strong_components
+from .route_graph import RouteGraph, get_route_graph
+from .scenarios import _base_components, evaluate_closure
+
+
+class WhatIfSession:
+    """
+    Editable view of the network: a base snapshot plus a delta of added and
+    removed routes.
+
+    The overlay graph is rebuilt from the base arrays and the delta (no
+    database round trip), and strongly connected components are carried
+    forward incrementally: added links only merge the components on the new
+    cycle (forward search from the head intersected with backward search
+    from the tail), removed links only re-split the components they were
+    inside. Added routes get negative route IDs so they can be removed again.
+    """
+
+    def __init__(self, base: RouteGraph, labels: np.ndarray):
+        self.id = uuid.uuid4().hex
+        self.base = base
+        self.graph = base
+        self.labels = labels
+        self.revision = 0
+        self.next_route_id = -1
+        self.added: Dict[int, Dict[str, Any]] = {}
+        self.removed: set = set()
+        self.created_at = self.touched_at = time.time()
+        self.lock = threading.Lock()
+
+    def _build(self) -> RouteGraph:
+        base = self.base
+        keep = ~np.isin(base.edge_route_ids, np.fromiter(self.removed, dtype=np.int64, count=len(self.removed)))
+        added = list(self.added.items())
+        nodes = base.nodes([r["source_airport_id"] for _, r in added] + [r["dest_airport_id"] for _, r in added])
+        src, dst = nodes[:len(added)], nodes[len(added):]
+        nan = np.full(len(added), np.nan)
+        return RouteGraph(
+            base.airport_ids,
+            np.concatenate([base.edge_src[keep], src]),
+            np.concatenate([base.edge_dst[keep], dst]),
+            np.concatenate([base.edge_route_ids[keep], [rid for rid, _ in added]]),
+            np.concatenate([base.edge_airline_ids[keep], [r["airline_id"] for _, r in added]]),
+            np.concatenate([base.edge_stops[keep], np.zeros(len(added))]),
+            passengers=np.concatenate([base.edge_passengers[keep], [r["passengers"] for _, r in added]]),
+            latitude=base.latitude,
+            longitude=base.longitude,
+            labels=base.labels,
+            distance_km=np.concatenate([base.edge_km[keep], nan]),
+            version=f"{base.version}+whatif:{self.id}:{self.revision}",
+        )
+
+    def edit(self, add: Iterable[Dict[str, Any]] = (), remove: Iterable[int] = ()) -> Dict[str, Any]:
+        """
+        Apply one batch of edits.
+
+        Args:
+            add (Iterable[Dict[str, Any]]): Routes with source_airport_id,
+                dest_airport_id and optionally airline_id and passengers.
+            remove (Iterable[int]): Route IDs to drop (base routes or earlier additions).
+
+        Returns:
+            Dict[str, Any]: added_route_ids, removed_route_ids, the airports whose
+            connections changed with their degree before and after, and the
+            session summary.
+        """
+        # Convert and validate the whole batch before touching the session, so a
+        # rejected batch leaves no partial edits behind
+        add = [
+            {
+                "source_airport_id": int(route["source_airport_id"]),
+                "dest_airport_id": int(route["dest_airport_id"]),
+                "airline_id": -1 if route.get("airline_id") is None else int(route["airline_id"]),
+                "passengers": float(route.get("passengers") or 0.0),
+            }
+            for route in (dict(r) for r in add)
+        ]
+        remove = [int(r) for r in remove]
+        if any(not route["passengers"] >= 0 for route in add):
+            raise ValueError("passengers must be a non-negative number")
+        known = self.base.nodes([r["source_airport_id"] for r in add] + [r["dest_airport_id"] for r in add])
+        if (known < 0).any():
+            raise ValueError("added routes must connect airports known to the network")
+        existing = set(self.graph.edge_route_ids.tolist())
+        unknown = [r for r in remove if r not in existing]
+        if unknown:
+            raise ValueError(f"unknown route_ids: {unknown}")
+
+        before = self.graph
+        new_ids = []
+        for route in add:
+            route_id = self.next_route_id
+            self.next_route_id -= 1
+            new_ids.append(route_id)
+            self.added[route_id] = route
+        for route_id in remove:
+            if route_id < 0:
+                self.added.pop(route_id, None)
+            else:
+                self.removed.add(route_id)
+        self.revision += 1
+        self.graph = self._build()
+        self.labels = self._update_components(before, self.graph)
+        self.touched_at = time.time()
+
+        touched = np.unique(np.concatenate([
+            before.edge_src[np.isin(before.edge_route_ids, remove)],
+            before.edge_dst[np.isin(before.edge_route_ids, remove)],
+            known,
+        ]).astype(np.int64))
+        degree_before = before.out_degree() + before.in_degree()
+        degree_after = self.graph.out_degree() + self.graph.in_degree()
+        return {
+            "added_route_ids": new_ids,
+            "removed_route_ids": remove,
+            "airports": [
+                {
+                    "airport_id": int(self.graph.airport_ids[x]),
+                    "iata": self.graph.labels[x],
+                    "degree_before": int(degree_before[x]),
+                    "degree_after": int(degree_after[x]),
+                }
+                for x in touched
+            ],
+            "summary": self.summary(),
+        }
+
+    def _update_components(self, before: RouteGraph, after: RouteGraph) -> np.ndarray:
+        """Strongly connected components of `after`, derived from those of `before`."""
+        old_keys, new_keys = set(before.pair_keys.tolist()), set(after.pair_keys.tolist())
+        n = max(after.num_nodes, 1)
+        gained = [divmod(k, n) for k in new_keys - old_keys]
+        lost = [divmod(k, n) for k in old_keys - new_keys]
+        labels = self.labels.copy()
+        if gained and lost:
+            return strong_components(after)
+        for u, v in lost:
+            # Only a link inside a component can split it
+            if labels[u] == labels[v] and labels[u] >= 0:
+                members = np.flatnonzero(labels == labels[u])
+                sub = strong_components(after, nodes=members)
+                labels[members] = sub[members] + labels.max() + 1
+        for u, v in gained:
+            if labels[u] != labels[v]:
+                cycle = after.reachable(v) & after.reachable(u, reverse=True)
+                if cycle.any():
+                    labels[cycle] = labels.max() + 1
+        return labels
+
+    def reachable(self, origin_id: int, destination_id: int) -> Optional[bool]:
+        """Whether the session network connects two airports (None if either is unknown)."""
+        o, d = self.graph.node(origin_id), self.graph.node(destination_id)
+        if o is None or d is None:
+            return None
+        if self.labels[o] == self.labels[d]:
+            return True
+        return bool(self.graph.reachable(o)[d])
+
+    def closure(self, airport_ids: Iterable[int]) -> Dict[str, Any]:
+        """evaluate_closure on the base network and on the session network, side by side."""
+        airport_ids = [int(a) for a in airport_ids]
+        nodes = self.graph.nodes(airport_ids)
+        nodes = nodes[nodes >= 0]
+        base = evaluate_closure(self.base, nodes, _base_components(self.base))
+        session = evaluate_closure(self.graph, nodes, self.labels)
+        return {
+            "airport_ids": airport_ids,
+            "base": base,
+            "session": session,
+            "delta": {k: session[k] - base[k] for k in session if isinstance(session[k], (int, float))},
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        sizes = component_sizes(self.labels)
+        return {
+            "session_id": self.id,
+            "base_version": self.base.version,
+            "revision": self.revision,
+            "added_routes": [{"route_id": rid, **route} for rid, route in sorted(self.added.items(), reverse=True)],
+            "removed_route_ids": sorted(self.removed),
+            "routes": self.graph.num_routes,
+            "airport_pairs": self.graph.num_edges,
+            "connected_pairs": connected_pair_count(self.labels),
+            "largest_component": int(sizes.max()) if sizes.size else 0,
+        }
+
+
+_sessions: Dict[str, WhatIfSession] = {}
+_lock = threading.Lock()
+
+
+def _expire(now: float) -> None:
+    for session_id in [s.id for s in _sessions.values() if now - s.touched_at > WHATIF_SESSION_TTL_SECONDS]:
+        del _sessions[session_id]
+
+
+def create_session() -> WhatIfSession:
+    """New session over the current shared route graph (oldest session evicted beyond WHATIF_MAX_SESSIONS)."""
+    base = get_route_graph()
+    session = WhatIfSession(base, _base_components(base))
+    with _lock:
+        _expire(time.time())
+        while len(_sessions) >= WHATIF_MAX_SESSIONS:
+            del _sessions[min(_sessions.values(), key=lambda s: s.touched_at).id]
+        _sessions[session.id] = session
+    return session
+
+
+def get_session(session_id: str) -> Optional[WhatIfSession]:
+    with _lock:
+        _expire(time.time())
+        session = _sessions.get(session_id)
+        if session is not None:
+            session.touched_at = time.time()
+        return session
+
+
+def delete_session(session_id: str) -> bool:
+    with _lock:
+        return _sessions.pop(session_id, None) is not None
+
+
+def list_sessions() -> List[Dict[str, Any]]:
+    with _lock:
+        _expire(time.time())
+        return [
+            {"session_id": s.id, "revision": s.revision, "base_version": s.base.version,
+             "created_at": s.created_at, "touched_at": s.touched_at}
+            for s in _sessions.values()
+        ]
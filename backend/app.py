@@ -1,7 +1,9 @@
 from __future__ import annotations
+import asyncio
 import os
 import sys
-from flask import Flask, jsonify, request
+from datetime import datetime, timezone
+from flask import Flask, Response, jsonify, request, url_for
 
 # Ensure the project root (one level up from this backend folder) is on sys.path
 # so imports like `from backend.analytics...` work when running scripts from inside
@@ -13,18 +15,164 @@ _PROJECT_ROOT = os.path.dirname(_THIS_DIR)
 # but if this file is executed as a top-level script (Streamlit often does this),
 # fall back to inserting the project root and using absolute imports.
 try:
-    from .analytics.hub_analysis import busiest_hubs, top_city_pairs_by_frequency, hub_load_and_delay
-    from .analytics.disruption_simulation import simulate_airport_closure, suggest_alternate_routes
-    from .vector_engine.similarity_search import similar_routes_by_route_id, similar_routes_by_text
+    from .config.db_config import pool_stats
+    from .config.settings import (
+        ALTERNATES_MAX_PAIRS,
+        API_PAGE_SIZE_DEFAULT,
+        API_PAGE_SIZE_MAX,
+        CLOSURE_RANKING_MAX_LIMIT,
+        MONTE_CARLO_MAX_TRIALS,
+        NDJSON_CHUNK_ROWS,
+        SIMILAR_BATCH_MAX_QUERIES,
+        SIMILAR_MAX_TOP_K,
+    )
+    from .columnar import COLUMNAR_FORMATS, columnar_bytes, iter_columnar
+    from .pagination import iter_ndjson
+    from .response_cache import ResponseCache, cached
+    from .analytics.hub_summaries import city_pair_filters, hub_summary, hub_summary_page, iter_hub_summary
+    from .analytics.disruption_simulation import (
+        closure_impact,
+        closure_impact_page,
+        iter_closure_impact,
+        suggest_alternate_routes,
+    )
+    from .analytics.monte_carlo import FAILURE_LEVELS, RISK_COLUMNS, simulate_cascading_failures, summarize_trials
+    from .analytics.carrier_grounding import simulate_carrier_grounding
+    from .analytics.centrality import criticality_for, hub_criticality
+    from .analytics.dashboard_queries import delay_risk_overview, iter_delay_risks
+    from .analytics.connectivity_index import closure_connectivity
+    from .analytics.parallel import default_workers
+    from .analytics.route_graph import get_route_graph
+    from .analytics.scenarios import CLOSURE_METRICS, rank_airport_closures, run_scenarios
+    from .analytics.what_if import create_session, delete_session, get_session, list_sessions
+    from .vector_engine.model_loader import get_query_cache
+    from .vector_engine.similarity_search import similar_routes_batch, similar_routes_by_route_id, similar_routes_by_text
 except (ImportError, ValueError):
     # Add project root to sys.path and import using package-style names
     if _PROJECT_ROOT not in sys.path:
         sys.path.insert(0, _PROJECT_ROOT)
-    from backend.analytics.hub_analysis import busiest_hubs, top_city_pairs_by_frequency, hub_load_and_delay
-    from backend.analytics.disruption_simulation import simulate_airport_closure, suggest_alternate_routes
-    from backend.vector_engine.similarity_search import similar_routes_by_route_id, similar_routes_by_text
+    from backend.config.db_config import pool_stats
+    from backend.config.settings import (
+        ALTERNATES_MAX_PAIRS,
+        API_PAGE_SIZE_DEFAULT,
+        API_PAGE_SIZE_MAX,
+        CLOSURE_RANKING_MAX_LIMIT,
+        MONTE_CARLO_MAX_TRIALS,
+        NDJSON_CHUNK_ROWS,
+        SIMILAR_BATCH_MAX_QUERIES,
+        SIMILAR_MAX_TOP_K,
+    )
+    from backend.columnar import COLUMNAR_FORMATS, columnar_bytes, iter_columnar
+    from backend.pagination import iter_ndjson
+    from backend.response_cache import ResponseCache, cached
+    from backend.analytics.hub_summaries import city_pair_filters, hub_summary, hub_summary_page, iter_hub_summary
+    from backend.analytics.disruption_simulation import (
+        closure_impact,
+        closure_impact_page,
+        iter_closure_impact,
+        suggest_alternate_routes,
+    )
+    from backend.analytics.monte_carlo import FAILURE_LEVELS, RISK_COLUMNS, simulate_cascading_failures, summarize_trials
+    from backend.analytics.carrier_grounding import simulate_carrier_grounding
+    from backend.analytics.centrality import criticality_for, hub_criticality
+    from backend.analytics.dashboard_queries import delay_risk_overview, iter_delay_risks
+    from backend.analytics.connectivity_index import closure_connectivity
+    from backend.analytics.parallel import default_workers
+    from backend.analytics.route_graph import get_route_graph
+    from backend.analytics.scenarios import CLOSURE_METRICS, rank_airport_closures, run_scenarios
+    from backend.analytics.what_if import create_session, delete_session, get_session, list_sessions
+    from backend.vector_engine.model_loader import get_query_cache
+    from backend.vector_engine.similarity_search import similar_routes_batch, similar_routes_by_route_id, similar_routes_by_text
 
 app = Flask(__name__)
+# Serialized GET responses, retired when the loaders bump data_version
+response_cache = ResponseCache()
+
+
+def _with_freshness(response, computed_at):
+    """Tag a response served from a materialized table with when it was computed."""
+    if computed_at is None:
+        response.headers["X-Data-Source"] = "live"
+        return response
+    response.headers["X-Data-Source"] = "materialized"
+    response.headers["X-Data-Refreshed-At"] = computed_at.isoformat()
+    age = (datetime.now(timezone.utc) - computed_at).total_seconds()
+    response.headers["X-Data-Age-Seconds"] = f"{max(age, 0.0):.0f}"
+    return response
+
+
+def _live() -> bool:
+    # ?live=1 bypasses the materialized tables
+    return request.args.get("live", "0").lower() in ("1", "true", "yes")
+
+
+def _not_live() -> bool:
+    return not _live()
+
+
+def _table(df, metadata=None):
+    """
+    `df` as JSON records, as Arrow IPC / Parquet with ?format=arrow|parquet
+    (non-tabular extras then travel as JSON in the schema metadata), or as
+    newline-delimited JSON with ?format=ndjson.
+    """
+    fmt = request.args.get("format", "json")
+    if fmt == "json":
+        return jsonify(df.to_dict(orient="records"))
+    if fmt == "ndjson":
+        return _ndjson([df])
+    if fmt not in COLUMNAR_FORMATS:
+        return jsonify({"error": f"format must be one of {['json', 'ndjson', *COLUMNAR_FORMATS]}"}), 400
+    return Response(columnar_bytes(df, fmt, metadata), mimetype=COLUMNAR_FORMATS[fmt])
+
+
+def _ndjson(chunks):
+    """Stream DataFrame chunks as NDJSON, one row per line, while later chunks are still being read."""
+    return Response(iter_ndjson(chunks), mimetype="application/x-ndjson")
+
+
+def _page_args():
+    """(cursor, page_size) when the request asks for a page (?cursor= / ?page_size=), else None."""
+    if "cursor" not in request.args and "page_size" not in request.args:
+        return None
+    page_size = request.args.get("page_size", API_PAGE_SIZE_DEFAULT, type=int)
+    return request.args.get("cursor") or None, min(max(page_size, 1), API_PAGE_SIZE_MAX)
+
+
+def _paged(response, next_cursor):
+    """Point a page at the next one (X-Next-Cursor and an RFC 8288 Link header); no-op on the last page."""
+    if next_cursor:
+        args = {**request.args.to_dict(flat=False), **(request.view_args or {}), "cursor": next_cursor}
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{url_for(request.endpoint, _external=True, **args)}>; rel="next"'
+    return response
+
+
+def _summary_response(name, default_limit, where=(), extend=None):
+    """
+    A hub_summaries aggregate: the top ?limit= rows, keyset pages with
+    ?cursor= / ?page_size= (the first page is ?limit= rows when `where`
+    filters apply), or every matching row with ?format=ndjson. `extend`
+    adds columns to each returned frame.
+    """
+    if request.args.get("format") == "ndjson":
+        chunks, computed_at = iter_hub_summary(name, NDJSON_CHUNK_ROWS, where=where, live=_live())
+        if extend is not None:
+            chunks = (extend(chunk) for chunk in chunks)
+        return _with_freshness(_ndjson(chunks), computed_at)
+    paging = _page_args()
+    if paging is None and not where:
+        df, computed_at = hub_summary(name, limit=int(request.args.get("limit", default_limit)), live=_live())
+        next_cursor = None
+    else:
+        cursor, page_size = paging or (None, int(request.args.get("limit", default_limit)))
+        try:
+            df, next_cursor, computed_at = hub_summary_page(name, cursor, page_size, where=where, live=_live())
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+    if extend is not None:
+        df = extend(df)
+    return _paged(_with_freshness(app.make_response(_table(df)), computed_at), next_cursor)
 
 
 @app.get("/health")
@@ -32,56 +180,349 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/health/db-pool")
+def health_db_pool():
+    return jsonify(pool_stats())
+
+
+@app.get("/health/query-cache")
+def health_query_cache():
+    return jsonify(get_query_cache().stats())
+
+
+@app.get("/health/response-cache")
+def health_response_cache():
+    return jsonify(response_cache.stats())
+
+
+@app.get("/health/route-graph")
+def health_route_graph():
+    return jsonify(get_route_graph().summary())
+
+
 @app.get("/hubs/busiest")
+@cached(response_cache, when=_not_live)
 def hubs_busiest():
+    extend = None
+    if request.args.get("include") == "criticality":
+        def extend(df):
+            if df.empty:
+                return df
+            return df.merge(criticality_for(df["airport_id"]).drop_duplicates("airport_id"), on="airport_id", how="left")
+    return _summary_response("busiest_hubs", 20, extend=extend)
+
+
+@app.get("/hubs/criticality")
+@cached(response_cache)
+def hubs_criticality():
     limit = int(request.args.get("limit", 20))
-    df = busiest_hubs(limit=limit)
-    return jsonify(df.to_dict(orient="records"))
+    df = hub_criticality(limit=limit)
+    return _table(df)
 
 
 @app.get("/routes/top-city-pairs")
+@cached(response_cache, when=_not_live)
 def routes_top_city_pairs():
-    limit = int(request.args.get("limit", 20))
-    df = top_city_pairs_by_frequency(limit=limit)
-    return jsonify(df.to_dict(orient="records"))
+    # ?source_city= / ?dest_city= (substrings) and ?min_flights= filter on the server
+    where = city_pair_filters(
+        request.args.get("source_city"), request.args.get("dest_city"), request.args.get("min_flights", type=int)
+    )
+    return _summary_response("top_city_pairs", 20, where=where)
 
 
 @app.get("/hubs/load-delay")
+@cached(response_cache, when=_not_live)
 def hubs_load_delay():
-    limit = int(request.args.get("limit", 50))
-    df = hub_load_and_delay(limit=limit)
-    return jsonify(df.to_dict(orient="records"))
+    return _summary_response("hub_load_delay", 50)
 
 
 @app.get("/simulate/closure")
+@cached(response_cache, when=_not_live)
 def simulate_closure():
     airport_id = int(request.args["airport_id"])  # required
-    df = simulate_airport_closure(airport_id)
-    return jsonify(df.to_dict(orient="records"))
+    if request.args.get("format") == "ndjson":
+        chunks, computed_at = iter_closure_impact(airport_id, NDJSON_CHUNK_ROWS, live=_live())
+        return _with_freshness(_ndjson(chunks), computed_at)
+    paging = _page_args()
+    next_cursor = None
+    if paging is None:
+        df, computed_at = closure_impact(airport_id, live=_live())
+    else:
+        try:
+            df, next_cursor, computed_at = closure_impact_page(airport_id, *paging, live=_live())
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+    if request.args.get("include") == "connectivity":
+        # Precomputed by connectivity_index.refresh_connectivity_index; None if not indexed yet
+        connectivity = closure_connectivity(airport_id)
+        if request.args.get("format", "json") == "json":
+            response = jsonify({"routes": df.to_dict(orient="records"), "connectivity": connectivity})
+        else:
+            response = app.make_response(_table(df, metadata={"connectivity": connectivity}))
+    else:
+        response = app.make_response(_table(df))
+    return _paged(_with_freshness(response, computed_at), next_cursor)
+
+
+def _alternates_args():
+    """top_k, max_hops and limit of a re-routing request, and the error message when one is out of range."""
+    top_k = request.args.get("top_k", 3, type=int)  # re-routings per disrupted pair
+    max_hops = request.args.get("max_hops", 3, type=int)
+    limit = request.args.get("limit", 10, type=int)  # busiest disrupted pairs only
+    if top_k < 1:
+        return (top_k, max_hops, limit), "top_k must be at least 1"
+    if not 1 <= max_hops <= 3:
+        return (top_k, max_hops, limit), "max_hops must be between 1 and 3"
+    if not 1 <= limit <= ALTERNATES_MAX_PAIRS:
+        return (top_k, max_hops, limit), f"limit must be between 1 and {ALTERNATES_MAX_PAIRS}"
+    return (top_k, max_hops, limit), None
 
 
 @app.get("/simulate/alternates")
+@cached(response_cache)
 def simulate_alternates():
     airport_id = int(request.args["airport_id"])  # required
-    top_k = int(request.args.get("top_k", 10))
-    df = suggest_alternate_routes(airport_id, top_k=top_k)
-    return jsonify(df.to_dict(orient="records"))
+    (top_k, max_hops, limit), error = _alternates_args()
+    if error:
+        return jsonify({"error": error}), 400
+    df = suggest_alternate_routes(airport_id, top_k=top_k, max_hops=max_hops, limit_pairs=limit)
+    return _table(df)
+
+
+@app.get("/simulate/closure-alternates")
+@cached(response_cache, when=_not_live)
+async def simulate_closure_alternates():
+    # /simulate/closure and /simulate/alternates in one round trip, computed concurrently
+    airport_id = int(request.args["airport_id"])  # required
+    (top_k, max_hops, limit), error = _alternates_args()
+    if error:
+        return jsonify({"error": error}), 400
+    (routes, computed_at), alternates = await asyncio.gather(
+        asyncio.to_thread(closure_impact, airport_id, live=_live()),
+        asyncio.to_thread(suggest_alternate_routes, airport_id, top_k=top_k, max_hops=max_hops, limit_pairs=limit),
+    )
+    response = jsonify({"routes": routes.to_dict(orient="records"), "alternates": alternates.to_dict(orient="records")})
+    return _with_freshness(response, computed_at)
+
+
+@app.get("/simulate/grounding")
+@cached(response_cache)
+def simulate_grounding():
+    # ?airline_ids=24,1355 (or repeated airline_id=...)
+    raw = request.args.getlist("airline_id") + request.args.get("airline_ids", "").split(",")
+    try:
+        airline_ids = [int(a) for a in raw if a.strip()]
+    except ValueError:
+        return jsonify({"error": "airline_ids must be integers"}), 400
+    if not airline_ids:
+        return jsonify({"error": "airline_ids is required"}), 400
+    limit = request.args.get("limit", 500, type=int)  # affected pairs returned, busiest first
+    if limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    return jsonify(simulate_carrier_grounding(airline_ids, limit_pairs=limit))
+
+
+@app.post("/simulate/scenarios")
+def simulate_scenarios():
+    # {"scenarios": [[airport_id, ...], {"name": "...", "airport_ids": [...]}, ...]}
+    body = request.get_json(force=True, silent=True) or {}
+    scenarios = body.get("scenarios", [])
+    if not isinstance(scenarios, list) or not scenarios:
+        return jsonify({"error": "scenarios must be a non-empty list"}), 400
+    workers = body.get("workers")  # optional; never more than the shared pool has
+    if workers is not None and (isinstance(workers, bool) or not isinstance(workers, int) or workers < 1):
+        return jsonify({"error": "workers must be a positive integer"}), 400
+    df = run_scenarios(scenarios, workers=min(workers, default_workers()) if workers else None)
+    return _table(df)
+
+
+@app.get("/simulate/closure-ranking")
+@cached(response_cache)
+def simulate_closure_ranking():
+    limit = request.args.get("limit", 25, type=int)
+    sort_by = request.args.get("sort_by", "connected_pairs_lost")
+    if sort_by not in CLOSURE_METRICS:
+        return jsonify({"error": f"sort_by must be one of {list(CLOSURE_METRICS)}"}), 400
+    if not 1 <= limit <= CLOSURE_RANKING_MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {CLOSURE_RANKING_MAX_LIMIT}"}), 400
+    df = rank_airport_closures(limit=limit, sort_by=sort_by)
+    return _table(df)
+
+
+@app.get("/risks/delay")
+@cached(response_cache)
+def risks_delay():
+    # Riskiest routes first; ?full=1 lists every route (by route_id), streamed chunk by
+    # chunk as Arrow / Parquet / NDJSON
+    fmt = request.args.get("format", "json")
+    if request.args.get("full", "0").lower() in ("1", "true", "yes"):
+        if fmt == "ndjson":
+            return _ndjson(iter_delay_risks(NDJSON_CHUNK_ROWS))
+        if fmt in COLUMNAR_FORMATS:
+            return Response(iter_columnar(iter_delay_risks(), fmt), mimetype=COLUMNAR_FORMATS[fmt])
+        if fmt == "json":
+            return jsonify([row for chunk in iter_delay_risks() for row in chunk.to_dict(orient="records")])
+    limit = int(request.args.get("limit", 100))
+    return _table(delay_risk_overview(limit=limit))
+
+
+@app.get("/simulate/monte-carlo")
+@cached(response_cache, when=lambda: "seed" in request.args)  # unseeded runs are random
+def simulate_monte_carlo():
+    trials = request.args.get("trials", "1000")
+    bins = request.args.get("bins", "20")
+    level = request.args.get("level", "route")  # "route" | "airport"
+    risk = request.args.get("risk", "overall")  # delay_risks score used as failure probability
+    if level not in FAILURE_LEVELS or risk not in RISK_COLUMNS:
+        return jsonify({"error": f"level must be one of {list(FAILURE_LEVELS)}, risk one of {list(RISK_COLUMNS)}"}), 400
+    if not trials.isdigit() or not 1 <= int(trials) <= MONTE_CARLO_MAX_TRIALS:
+        return jsonify({"error": f"trials must be an integer between 1 and {MONTE_CARLO_MAX_TRIALS}"}), 400
+    if not bins.isdigit() or not 1 <= int(bins) <= 200:
+        return jsonify({"error": "bins must be an integer between 1 and 200"}), 400
+    cascade_share = request.args.get("cascade_share", type=float)  # defaults to settings; > 1 disables cascades
+    if "cascade_share" in request.args and not (cascade_share is not None and cascade_share > 0):
+        return jsonify({"error": "cascade_share must be a number above 0"}), 400
+    kwargs = {} if cascade_share is None else {"cascade_share": cascade_share}
+    result = simulate_cascading_failures(
+        trials=int(trials), level=level, risk=risk, seed=request.args.get("seed", type=int), **kwargs
+    )
+    stats = summarize_trials(result.pop("trials"), bins=int(bins))
+    return jsonify({**result, **stats})
+
+
+@app.post("/whatif/sessions")
+def whatif_create():
+    # New editable copy of the current network (delta overlay, nothing is written back)
+    return jsonify(create_session().summary()), 201
+
+
+@app.get("/whatif/sessions")
+def whatif_list():
+    return jsonify(list_sessions())
+
+
+@app.get("/whatif/sessions/<session_id>")
+def whatif_summary(session_id: str):
+    session = get_session(session_id)
+    if session is None:
+        return jsonify({"error": "unknown or expired session"}), 404
+    with session.lock:  # edit swaps graph and labels in separate steps
+        return jsonify(session.summary())
+
+
+@app.delete("/whatif/sessions/<session_id>")
+def whatif_delete(session_id: str):
+    if not delete_session(session_id):
+        return jsonify({"error": "unknown or expired session"}), 404
+    return "", 204
+
+
+@app.post("/whatif/sessions/<session_id>/routes")
+def whatif_edit(session_id: str):
+    # {"add": [{"source_airport_id": 3797, "dest_airport_id": 3484, "airline_id": 24, "passengers": 0}],
+    #  "remove": [route_id, ...]}  (added routes get negative route IDs)
+    session = get_session(session_id)
+    if session is None:
+        return jsonify({"error": "unknown or expired session"}), 404
+    body = request.get_json(force=True, silent=True) or {}
+    add, remove = body.get("add", []), body.get("remove", [])
+    if not isinstance(add, list) or not isinstance(remove, list) or not (add or remove):
+        return jsonify({"error": "add and/or remove must be non-empty lists"}), 400
+    try:
+        with session.lock:
+            result = session.edit(add=add, remove=remove)
+    except (KeyError, TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result)
+
+
+@app.get("/whatif/sessions/<session_id>/reachable")
+def whatif_reachable(session_id: str):
+    session = get_session(session_id)
+    if session is None:
+        return jsonify({"error": "unknown or expired session"}), 404
+    origin = int(request.args["origin_id"])  # required
+    destination = int(request.args["destination_id"])  # required
+    with session.lock:
+        reachable = session.reachable(origin, destination)
+    if reachable is None:
+        return jsonify({"error": "unknown airport"}), 404
+    return jsonify({"origin_id": origin, "destination_id": destination, "reachable": reachable})
+
+
+@app.post("/whatif/sessions/<session_id>/closure")
+def whatif_closure(session_id: str):
+    # {"airport_ids": [...]} -> closure impact on the base and the edited network
+    session = get_session(session_id)
+    if session is None:
+        return jsonify({"error": "unknown or expired session"}), 404
+    body = request.get_json(force=True, silent=True) or {}
+    airport_ids = body.get("airport_ids", [])
+    if not isinstance(airport_ids, list) or not airport_ids:
+        return jsonify({"error": "airport_ids must be a non-empty list"}), 400
+    try:
+        with session.lock:
+            result = session.closure(airport_ids)
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result)
 
 
 @app.get("/similar/by-route")
+@cached(response_cache)
 def similar_by_route():
     route_id = int(request.args["route_id"])  # required
     top_k = int(request.args.get("top_k", 10))
-    df = similar_routes_by_route_id(route_id, top_k=top_k)
-    return jsonify(df.to_dict(orient="records"))
+    backend = request.args.get("backend")  # "mariadb" | "exact" | "ivf", defaults to settings
+    nprobe = request.args.get("nprobe", type=int)
+    df = similar_routes_by_route_id(route_id, top_k=top_k, backend=backend, nprobe=nprobe)
+    return _table(df)
 
 
 @app.get("/similar/by-text")
+@cached(response_cache)
 def similar_by_text():
     query = request.args.get("q", "")
     top_k = int(request.args.get("top_k", 10))
-    df = similar_routes_by_text(query, top_k=top_k)
-    return jsonify(df.to_dict(orient="records"))
+    backend = request.args.get("backend")  # "mariadb" | "exact" | "ivf", defaults to settings
+    nprobe = request.args.get("nprobe", type=int)
+    df = similar_routes_by_text(query, top_k=top_k, backend=backend, nprobe=nprobe)
+    return _table(df)
+
+
+@app.post("/similar/batch")
+def similar_batch():
+    body = request.get_json(force=True, silent=True) or {}
+    route_ids = body.get("route_ids", [])
+    texts = body.get("texts", [])
+    if not isinstance(route_ids, list) or not isinstance(texts, list):
+        return jsonify({"error": "route_ids and texts must be lists"}), 400
+    try:
+        route_ids = [int(r) for r in route_ids]
+        top_k = int(body.get("top_k", 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "route_ids and top_k must be integers"}), 400
+    if not 1 <= top_k <= SIMILAR_MAX_TOP_K:
+        return jsonify({"error": f"top_k must be between 1 and {SIMILAR_MAX_TOP_K}"}), 400
+    texts = [str(t) for t in texts]
+    if len(route_ids) + len(texts) > SIMILAR_BATCH_MAX_QUERIES:
+        return jsonify({"error": f"at most {SIMILAR_BATCH_MAX_QUERIES} route_ids + texts per batch"}), 400
+    df = similar_routes_batch(route_ids=route_ids, texts=texts, top_k=top_k)
+
+    # One entry per query, in request order (route_ids first, then texts); repeats answered separately
+    grouped = dict(tuple(df.groupby("query_index", sort=False)))
+    queries = [("route", rid) for rid in route_ids] + [("text", text) for text in texts]
+    results = []
+    for position, (query_type, query) in enumerate(queries):
+        group = grouped.get(position)
+        if group is None or group["route_id"].isna().all():
+            results.append({"query_type": query_type, "query": query, "results": [],
+                            "error": "not found or has no embedding"})
+            continue
+        neighbours = group[["rank", "route_id", "cosine_distance"]].astype({"rank": int, "route_id": int})
+        results.append({"query_type": query_type, "query": query,
+                        "results": neighbours.to_dict(orient="records")})
+    return jsonify(results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,27 @@
+from __future__ import annotations
+import argparse
+
+from a2wsgi import WSGIMiddleware
+
+from backend.app import app
+from backend.config.settings import ASGI_WORKER_THREADS
+
+# The Flask API as an ASGI application:
+#   uvicorn backend.asgi:asgi_app --host 0.0.0.0 --port 8000
+# The event loop only moves bytes; every request runs on a pool of ASGI_WORKER_THREADS
+# threads, so a slow similarity scan or closure search blocks its own thread rather than
+# the server, and async views (/simulate/closure-alternates) fan out further with
+# asyncio.to_thread. What-if sessions and the response / query caches live in process
+# memory, so scale with threads first and only then with --workers behind sticky routing.
+asgi_app = WSGIMiddleware(app, workers=ASGI_WORKER_THREADS)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the AirRouteIQ API over ASGI (uvicorn)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Processes (each with its own caches and what-if sessions)")
+    args = parser.parse_args()
+    uvicorn.run("backend.asgi:asgi_app", host=args.host, port=args.port, workers=args.workers)
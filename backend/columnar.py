@@ -0,0 +1,146 @@
+from __future__ import annotations
+import io
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import pandas as pd
+
+# ?format= values besides json, with their media types
+COLUMNAR_FORMATS: Dict[str, str] = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Schema metadata key holding non-tabular extras (JSON)
+METADATA_KEY = b"airrouteiq"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401  (registers pyarrow.parquet)
+    except ImportError as exc:
+        raise RuntimeError("Arrow and Parquet output need pyarrow (pip install pyarrow)") from exc
+    return pyarrow
+
+
+def to_arrow(df: pd.DataFrame, schema=None, metadata: Optional[Dict[str, Any]] = None):
+    """pyarrow.Table of `df` (no index), optionally conformed to `schema` and tagged with `metadata`."""
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(metadata, default=str)})
+    return table
+
+
+def _stream_schema(pa, schema):
+    """
+    The first chunk's schema, minus what that chunk cannot decide for the rest of
+    the stream: Decimal columns (precision inferred from the values at hand, so a
+    wider later value would not fit) become float64, and all-NULL columns of
+    unknown type become strings. Later chunks are cast to it.
+    """
+    fields = []
+    for field in schema:
+        if pa.types.is_decimal(field.type):
+            field = field.with_type(pa.float64())
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def iter_columnar(chunks: Iterable[pd.DataFrame], fmt: str, metadata: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+    """
+    Encode DataFrame chunks as one Arrow IPC stream or Parquet file, yielding bytes as they are written.
+
+    Each chunk becomes a record batch (Arrow) or row group (Parquet), so a
+    chunked query is sent while later chunks are still being read; the
+    first chunk fixes the schema (see _stream_schema).
+    """
+    pa = _pyarrow()
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"format must be one of {list(COLUMNAR_FORMATS)}")
+    sink = io.BytesIO()
+    writer = schema = None
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    for chunk in chunks:
+        table = to_arrow(chunk, metadata=metadata)
+        if writer is None:
+            schema = _stream_schema(pa, table.schema)
+            writer = pa.ipc.new_stream(sink, schema) if fmt == "arrow" else pa.parquet.ParquetWriter(sink, schema)
+        writer.write_table(table.cast(schema))
+        yield drain()
+    if writer is None:
+        empty = to_arrow(pd.DataFrame(), metadata=metadata)
+        writer = pa.ipc.new_stream(sink, empty.schema) if fmt == "arrow" else pa.parquet.ParquetWriter(sink, empty.schema)
+    writer.close()
+    yield drain()
+
+
+def columnar_bytes(df: pd.DataFrame, fmt: str, metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    return b"".join(iter_columnar([df], fmt, metadata))
+
+
+def write_columnar(chunks: Iterable[pd.DataFrame], path: Path, fmt: str) -> int:
+    """Write chunks to one .arrow / .parquet file; returns rows written."""
+    rows = 0
+
+    def counted() -> Iterator[pd.DataFrame]:
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    with Path(path).open("wb") as f:
+        for data in iter_columnar(counted(), fmt):
+            f.write(data)
+    return rows
+
+
+def read_columnar(data: bytes, fmt: str) -> pd.DataFrame:
+    pa = _pyarrow()
+    if fmt == "arrow":
+        return pa.ipc.open_stream(data).read_pandas()
+    return pa.parquet.read_table(io.BytesIO(data)).to_pandas()
+
+
+def benchmark_formats(df: pd.DataFrame, repeat: int = 5) -> pd.DataFrame:
+    """
+    Encode and decode `df` as JSON records (the DataFrame.to_dict + json
+    path the API uses), Arrow IPC and Parquet; best of `repeat` runs.
+
+    Returns:
+        pd.DataFrame: format, encode_ms, decode_ms, megabytes, and speedup of
+        encode + decode over JSON.
+    """
+    def json_encode(frame: pd.DataFrame) -> bytes:
+        return json.dumps(frame.to_dict(orient="records"), default=str).encode("utf-8")
+
+    codecs = {
+        "json": (json_encode, lambda data: pd.DataFrame(json.loads(data))),
+        **{fmt: (lambda frame, fmt=fmt: columnar_bytes(frame, fmt), lambda data, fmt=fmt: read_columnar(data, fmt))
+           for fmt in COLUMNAR_FORMATS},
+    }
+    rows = []
+    for name, (encode, decode) in codecs.items():
+        encode_s = decode_s = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = encode(df)
+            encode_s = min(encode_s, time.perf_counter() - started)
+            started = time.perf_counter()
+            decode(data)
+            decode_s = min(decode_s, time.perf_counter() - started)
+        rows.append((name, encode_s * 1000, decode_s * 1000, len(data) / 1e6))
+    out = pd.DataFrame(rows, columns=["format", "encode_ms", "decode_ms", "megabytes"])
+    total = out["encode_ms"] + out["decode_ms"]
+    out["speedup_vs_json"] = total.iloc[0] / total
+    return out
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Optional
+
+from backend.config.db_config import execute_sql, fetch_df
+from backend.config.settings import DATA_VERSION_CHECK_SECONDS
+
+
+def bump_data_version() -> None:
+    """Mark the data as changed (call after loading or rebuilding anything the API serves)."""
+    execute_sql(
+        """
+        INSERT INTO data_version (id, version) VALUES (1, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1, updated_at = CURRENT_TIMESTAMP(6)
+        """
+    )
+    invalidate_data_version()
+
+
+def fetch_data_version() -> int:
+    df = fetch_df("SELECT version FROM data_version WHERE id = 1")
+    return 0 if df.empty else int(df.at[0, "version"])
+
+
+_version: Optional[int] = None
+_checked_at: float = 0.0
+_lock = threading.Lock()
+
+
+def current_data_version() -> int:
+    """The data_version stamp, re-read from the database at most every DATA_VERSION_CHECK_SECONDS."""
+    global _version, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if _version is None or now - _checked_at >= DATA_VERSION_CHECK_SECONDS:
+            _version = fetch_data_version()
+            _checked_at = now
+        return _version
+
+
+def invalidate_data_version() -> None:
+    """Force the next current_data_version() to re-read the stamp."""
+    global _version
+    with _lock:
+        _version = None
@@ -1,7 +1,11 @@
 from __future__ import annotations
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 import pandas as pd
-from typing import Any, Iterable, Optional, Tuple
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Tuple
 import mysql.connector
 
 from .settings import (
@@ -11,6 +15,10 @@ from .settings import (
     MARIADB_PORT,
     MARIADB_USER,
     MARIADB_CONNECT_TIMEOUT,
+    MARIADB_POOL_SIZE,
+    MARIADB_POOL_TIMEOUT,
+    MARIADB_POOL_RECYCLE,
+    MARIADB_POOL_PING_AFTER,
 )
 
 
@@ -28,44 +36,247 @@ def get_connection(database: Optional[str] = None) -> mysql.connector.connection
     return conn
 
 
+class ConnectionPool:
+    """
+    Thread-safe pool of autocommit connections to one database.
+
+    Callers wait up to `timeout` seconds for a free connection. Idle
+    connections are pinged after `ping_after` seconds of inactivity and
+    replaced once older than `recycle` seconds, so server-side wait_timeout
+    disconnects never reach a request.
+    """
+
+    def __init__(
+        self,
+        database: Optional[str] = None,
+        size: int = MARIADB_POOL_SIZE,
+        timeout: float = MARIADB_POOL_TIMEOUT,
+        recycle: float = MARIADB_POOL_RECYCLE,
+        ping_after: float = MARIADB_POOL_PING_AFTER,
+    ):
+        self.database = database or MARIADB_DB
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        # Idle entries: (connection, created_at, last_used_at)
+        self._idle: Deque[Tuple[Any, float, float]] = deque()
+        self._created_at: Dict[int, float] = {}
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "acquired": 0,
+            "waited": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+        }
+
+    def _connect(self) -> Any:
+        conn = get_connection(self.database)
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _close(self, conn: Any) -> None:
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _healthy(self, conn: Any, created_at: float, last_used: float) -> bool:
+        now = time.monotonic()
+        if self.recycle > 0 and now - created_at > self.recycle:
+            with self._cond:
+                self._stats["connections_recycled"] += 1
+            return False
+        if now - last_used > self.ping_after:
+            try:
+                conn.ping(reconnect=False)
+            except (mysql.connector.Error, OSError):
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                return False
+        return True
+
+    def acquire(self) -> Any:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise mysql.connector.errors.PoolError(
+                        f"No connection available for '{self.database}' within {self.timeout}s "
+                        f"(pool size {self.size})"
+                    )
+                self._cond.wait(remaining)
+            waited = time.monotonic() - start
+            self._stats["acquired"] += 1
+            if waited > 0.001:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            entry = self._idle.popleft() if self._idle else None
+            self._open += entry is None  # reserve a slot before connecting outside the lock
+
+        if entry is not None:
+            conn, created_at, last_used = entry
+            if self._healthy(conn, created_at, last_used):
+                return conn
+            self._close(conn)
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        with self._cond:
+            if discard:
+                self._stats["discarded"] += 1
+                self._open -= 1
+                self._close(conn)
+            else:
+                created_at = self._created_at.get(id(conn), time.monotonic())
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection; it is discarded rather than reused if the block raises."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "database": self.database,
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._open - idle,
+                "idle": idle,
+                **self._stats,
+            }
+
+    def close_all(self) -> None:
+        with self._cond:
+            while self._idle:
+                conn, _, _ = self._idle.popleft()
+                self._open -= 1
+                self._close(conn)
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database: Optional[str] = None) -> ConnectionPool:
+    name = database or MARIADB_DB
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = ConnectionPool(name)
+        return _pools[name]
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Wait/usage counters for every pool created in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.database: pool.stats() for pool in pools}
+
+
 def execute_sql(sql: str, params: Optional[Iterable[Any]] = None, database: Optional[str] = None) -> None:
-    conn = get_connection(database)
-    try:
+    with get_pool(database).connection() as conn:
         cur = conn.cursor()
-        cur.execute(sql, params or ())
-    finally:
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(sql, params or ())
+        finally:
+            cur.close()
 
 
 def executemany_sql(sql: str, rows: Iterable[Tuple[Any, ...]], database: Optional[str] = None) -> None:
-    conn = get_connection(database)
-    try:
+    with get_pool(database).connection() as conn:
         cur = conn.cursor()
-        cur.executemany(sql, list(rows))
-    finally:
-        cur.close()
-        conn.close()
+        try:
+            cur.executemany(sql, list(rows))
+        finally:
+            cur.close()
 
 
 def fetch_df(sql: str, params: Optional[Iterable[Any]] = None, database: Optional[str] = None) -> pd.DataFrame:
-    conn = get_connection(database)
-    try:
-        df = pd.read_sql(sql, conn, params=params)
-        return df
-    finally:
-        conn.close()
+    with get_pool(database).connection() as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+
+_NUMBER_TYPES = frozenset(mysql.connector.FieldType.get_number_types())
+
+
+def iter_df_chunks(
+    sql: str,
+    params: Optional[Iterable[Any]] = None,
+    chunksize: int = 10000,
+    database: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a query as DataFrames of at most `chunksize` rows.
+
+    Uses an unbuffered cursor, so rows are read off the socket as chunks are
+    consumed and only one chunk is held in memory at a time. The pooled
+    connection is held until the generator is exhausted or closed; a
+    generator abandoned mid-stream discards its connection because it still
+    has unread rows.
+    """
+    with get_pool(database).connection() as conn:
+        cur = conn.cursor(buffered=False)
+        try:
+            cur.execute(sql, params or ())
+            columns = [d[0] for d in cur.description]
+            # Numeric columns that are all NULL in a chunk still come out as float64 (NaN)
+            # rather than untyped objects, so every chunk has the same dtypes
+            numeric = [i for i, d in enumerate(cur.description) if d[1] in _NUMBER_TYPES]
+            while True:
+                rows = cur.fetchmany(chunksize)
+                if not rows:
+                    break
+                # coerce_float: DECIMAL values as floats (as fetch_df's read_sql does), not Decimal objects
+                df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                for i in numeric:
+                    if df.dtypes.iloc[i] == object and df.iloc[:, i].isna().all():
+                        df.isetitem(i, df.iloc[:, i].astype("float64"))
+                yield df
+        finally:
+            try:
+                cur.close()
+            except mysql.connector.Error:
+                pass
 
 
 def run_sql_file(path: str, database: Optional[str] = None) -> None:
     with open(path, "r", encoding="utf-8") as f:
         script = f.read()
     statements = [s.strip() for s in script.split(";") if s.strip()]
-    conn = get_connection(database)
-    try:
+    with get_pool(database).connection() as conn:
         cur = conn.cursor()
-        for stmt in statements:
-            cur.execute(stmt)
-    finally:
-        cur.close()
-        conn.close()
+        try:
+            for stmt in statements:
+                cur.execute(stmt)
+        finally:
+            cur.close()
@@ -17,6 +17,14 @@ MARIADB_USER: str = os.getenv("MARIADB_USER", "root")
 MARIADB_PASSWORD: str = os.getenv("MARIADB_PASSWORD", "123456789")
 MARIADB_DB: str = os.getenv("MARIADB_DB", "airrouteiq")
 MARIADB_CONNECT_TIMEOUT: int = int(os.getenv("MARIADB_CONNECT_TIMEOUT", "10"))
+# Connection pool shared by the db_config helpers (per process, per database)
+MARIADB_POOL_SIZE: int = int(os.getenv("MARIADB_POOL_SIZE", "8"))
+# Seconds a caller waits for a free connection before PoolError
+MARIADB_POOL_TIMEOUT: float = float(os.getenv("MARIADB_POOL_TIMEOUT", "30"))
+# Connections older than this (seconds) are replaced; 0 disables recycling
+MARIADB_POOL_RECYCLE: float = float(os.getenv("MARIADB_POOL_RECYCLE", "3600"))
+# Idle connections are pinged before reuse after this many seconds
+MARIADB_POOL_PING_AFTER: float = float(os.getenv("MARIADB_POOL_PING_AFTER", "30"))
 
 # ML / Embeddings
 EMBEDDING_MODEL_NAME: str = os.getenv(
@@ -24,11 +32,86 @@ EMBEDDING_MODEL_NAME: str = os.getenv(
 )
 # All-MiniLM-L6-v2 outputs 384-dim embeddings
 EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "384"))
+# How often (seconds) the in-memory embedding index checks route_embeddings for changes
+EMBEDDING_INDEX_REFRESH_SECONDS: float = float(os.getenv("EMBEDDING_INDEX_REFRESH_SECONDS", "30"))
+# LRU cache of free-text query embeddings; set QUERY_CACHE_DIR to also persist entries on disk
+QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_DIR: str = os.getenv("QUERY_CACHE_DIR", "")
+# Resident index storage: "none" (float32), "float16" or "int8" (read from route_embeddings.embedding_q);
+# quantized searches re-rank top_k * EMBEDDING_RESCORE_FACTOR candidates on float32 vectors
+EMBEDDING_QUANTIZATION: str = os.getenv("EMBEDDING_QUANTIZATION", "none").lower()
+EMBEDDING_RESCORE_FACTOR: int = int(os.getenv("EMBEDDING_RESCORE_FACTOR", "4"))
 
 # Feature flags
 USE_MARIADB_VECTOR: bool = os.getenv("USE_MARIADB_VECTOR", "true").lower() in {"1", "true", "yes"}
 USE_COLUMNSTORE: bool = os.getenv("USE_COLUMNSTORE", "true").lower() in {"1", "true", "yes"}
 
+# Similarity search backend: "mariadb" (VEC_DISTANCE_COSINE in the server, falls back
+# to "exact" when unsupported), "exact" (in-memory full scan) or "ivf" (approximate,
+# see vector_engine/ann_index.py)
+SIMILARITY_BACKEND: str = os.getenv(
+    "SIMILARITY_BACKEND", "mariadb" if USE_MARIADB_VECTOR else "exact"
+).lower()
+# Most route_ids + texts accepted by one POST /similar/batch request (search memory is
+# bounded per chunk of queries; this bounds the response) and the largest top_k it takes
+SIMILAR_BATCH_MAX_QUERIES: int = int(os.getenv("SIMILAR_BATCH_MAX_QUERIES", "5000"))
+SIMILAR_MAX_TOP_K: int = int(os.getenv("SIMILAR_MAX_TOP_K", "100"))
+# IVF tuning: clusters (0 = ~4*sqrt(routes)) and clusters probed per query (recall vs latency)
+ANN_NLIST: int = int(os.getenv("ANN_NLIST", "0"))
+ANN_NPROBE: int = int(os.getenv("ANN_NPROBE", "8"))
+
+# In-memory route graph (analytics/route_graph.py): built from the "db" routes table or
+# straight from the OpenFlights "file"; the db source is re-checked for changes this often
+ROUTE_GRAPH_SOURCE: str = os.getenv("ROUTE_GRAPH_SOURCE", "db").lower()
+ROUTE_GRAPH_REFRESH_SECONDS: float = float(os.getenv("ROUTE_GRAPH_REFRESH_SECONDS", "60"))
+# Worker processes of the shared graph analytics pool (analytics/parallel.py, 0 = CPU count)
+GRAPH_POOL_WORKERS: int = int(os.getenv("GRAPH_POOL_WORKERS", "0"))
+# Hub betweenness (analytics/centrality.py): exact up to this many airports with routes,
+# otherwise sampled so every score is within EPSILON with probability 1 - DELTA
+BETWEENNESS_EXACT_MAX_NODES: int = int(os.getenv("BETWEENNESS_EXACT_MAX_NODES", "2000"))
+BETWEENNESS_EPSILON: float = float(os.getenv("BETWEENNESS_EPSILON", "0.05"))
+BETWEENNESS_DELTA: float = float(os.getenv("BETWEENNESS_DELTA", "0.1"))
+# airport_connectivity refresh: incremental unless more airports than this are affected
+CONNECTIVITY_INCREMENTAL_MAX_CHANGES: int = int(os.getenv("CONNECTIVITY_INCREMENTAL_MAX_CHANGES", "500"))
+# Monte Carlo disruptions (analytics/monte_carlo.py): delay_risks scores are divided by
+# DELAY_RISK_SCALE to get probabilities (100 for percentages); an airport closes once
+# CASCADE_FAILURE_SHARE of its routes have failed
+DELAY_RISK_SCALE: float = float(os.getenv("DELAY_RISK_SCALE", "100"))
+CASCADE_FAILURE_SHARE: float = float(os.getenv("CASCADE_FAILURE_SHARE", "0.5"))
+MONTE_CARLO_BATCH_SIZE: int = int(os.getenv("MONTE_CARLO_BATCH_SIZE", "128"))
+# Most trials one /simulate/monte-carlo request may run (~75 trials/s per core on the
+# OpenFlights network, so this stays within about a minute on one core)
+MONTE_CARLO_MAX_TRIALS: int = int(os.getenv("MONTE_CARLO_MAX_TRIALS", "5000"))
+# Busiest connections through an airport kept in the materialized closure impact
+CLOSURE_TOP_PAIRS: int = int(os.getenv("CLOSURE_TOP_PAIRS", "10"))
+# Materialized hub / city-pair aggregates (analytics/hub_summaries.py): schedule of
+# `python -m backend.analytics.hub_summaries --watch`; loaders also refresh after ingest
+HUB_SUMMARY_REFRESH_SECONDS: float = float(os.getenv("HUB_SUMMARY_REFRESH_SECONDS", "900"))
+# What-if editing sessions (analytics/what_if.py): dropped after this long idle; the
+# least recently used one is evicted beyond WHATIF_MAX_SESSIONS
+WHATIF_SESSION_TTL_SECONDS: float = float(os.getenv("WHATIF_SESSION_TTL_SECONDS", "1800"))
+WHATIF_MAX_SESSIONS: int = int(os.getenv("WHATIF_MAX_SESSIONS", "50"))
+# Smallest closure-scenario batch worth shipping to the pool rather than evaluating in-process
+SCENARIO_PARALLEL_MIN_BATCH: int = int(os.getenv("SCENARIO_PARALLEL_MIN_BATCH", "4"))
+# /simulate/closure-ranking evaluates one closure per airport (~0.1 s each with 4 workers),
+# so its ?limit= is capped to keep an uncached request interactive
+CLOSURE_RANKING_MAX_LIMIT: int = int(os.getenv("CLOSURE_RANKING_MAX_LIMIT", "100"))
+# /simulate/alternates re-routes the ?limit= busiest disrupted pairs (10 by default); the
+# cap keeps one uncached request well under a second at the busiest OpenFlights hubs
+ALTERNATES_MAX_PAIRS: int = int(os.getenv("ALTERNATES_MAX_PAIRS", "1000"))
+# API response cache (backend/response_cache.py): entries expire after the TTL or as soon
+# as the loaders bump data_version, which the API re-reads at most this often
+RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+DATA_VERSION_CHECK_SECONDS: float = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "5"))
+# Keyset pagination (?cursor= / ?page_size=) and ?format=ndjson streaming (backend/pagination.py)
+API_PAGE_SIZE_DEFAULT: int = int(os.getenv("API_PAGE_SIZE_DEFAULT", "100"))
+API_PAGE_SIZE_MAX: int = int(os.getenv("API_PAGE_SIZE_MAX", "5000"))
+NDJSON_CHUNK_ROWS: int = int(os.getenv("NDJSON_CHUNK_ROWS", "1000"))
+# ASGI serving (backend/asgi.py): requests run on this many threads per process, so size it
+# against MARIADB_POOL_SIZE (each in-flight query holds one pooled connection)
+ASGI_WORKER_THREADS: int = int(os.getenv("ASGI_WORKER_THREADS", "16"))
+
 # Table names
 TABLE_AIRPORTS: str = os.getenv("TABLE_AIRPORTS", "airports")
 TABLE_AIRLINES: str = os.getenv("TABLE_AIRLINES", "airlines")
@@ -48,6 +131,9 @@ OPENFLIGHTS_PLANES: Path = RAW_DATA_DIR / "planes.dat"
 ROUTES_CLEAN_CSV: Path = PROCESSED_DATA_DIR / "routes_clean.csv"
 SYNTHETIC_RISKS_CSV: Path = PROCESSED_DATA_DIR / "synthetic_route_risks.csv"
 EMBEDDINGS_CSV: Path = PROCESSED_DATA_DIR / "embeddings.csv"
+HUB_CRITICALITY_PATH: Path = PROCESSED_DATA_DIR / "hub_betweenness.npz"
+CONNECTIVITY_EDGES_PATH: Path = PROCESSED_DATA_DIR / "connectivity_index_edges.npz"
+ANN_INDEX_PATH: Path = Path(os.getenv("ANN_INDEX_PATH", str(PROCESSED_DATA_DIR / "route_embeddings_ivf.npz")))
 
 # Streamlit settings
 STREAMLIT_TITLE: str = "AirRouteIQ - Airline Network Analytics"
@@ -1,11 +1,11 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import Iterable, Iterator
 import pandas as pd
-import numpy as np
-import time
-from sentence_transformers import SentenceTransformer
 
-from backend.config.db_config import fetch_df, executemany_sql
+from backend.config.data_version import bump_data_version
+from backend.config.db_config import iter_df_chunks
+from backend.vector_engine.embed_routes import fetch_embedding_state, select_stale, upsert_embeddings
+from backend.vector_engine.embedding_pipeline import run_embedding_pipeline
 
 DESCRIPTION_TEMPLATE = (
     """
@@ -15,24 +15,20 @@ DESCRIPTION_TEMPLATE = (
     """.strip()
 )
 
-# Load once
-model = SentenceTransformer("all-MiniLM-L6-v2")
+ROUTE_DESCRIPTION_SQL = """
+    SELECT r.route_id, r.stops, r.equipment,
+           sa.city AS src_city, sa.iata AS src_iata, sa.country AS src_country,
+           da.city AS dst_city, da.iata AS dst_iata, da.country AS dst_country,
+           al.name AS airline_name
+    FROM routes r
+    LEFT JOIN airports sa ON r.source_airport_id = sa.airport_id
+    LEFT JOIN airports da ON r.dest_airport_id = da.airport_id
+    LEFT JOIN airlines al ON r.airline_id = al.airline_id
+    LIMIT %s
+"""
 
 
-def build_route_descriptions(limit: int = 50000) -> pd.DataFrame:
-    sql = """
-        SELECT r.route_id, r.stops, r.equipment,
-               sa.city AS src_city, sa.iata AS src_iata, sa.country AS src_country,
-               da.city AS dst_city, da.iata AS dst_iata, da.country AS dst_country,
-               al.name AS airline_name
-        FROM routes r
-        LEFT JOIN airports sa ON r.source_airport_id = sa.airport_id
-        LEFT JOIN airports da ON r.dest_airport_id = da.airport_id
-        LEFT JOIN airlines al ON r.airline_id = al.airline_id
-        LIMIT %s
-    """
-    df = fetch_df(sql, params=(limit,))
-
+def describe_routes(df: pd.DataFrame) -> pd.DataFrame:
     def fmt(row: pd.Series) -> str:
         return DESCRIPTION_TEMPLATE.format(
             src_city=row.get("src_city") or "Unknown City",
@@ -46,37 +42,56 @@ def build_route_descriptions(limit: int = 50000) -> pd.DataFrame:
             dst_country=row.get("dst_country") or "Unknown Country",
         )
 
+    if df.empty:
+        return pd.DataFrame(columns=["route_id", "description"])
+    df = df.copy()
     df["description"] = df.apply(fmt, axis=1)
     return df[["route_id", "description"]]
 
 
-def embed_and_upsert_in_batches(df: pd.DataFrame, batch_size: int = 500):
-    sql = """
-        INSERT INTO route_embeddings (route_id, description, embedding)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE 
-            description=VALUES(description),
-            embedding=VALUES(embedding)
+def iter_route_descriptions(limit: int = 50000, chunksize: int = 5000) -> Iterator[pd.DataFrame]:
+    """Yield (route_id, description) chunks; only one joined chunk is in memory at a time."""
+    for chunk in iter_df_chunks(ROUTE_DESCRIPTION_SQL, params=(limit,), chunksize=chunksize):
+        yield describe_routes(chunk)
+
+
+def build_route_descriptions(limit: int = 50000) -> pd.DataFrame:
+    chunks = list(iter_route_descriptions(limit=limit))
+    if not chunks:
+        return pd.DataFrame(columns=["route_id", "description"])
+    return pd.concat(chunks, ignore_index=True)
+
+
+def embed_description_chunks(chunks: Iterable[pd.DataFrame], batch_size: int = 500) -> int:
+    """
+    Embed and store descriptions, skipping routes whose stored content hash
+    and model already match (only new or changed descriptions are encoded).
+
+    Encoding overlaps the DB writes (see `run_embedding_pipeline`); batch_size
+    is the starting encode batch, tuned on measured throughput.
+
+    Returns:
+        int: Number of routes (re-)encoded.
     """
-    total = len(df)
-    for start in range(0, total, batch_size):
-        batch = df.iloc[start:start + batch_size]
-        print(f"🔹 Processing batch {start}–{min(start + batch_size, total)}...")
+    def stale_chunks(state_chunk: int = 5000) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            for start in range(0, len(chunk), state_chunk):
+                part = chunk.iloc[start:start + state_chunk]
+                yield select_stale(part, fetch_embedding_state(part["route_id"].astype(int).tolist()))
+
+    stats = run_embedding_pipeline(stale_chunks(), upsert_embeddings, batch_size=batch_size, label="🔹 Embedding")
+    print(f"✅ Embedded {stats['rows']} new/changed routes ({stats['unique_texts']} unique descriptions) "
+          f"in {stats['seconds']:.1f}s.")
+    if stats["rows"]:
+        bump_data_version()
+    return stats["rows"]
 
-        descriptions = batch["description"].tolist()
-        embeddings = model.encode(descriptions, normalize_embeddings=True)
 
-        rows: List[Tuple[int, str, bytes]] = [
-            (int(rid), desc, np.array(emb, dtype=np.float32).tobytes())
-            for rid, desc, emb in zip(batch["route_id"], descriptions, embeddings)
-        ]
-        executemany_sql(sql, rows)
-        print(f"✅ Inserted {len(rows)} routes.")
-        time.sleep(0.3)  # small delay to reduce DB load
+def embed_and_upsert_in_batches(df: pd.DataFrame, batch_size: int = 500) -> int:
+    return embed_description_chunks([df], batch_size=batch_size)
 
 
 if __name__ == "__main__":
     print("🚀 Generating synthetic route descriptions & embeddings in batches...")
-    df = build_route_descriptions(limit=10000)  # try 1000–5000 for first run
-    embed_and_upsert_in_batches(df)
+    embed_description_chunks(iter_route_descriptions(limit=10000))  # try 1000–5000 for first run
     print("🎯 Done! Embeddings populated in route_embeddings table.")
@@ -3,6 +3,7 @@ import csv
 from pathlib import Path
 from typing import Iterator, Tuple
 
+from backend.config.data_version import bump_data_version
 from backend.config.db_config import executemany_sql
 from backend.config.settings import OPENFLIGHTS_AIRLINES
 
@@ -53,6 +54,7 @@ def load_airlines() -> None:
 
     executemany_sql(sql, rows)
     print(f"Inserted/Updated {len(rows)} airlines successfully.")
+    bump_data_version()
 
 
 if __name__ == "__main__":
@@ -3,8 +3,11 @@ import csv
 from pathlib import Path
 from typing import Iterator, Tuple
 
+from backend.config.data_version import bump_data_version
 from backend.config.db_config import executemany_sql
+from backend.analytics.route_graph import invalidate_route_graph
 from backend.config.settings import OPENFLIGHTS_AIRPORTS  # Path to airports.dat
+from .route_distances import backfill_route_distances
 
 
 def read_airports(path: Path) -> Iterator[Tuple]:
@@ -63,6 +66,10 @@ def load_airports() -> None:
     print("First 5 rows to insert/update:", rows[:5])
     executemany_sql(sql, rows)
     print(f"Inserted/Updated {len(rows)} rows successfully.")
+    # Coordinates may have moved: keep stored route distances in step
+    print(f"Updated distance_km on {backfill_route_distances()} routes.")
+    invalidate_route_graph()
+    bump_data_version()
 
 
 if __name__ == "__main__":
@@ -3,8 +3,14 @@ import csv
 from pathlib import Path
 from typing import Iterator, Tuple
 
+import numpy as np
+
+from backend.config.data_version import bump_data_version
 from backend.config.db_config import executemany_sql
+from backend.analytics.hub_summaries import refresh_hub_summaries
+from backend.analytics.route_graph import invalidate_route_graph
 from backend.config.settings import OPENFLIGHTS_ROUTES
+from .route_distances import airport_coordinates, route_distances_km, save_pair_distances
 
 
 def read_routes(path: Path) -> Iterator[Tuple]:
@@ -44,13 +50,16 @@ def read_routes(path: Path) -> Iterator[Tuple]:
 
 def load_routes() -> None:
     """
-    Loads all routes into the database.
+    Loads all routes into the database, with the great-circle distance of
+    each route (one vectorized haversine pass over airports.dat coordinates)
+    and of each distinct airport pair, then rebuilds the hub and city-pair
+    summary tables.
     """
     sql = """
         INSERT INTO routes (
             airline, airline_id, source_airport, source_airport_id,
-            dest_airport, dest_airport_id, codeshare, stops, equipment
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            dest_airport, dest_airport_id, codeshare, stops, equipment, distance_km
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE
             airline = VALUES(airline),
             airline_id = VALUES(airline_id),
@@ -60,13 +69,24 @@ def load_routes() -> None:
             dest_airport_id = VALUES(dest_airport_id),
             codeshare = VALUES(codeshare),
             stops = VALUES(stops),
-            equipment = VALUES(equipment)
+            equipment = VALUES(equipment),
+            distance_km = VALUES(distance_km)
     """
 
     rows = list(read_routes(OPENFLIGHTS_ROUTES))
     if rows:
-        executemany_sql(sql, rows)
+        source_ids = [r[3] for r in rows]
+        dest_ids = [r[5] for r in rows]
+        distances = route_distances_km(source_ids, dest_ids, airport_coordinates())
+        executemany_sql(sql, [
+            row + (None if np.isnan(km) else round(float(km), 3),)
+            for row, km in zip(rows, distances)
+        ])
         print(f"Inserted/Updated {len(rows)} routes.")
+        print(f"Stored distances for {save_pair_distances(source_ids, dest_ids, distances)} airport pairs.")
+        invalidate_route_graph()
+        bump_data_version()
+        refresh_hub_summaries()
 
 
 if __name__ == "__main__":
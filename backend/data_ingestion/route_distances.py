@@ -0,0 +1,100 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.analytics.geo import haversine_km
+from backend.config.db_config import executemany_sql, fetch_df, iter_df_chunks
+from backend.config.settings import OPENFLIGHTS_AIRPORTS
+
+
+def airport_coordinates(path: Optional[Path] = OPENFLIGHTS_AIRPORTS) -> pd.DataFrame:
+    """airport_id, latitude, longitude from airports.dat, or from the airports table when `path` is None."""
+    if path is None:
+        return fetch_df("SELECT airport_id, latitude, longitude FROM airports")
+    from .load_airports import read_airports
+
+    return pd.DataFrame(
+        [(a[0], a[6], a[7]) for a in read_airports(Path(path)) if a[0] is not None],
+        columns=["airport_id", "latitude", "longitude"],
+    )
+
+
+def route_distances_km(source_ids, dest_ids, airports: pd.DataFrame) -> np.ndarray:
+    """
+    Great-circle distance for each (source, destination) airport ID pair.
+
+    One vectorized haversine over all rows; NaN where an ID is missing or
+    has no coordinates.
+    """
+    ids = airports["airport_id"].to_numpy(dtype=np.int64)
+    order = np.argsort(ids)
+    ids = ids[order]
+    lat = pd.to_numeric(airports["latitude"], errors="coerce").to_numpy(dtype=np.float64)[order]
+    lon = pd.to_numeric(airports["longitude"], errors="coerce").to_numpy(dtype=np.float64)[order]
+
+    def lookup(values):
+        values = pd.to_numeric(pd.Series(values), errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        if ids.size == 0:
+            return np.full(values.shape, np.nan), np.full(values.shape, np.nan)
+        pos = np.minimum(np.searchsorted(ids, values), ids.size - 1)
+        found = ids[pos] == values
+        return np.where(found, lat[pos], np.nan), np.where(found, lon[pos], np.nan)
+
+    lat1, lon1 = lookup(source_ids)
+    lat2, lon2 = lookup(dest_ids)
+    return haversine_km(lat1, lon1, lat2, lon2)
+
+
+def _db_value(x: float) -> Optional[float]:
+    return None if np.isnan(x) else round(float(x), 3)
+
+
+def save_pair_distances(source_ids, dest_ids, distances: np.ndarray) -> int:
+    """Upsert one `airport_pair_distances` row per distinct pair; returns the number of pairs."""
+    pairs = pd.DataFrame({"src": source_ids, "dst": dest_ids, "km": distances})
+    pairs = pairs.dropna(subset=["src", "dst"]).drop_duplicates(["src", "dst"])
+    sql = """
+        INSERT INTO airport_pair_distances (source_airport_id, dest_airport_id, distance_km)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE distance_km = VALUES(distance_km)
+    """
+    rows = [(int(s), int(d), _db_value(km)) for s, d, km in pairs.itertuples(index=False)]
+    if rows:
+        executemany_sql(sql, rows)
+    return len(rows)
+
+
+def backfill_route_distances(chunksize: int = 50000) -> int:
+    """
+    Recompute routes.distance_km (and airport_pair_distances) from the airports table.
+
+    For existing installs and after airport coordinates change; only rows
+    whose stored value differs are updated.
+
+    Returns:
+        int: Routes updated.
+    """
+    airports = airport_coordinates(None)
+    sql = "SELECT route_id, source_airport_id, dest_airport_id, distance_km FROM routes"
+    frames = list(iter_df_chunks(sql, chunksize=chunksize))
+    if not frames:
+        return 0
+    routes = pd.concat(frames, ignore_index=True)
+    distances = route_distances_km(routes["source_airport_id"], routes["dest_airport_id"], airports)
+    stored = pd.to_numeric(routes["distance_km"], errors="coerce").to_numpy(dtype=np.float64)
+    changed = ~(np.isclose(stored, distances, atol=1e-3) | (np.isnan(stored) & np.isnan(distances)))
+    rows = [
+        (_db_value(km), int(route_id))
+        for route_id, km in zip(routes["route_id"].to_numpy()[changed], distances[changed])
+    ]
+    if rows:
+        executemany_sql("UPDATE routes SET distance_km = %s WHERE route_id = %s", rows)
+    save_pair_distances(routes["source_airport_id"], routes["dest_airport_id"], distances)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    print(f"Updated distance_km on {backfill_route_distances()} routes.")
@@ -0,0 +1,136 @@
+from __future__ import annotations
+import base64
+import json
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class Key(NamedTuple):
+    """One sort column of a keyset: ties on earlier keys are broken by later ones."""
+    column: str
+    descending: bool = False
+    # Stand-in for NULLs, so nullable columns still compare (and sort) deterministically
+    null_as: Any = None
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor for the sort key of the last row of a page."""
+    values = [v.item() if isinstance(v, np.generic) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[Key]) -> List[Any]:
+    """Inverse of encode_cursor; ValueError for anything that is not a cursor of `keys`."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def _expr(key: Key) -> Tuple[str, list]:
+    if key.null_as is None:
+        return key.column, []
+    return f"COALESCE({key.column}, %s)", [key.null_as]
+
+
+def keyset_sql(
+    base_sql: str,
+    keys: Sequence[Key],
+    cursor: Optional[str],
+    page_size: Optional[int],
+    where: Sequence[Tuple[str, Any]] = (),
+    base_params: Sequence[Any] = (),
+) -> Tuple[str, list]:
+    """
+    Wrap a SELECT so it returns the page after `cursor`, in key order.
+
+    The seek condition is the lexicographic "after" of the keys spelled out
+    as (k1 > v1) OR (k1 = v1 AND k2 > v2) ... so each page is an index or
+    segment range scan rather than an OFFSET that re-reads every earlier row.
+    One extra row is fetched to tell whether a next page exists.
+
+    Args:
+        base_sql (str): SELECT producing (at least) the key columns.
+        keys (Sequence[Key]): Sort order, unique over the rows.
+        cursor (Optional[str]): encode_cursor of the previous page's last row (None: first page).
+        page_size (Optional[int]): Rows per page (None: everything after the cursor).
+        where (Sequence[Tuple[str, Any]]): Extra filters as (SQL with one %s, value).
+        base_params (Sequence[Any]): Parameters of base_sql.
+
+    Returns:
+        Tuple[str, list]: SQL and its parameters.
+    """
+    conditions, params = [], list(base_params)
+    for clause, value in where:
+        conditions.append(clause)
+        params.append(value)
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        alternatives = []
+        for i, key in enumerate(keys):
+            parts = []
+            for earlier, value in zip(keys[:i], values[:i]):
+                expr, expr_params = _expr(earlier)
+                parts.append(f"{expr} = %s")
+                params.extend(expr_params + [value])
+            expr, expr_params = _expr(key)
+            parts.append(f"{expr} {'<' if key.descending else '>'} %s")
+            params.extend(expr_params + [values[i]])
+            alternatives.append("(" + " AND ".join(parts) + ")")
+        conditions.append("(" + " OR ".join(alternatives) + ")")
+    order, order_params = [], []
+    for key in keys:
+        expr, expr_params = _expr(key)
+        order.append(f"{expr} {'DESC' if key.descending else 'ASC'}")
+        order_params.extend(expr_params)
+    sql = f"SELECT * FROM ({base_sql}) q"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {', '.join(order)}"
+    if page_size is None:
+        return sql, params + order_params
+    return sql + " LIMIT %s", params + order_params + [int(page_size) + 1]
+
+
+def _sort_frame(df: pd.DataFrame, keys: Sequence[Key]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    columns = {key.column: df[key.column] if key.null_as is None else df[key.column].fillna(key.null_as) for key in keys}
+    sort = pd.DataFrame(columns, index=df.index)
+    order = sort.sort_values([k.column for k in keys], ascending=[not k.descending for k in keys], kind="stable").index
+    return df.loc[order], sort.loc[order]
+
+
+def page_frame(df: pd.DataFrame, keys: Sequence[Key], cursor: Optional[str], page_size: int) -> pd.DataFrame:
+    """keyset_sql for an in-memory result (the live fallbacks): the page after `cursor`, plus one look-ahead row."""
+    df, sort = _sort_frame(df, keys)
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        after = np.zeros(len(df), dtype=bool)
+        equal = np.ones(len(df), dtype=bool)
+        for key, value in zip(keys, values):
+            col = sort[key.column].to_numpy()
+            after |= equal & ((col < value) if key.descending else (col > value))
+            equal &= col == value
+        df = df[after]
+    return df.head(int(page_size) + 1)
+
+
+def split_page(rows: pd.DataFrame, keys: Sequence[Key], page_size: int) -> Tuple[pd.DataFrame, Optional[str]]:
+    """Drop the look-ahead row; the cursor of the page's last row if another page follows."""
+    if len(rows) <= page_size:
+        return rows.reset_index(drop=True), None
+    page = rows.iloc[:page_size].reset_index(drop=True)
+    last = page.iloc[-1]
+    values = [key.null_as if pd.isna(last[key.column]) and key.null_as is not None else last[key.column] for key in keys]
+    return page, encode_cursor(values)
+
+
+def iter_ndjson(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """One JSON object per line, flushed chunk by chunk as the chunks are produced."""
+    for chunk in chunks:
+        if len(chunk):
+            yield chunk.to_json(orient="records", lines=True, date_format="iso", force_ascii=False).rstrip("\n").encode("utf-8") + b"\n"
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from flask import Response, current_app, make_response, request
+
+from backend.config.data_version import current_data_version
+from backend.config.settings import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS
+
+# Response headers kept with a cached body (the rest are regenerated by Flask)
+_KEPT_HEADERS = (
+    "Content-Type", "X-Data-Source", "X-Data-Refreshed-At", "X-Data-Age-Seconds", "X-Next-Cursor", "Link",
+)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    status: int
+    headers: Dict[str, str]
+    etag: str
+    stored_at: float
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _matches(etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 asks for GET)."""
+    header = request.headers.get("If-None-Match", "")
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized GET responses.
+
+    Keyed on endpoint, normalized query arguments (sorted, repeated values
+    kept in order) and the data_version stamp, so a loader bumping the stamp
+    retires every entry at once; entries also expire after `ttl` seconds.
+    The route graph, embedding index and connectivity index re-check their
+    sources as soon as the stamp moves, so an entry stored under a new stamp
+    is never computed from pre-load state.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def key(version: int) -> Tuple:
+        args = tuple(sorted((k, tuple(request.args.getlist(k))) for k in request.args))
+        return request.endpoint, tuple(sorted((request.view_args or {}).items())), args, version
+
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.stored_at > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, response: Response) -> CachedResponse:
+        body = response.get_data()
+        entry = CachedResponse(
+            body=body,
+            status=response.status_code,
+            headers={h: response.headers[h] for h in _KEPT_HEADERS if h in response.headers},
+            etag=_etag(body),
+            stored_at=time.monotonic(),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+def _serve(cache: ResponseCache, entry: CachedResponse, hit: bool) -> Response:
+    if _matches(entry.etag):
+        with cache._lock:
+            cache.not_modified += 1
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, status=entry.status)
+        response.headers["Content-Type"] = entry.headers.get("Content-Type", "application/json")
+    # Freshness headers go out with 304s too, so clients see the current age
+    for header, value in entry.headers.items():
+        if header != "Content-Type":
+            response.headers[header] = value
+    if "X-Data-Refreshed-At" in entry.headers:
+        refreshed_at = datetime.fromisoformat(entry.headers["X-Data-Refreshed-At"])
+        age = (datetime.now(timezone.utc) - refreshed_at).total_seconds()
+        response.headers["X-Data-Age-Seconds"] = f"{max(age, 0.0):.0f}"
+    response.headers["ETag"] = entry.etag
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    return response
+
+
+def cached(cache: ResponseCache, when: Optional[Callable[[], bool]] = None) -> Callable:
+    """
+    Serve a GET view through `cache`, answering If-None-Match with 304.
+
+    Only 200 responses are stored. `when` can veto caching per request
+    (e.g. unseeded random simulations). Works for async views too.
+    """
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if when is not None and not when():
+                return current_app.ensure_sync(view)(*args, **kwargs)
+            key = cache.key(current_data_version())
+            entry = cache.get(key)
+            if entry is not None:
+                return _serve(cache, entry, hit=True)
+            response = make_response(current_app.ensure_sync(view)(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            return _serve(cache, cache.put(key, response), hit=False)
+        return wrapper
+    return decorator
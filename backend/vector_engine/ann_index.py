@@ -0,0 +1,224 @@
+from __future__ import annotations
+import argparse
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.config.settings import ANN_INDEX_PATH, ANN_NLIST, ANN_NPROBE
+from .embedding_index import EmbeddingIndex, get_embedding_index
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index.
+
+    Routes are clustered around `nlist` centroids with spherical k-means. A
+    query is only scored against the members of its `nprobe` closest
+    clusters: more probes means higher recall and higher latency. The index
+    stores positions into the resident EmbeddingIndex rather than a second
+    copy of the vectors.
+    """
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, positions: np.ndarray, signature: str):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        self.positions = np.ascontiguousarray(positions, dtype=np.int64)
+        self.signature = signature
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    def search(
+        self,
+        base: EmbeddingIndex,
+        query: np.ndarray,
+        top_k: int = 10,
+        exclude: Optional[int] = None,
+        nprobe: int = ANN_NPROBE,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        nprobe = max(1, min(int(nprobe), self.nlist))
+        centroid_sims = self.centroids @ query
+        probes = np.argpartition(-centroid_sims, nprobe - 1)[:nprobe]
+        candidates = np.concatenate(
+            [self.positions[self.offsets[c]:self.offsets[c + 1]] for c in probes]
+        )
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        # Scoring (and float32 rescoring of a quantized base) is the base index's job
+        return base.search_positions(query, candidates, top_k)
+
+    def save(self, path: Path = ANN_INDEX_PATH) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                offsets=self.offsets,
+                positions=self.positions,
+                signature=np.array(self.signature),
+            )
+
+    @classmethod
+    def load(cls, path: Path = ANN_INDEX_PATH) -> "IVFIndex":
+        with np.load(Path(path), allow_pickle=False) as data:
+            return cls(data["centroids"], data["offsets"], data["positions"], str(data["signature"]))
+
+
+def default_nlist(n: int) -> int:
+    # ~4*sqrt(n) lists keeps both the centroid scan and each list short
+    return max(1, min(n, int(4 * np.sqrt(max(n, 1)))))
+
+
+def _assign(base: EmbeddingIndex, positions: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    labels = np.empty(positions.shape[0], dtype=np.int64)
+    for start in range(0, positions.shape[0], chunk_size):
+        block = base.vectors(positions[start:start + chunk_size])
+        labels[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def build_ivf_index(
+    base: EmbeddingIndex,
+    nlist: Optional[int] = None,
+    iterations: int = 15,
+    max_training_points: int = 50000,
+    seed: int = 42,
+) -> IVFIndex:
+    """
+    Cluster the resident embedding matrix with spherical k-means.
+
+    Args:
+        base (EmbeddingIndex): Normalized embeddings to index.
+        nlist (Optional[int]): Number of clusters (defaults to ANN_NLIST or ~4*sqrt(n)).
+        iterations (int): k-means iterations on the training sample.
+        max_training_points (int): Sample size used to fit the centroids.
+        seed (int): RNG seed for sampling and initialization.
+
+    Returns:
+        IVFIndex: Index tagged with the base index signature.
+    """
+    n = len(base)
+    nlist = min(n, nlist or ANN_NLIST or default_nlist(n))
+    rng = np.random.default_rng(seed)
+    sample_positions = np.arange(n)
+    if n > max_training_points:
+        sample_positions = np.sort(rng.choice(n, size=max_training_points, replace=False))
+    sample = base.vectors(sample_positions)
+
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(base, sample_positions, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+        # Re-seed empty clusters from random training points
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    labels = _assign(base, np.arange(n), centroids)
+    positions = np.argsort(labels, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))])
+    return IVFIndex(centroids, offsets, positions, repr(base.signature))
+
+
+_ann: Optional[IVFIndex] = None
+_lock = threading.Lock()
+
+
+def get_ann_index(base: Optional[EmbeddingIndex] = None) -> IVFIndex:
+    """
+    Return an IVF index matching the current resident embeddings.
+
+    Tries the persisted artifact first and only rebuilds (and re-saves) when
+    its signature no longer matches `route_embeddings`.
+    """
+    global _ann
+    base = base or get_embedding_index()
+    signature = repr(base.signature)
+    with _lock:
+        if _ann is not None and _ann.signature == signature:
+            return _ann
+        if ANN_INDEX_PATH.exists():
+            try:
+                candidate = IVFIndex.load(ANN_INDEX_PATH)
+                if candidate.signature == signature:
+                    _ann = candidate
+                    return _ann
+            except (OSError, KeyError, ValueError):
+                pass
+        _ann = build_ivf_index(base)
+        _ann.save(ANN_INDEX_PATH)
+        return _ann
+
+
+def recall_report(
+    sample_size: int = 200,
+    top_k: int = 10,
+    nprobes: Iterable[int] = (1, 2, 4, 8, 16, 32),
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Measure IVF recall@k and latency against the exact scan.
+
+    Uses randomly sampled routes as queries (each excluded from its own
+    results, as in `/similar/by-route`).
+
+    Returns:
+        pd.DataFrame: One row per nprobe with recall and mean latency in ms.
+    """
+    base = get_embedding_index()
+    ann = get_ann_index(base)
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(base), size=min(sample_size, len(base)), replace=False)
+
+    exact_results = []
+    start = time.perf_counter()
+    for pos in queries:
+        exact_results.append(set(base.search(base.vector(pos), top_k, exclude=pos)[0].tolist()))
+    exact_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+    rows = []
+    for nprobe in nprobes:
+        hits = 0
+        start = time.perf_counter()
+        for pos, truth in zip(queries, exact_results):
+            found = ann.search(base, base.vector(pos), top_k, exclude=pos, nprobe=nprobe)[0]
+            hits += len(truth.intersection(found.tolist()))
+        ann_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+        rows.append({
+            "nprobe": nprobe,
+            "nlist": ann.nlist,
+            f"recall_at_{top_k}": hits / max(sum(len(t) for t in exact_results), 1),
+            "ann_ms": ann_ms,
+            "exact_ms": exact_ms,
+        })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the IVF index for route embeddings")
+    parser.add_argument("--nlist", type=int, default=None, help="Number of clusters")
+    parser.add_argument("--report", action="store_true", help="Print recall vs exact search")
+    args = parser.parse_args()
+
+    base_index = get_embedding_index()
+    index = build_ivf_index(base_index, nlist=args.nlist)
+    index.save(ANN_INDEX_PATH)
+    print(f"IVF index with {index.nlist} lists over {len(base_index)} routes written to {ANN_INDEX_PATH}")
+    if args.report:
+        print(recall_report().to_string(index=False))
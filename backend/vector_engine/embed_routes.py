@@ -1,44 +1,120 @@
 from __future__ import annotations
-from typing import List, Tuple
+import hashlib
+from typing import Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
-from backend.config.db_config import fetch_df, executemany_sql
-from backend.config.settings import EMBEDDING_DIMENSIONS
-from .model_loader import embed_texts
+from backend.config.data_version import bump_data_version
+from backend.config.db_config import fetch_df, executemany_sql, iter_df_chunks
+from backend.config.settings import EMBEDDING_MODEL_NAME, EMBEDDING_QUANTIZATION
+from .embedding_index import invalidate_embedding_index, normalize_rows
+from .embedding_pipeline import run_embedding_pipeline
+from .quantization import encode_blobs
+
+
+DESCRIPTIONS_SQL = """
+    SELECT route_id, description, content_hash, model_name
+    FROM route_embeddings
+    WHERE description IS NOT NULL
+    LIMIT %s
+"""
+
+
+def description_hash(text: str) -> str:
+    """Content hash stored next to each embedding to detect changed descriptions."""
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
 
 
 def fetch_descriptions(limit: int = 50000) -> pd.DataFrame:
-    sql = "SELECT route_id, description FROM route_embeddings WHERE description IS NOT NULL LIMIT ?"
-    return fetch_df(sql, params=(limit,))
+    return fetch_df(DESCRIPTIONS_SQL, params=(limit,))
+
+
+def iter_descriptions(limit: int = 50000, chunksize: int = 5000) -> Iterator[pd.DataFrame]:
+    return iter_df_chunks(DESCRIPTIONS_SQL, params=(limit,), chunksize=chunksize)
+
+
+def fetch_embedding_state(route_ids: List[int]) -> pd.DataFrame:
+    """Stored content_hash/model_name for the given routes (missing routes are absent)."""
+    if not route_ids:
+        return pd.DataFrame(columns=["route_id", "content_hash", "model_name"])
+    placeholders = ", ".join(["%s"] * len(route_ids))
+    sql = f"""
+        SELECT route_id, content_hash, model_name
+        FROM route_embeddings
+        WHERE route_id IN ({placeholders})
+    """
+    return fetch_df(sql, params=tuple(int(r) for r in route_ids))
 
 
-def upsert_embeddings(route_ids: List[int], embeddings: np.ndarray) -> None:
+def select_stale(df: pd.DataFrame, state: Optional[pd.DataFrame] = None,
+                 model_name: str = EMBEDDING_MODEL_NAME) -> pd.DataFrame:
+    """
+    Keep only rows that need (re-)encoding.
+
+    A row is stale when it has no stored embedding state, its description
+    hash differs from the stored `content_hash`, or it was embedded with a
+    different model. `df` needs route_id and description; stored state comes
+    from `state` or, if absent, from df's own content_hash/model_name columns.
+    Adds a `content_hash` column with the new hashes.
+    """
+    df = df.copy()
+    new_hash = df["description"].astype(str).map(description_hash)
+    if state is not None:
+        df = df.drop(columns=["content_hash", "model_name"], errors="ignore")
+        df = df.merge(state, on="route_id", how="left")
+    stale = (df["content_hash"].to_numpy() != new_hash.to_numpy()) | (df["model_name"] != model_name).to_numpy()
+    df["content_hash"] = new_hash.to_numpy()
+    return df[stale][["route_id", "description", "content_hash"]].reset_index(drop=True)
+
+
+def upsert_embeddings(
+    route_ids: List[int],
+    embeddings: np.ndarray,
+    descriptions: List[str],
+    content_hashes: Optional[List[str]] = None,
+    model_name: str = EMBEDDING_MODEL_NAME,
+) -> None:
     sql = """
-        INSERT INTO route_embeddings (route_id, embedding)
-        VALUES (?, ?)
-        ON DUPLICATE KEY UPDATE embedding=VALUES(embedding)
+        INSERT INTO route_embeddings (route_id, description, embedding, embedding_q, content_hash, model_name)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            description=VALUES(description),
+            embedding=VALUES(embedding),
+            embedding_q=VALUES(embedding_q),
+            content_hash=VALUES(content_hash),
+            model_name=VALUES(model_name)
     """
-    # MariaDB Python connector accepts bytes for VECTOR parameter (binary). For clarity, pass as Python list.
-    rows: List[Tuple[int, list]] = [
-        (int(rid), emb.astype(float).tolist()) for rid, emb in zip(route_ids, embeddings)
+    if content_hashes is None:
+        content_hashes = [description_hash(d) for d in descriptions]
+    embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(route_ids), -1)
+    # Compact copy for the resident index; NULL when the index reads float32
+    compact: List[Optional[bytes]] = [None] * len(route_ids)
+    if EMBEDDING_QUANTIZATION != "none" and len(route_ids):
+        compact = encode_blobs(normalize_rows(embeddings), EMBEDDING_QUANTIZATION)
+    # VECTOR columns accept little-endian float32 bytes
+    rows: List[Tuple[int, str, bytes, Optional[bytes], str, str]] = [
+        (int(rid), desc, emb.tobytes(), blob, digest, model_name)
+        for rid, desc, emb, blob, digest in zip(route_ids, descriptions, embeddings, compact, content_hashes)
     ]
     executemany_sql(sql, rows)
+    invalidate_embedding_index()
+
 
+def embed_all(limit: int = 50000, chunksize: int = 5000) -> int:
+    """
+    Re-embed stored descriptions that changed since they were last encoded.
 
-def embed_all(limit: int = 50000) -> None:
-    df = fetch_descriptions(limit=limit)
-    if df.empty:
-        return
-    route_ids = df["route_id"].astype(int).tolist()
-    texts = df["description"].astype(str).tolist()
-    vectors = embed_texts(texts)
-    if vectors.shape[1] != EMBEDDING_DIMENSIONS:
-        # Re-encode without normalization to ensure shape, though model should match settings
-        vectors = vectors.astype(float)
-    upsert_embeddings(route_ids, vectors)
+    Returns:
+        int: Number of routes (re-)encoded.
+    """
+    # Stream descriptions so peak memory is one chunk, not the whole table
+    stale_chunks = (select_stale(df) for df in iter_descriptions(limit=limit, chunksize=chunksize))
+    stats = run_embedding_pipeline(stale_chunks, upsert_embeddings, label="Re-embedding")
+    if stats["rows"]:
+        bump_data_version()
+    return stats["rows"]
 
 
 if __name__ == "__main__":
-    embed_all()
+    print(f"Re-embedded {embed_all()} changed routes.")
@@ -0,0 +1,330 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.config.data_version import current_data_version
+from backend.config.db_config import fetch_df, iter_df_chunks
+from backend.config.settings import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_INDEX_REFRESH_SECONDS,
+    EMBEDDING_QUANTIZATION,
+    EMBEDDING_RESCORE_FACTOR,
+)
+from .quantization import blob_size, decode_blobs, dequantize, quantize
+
+# Rows scored per block when the matrix is quantized: each block is widened
+# to float32 on its own, so the scan never materializes a full float32 copy.
+_SCAN_BLOCK = 16384
+
+
+class EmbeddingIndex:
+    """
+    Process-resident copy of `route_embeddings`.
+
+    Holds a contiguous matrix with L2-normalized rows plus the matching
+    route_id array, so cosine similarity against every route is a single
+    matrix-vector product. The matrix is float32, or float16 / int8 with
+    per-row scales (see quantization.py); quantized scores are approximate,
+    so the best `top_k * rescore_factor` candidates are re-ranked with exact
+    float32 vectors from `rescore_fn`.
+    """
+
+    def __init__(
+        self,
+        route_ids: np.ndarray,
+        matrix: np.ndarray,
+        signature: Tuple = (),
+        scales: Optional[np.ndarray] = None,
+        rescore_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        rescore_factor: int = EMBEDDING_RESCORE_FACTOR,
+    ):
+        self.route_ids = np.ascontiguousarray(route_ids, dtype=np.int64)
+        self.matrix = np.ascontiguousarray(matrix)
+        self.scales = None if scales is None else np.ascontiguousarray(scales, dtype=np.float32)
+        self.signature = signature
+        self.rescore_fn = rescore_fn
+        self.rescore_factor = max(1, int(rescore_factor))
+        self._positions = {int(rid): pos for pos, rid in enumerate(self.route_ids)}
+
+    def __len__(self) -> int:
+        return int(self.route_ids.shape[0])
+
+    @property
+    def quantized(self) -> bool:
+        return self.matrix.dtype != np.float32
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes + (0 if self.scales is None else self.scales.nbytes))
+
+    def position(self, route_id: int, default: Optional[int] = None) -> Optional[int]:
+        return self._positions.get(int(route_id), default)
+
+    def vectors(self, positions: np.ndarray) -> np.ndarray:
+        """float32 rows for the given positions (dequantized if needed)."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if not self.quantized:
+            return self.matrix[positions]
+        return dequantize(self.matrix[positions], None if self.scales is None else self.scales[positions])
+
+    def vector(self, position: int) -> np.ndarray:
+        return self.vectors(np.array([position]))[0]
+
+    def scores(self, queries: np.ndarray, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of normalized (m, d) queries against all rows or a subset -> (m, rows)."""
+        if positions is not None:
+            return queries @ self.vectors(positions).T
+        if not self.quantized:
+            return queries @ self.matrix.T
+        out = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), _SCAN_BLOCK):
+            stop = min(start + _SCAN_BLOCK, len(self))
+            out[:, start:stop] = queries @ self.vectors(np.arange(start, stop)).T
+        return out
+
+    def _rescore(self, queries: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Exact float32 similarities for (m, c) candidate positions, fetched once for the union."""
+        unique, inverse = np.unique(candidates, return_inverse=True)
+        exact = normalize_rows(self.rescore_fn(self.route_ids[unique]))
+        exact_sims = queries @ exact.T
+        return np.take_along_axis(exact_sims, inverse.reshape(candidates.shape), axis=1)
+
+    def _top_k(self, queries: np.ndarray, sims: np.ndarray, top_k: int, positions: Optional[np.ndarray] = None
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """Partial sort of (m, c) scores; `positions` maps score columns to matrix rows."""
+        rescore = self.quantized and self.rescore_fn is not None and self.rescore_factor > 1
+        k = min(top_k, sims.shape[1])
+        wanted = min(k * self.rescore_factor, sims.shape[1]) if rescore else k
+        candidates = np.argpartition(-sims, wanted - 1, axis=1)[:, :wanted]
+        candidate_sims = np.take_along_axis(sims, candidates, axis=1)
+        if positions is not None:
+            candidates = positions[candidates]
+        if rescore:
+            excluded = ~np.isfinite(candidate_sims)
+            candidate_sims = self._rescore(queries, candidates)
+            candidate_sims[excluded] = -np.inf
+        order = np.argsort(-candidate_sims, axis=1, kind="stable")[:, :k]
+        best = np.take_along_axis(candidates, order, axis=1)
+        best_sims = np.take_along_axis(candidate_sims, order, axis=1)
+        return self.route_ids[best], (1.0 - best_sims).astype(np.float32)
+
+    def search(
+        self, query: np.ndarray, top_k: int = 10, exclude: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank all routes against a query vector.
+
+        Args:
+            query (np.ndarray): Query embedding (normalized here, any scale accepted).
+            top_k (int): Number of neighbours to return.
+            exclude (Optional[int]): Matrix position to leave out (the query route itself).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Route IDs and cosine distances, closest first.
+        """
+        exclude_arr = None if exclude is None else np.array([exclude], dtype=np.int64)
+        ids, distances = self.search_many(np.atleast_2d(query), top_k, exclude=exclude_arr)
+        return ids[0], distances[0]
+
+    def search_positions(
+        self, query: np.ndarray, positions: np.ndarray, top_k: int = 10
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rank only the given candidate rows (used by the IVF index)."""
+        queries = normalize_rows(np.atleast_2d(query))
+        positions = np.asarray(positions, dtype=np.int64)
+        if positions.size == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        sims = self.scores(queries, positions)
+        ids, distances = self._top_k(queries, sims, int(top_k), positions=positions)
+        return ids[0], distances[0]
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 10,
+        exclude: Optional[np.ndarray] = None,
+        chunk_size: int = 256,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank all routes against many queries with matrix-matrix products.
+
+        Args:
+            queries (np.ndarray): (m, d) query embeddings.
+            top_k (int): Neighbours per query.
+            exclude (Optional[np.ndarray]): Per-query matrix position to leave out, -1 for none.
+            chunk_size (int): Queries scored per product, bounds the (chunk, n) score buffer.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (m, k) route IDs and cosine distances, closest first.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        m = queries.shape[0]
+        if exclude is None:
+            exclude = np.full(m, -1, dtype=np.int64)
+        k = min(int(top_k), len(self) - int((exclude >= 0).any()))
+        if k <= 0 or m == 0:
+            return np.empty((m, 0), dtype=np.int64), np.empty((m, 0), dtype=np.float32)
+
+        ids = np.empty((m, k), dtype=np.int64)
+        distances = np.empty((m, k), dtype=np.float32)
+        for start in range(0, m, chunk_size):
+            stop = min(start + chunk_size, m)
+            sims = self.scores(queries[start:stop])
+            rows = np.nonzero(exclude[start:stop] >= 0)[0]
+            sims[rows, exclude[start:stop][rows]] = -np.inf
+            ids[start:stop], distances[start:stop] = self._top_k(queries[start:stop], sims, k)
+        return ids, distances
+
+
+def decode_embeddings(blobs: pd.Series, dimensions: int = EMBEDDING_DIMENSIONS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode float32 BLOBs into one (n, dimensions) matrix.
+
+    Returns the matrix and a boolean mask of the rows that had a valid blob,
+    so callers can align their route_ids.
+    """
+    expected = dimensions * 4
+    valid = blobs.map(lambda b: b is not None and len(b) == expected).to_numpy(dtype=bool)
+    payload = b"".join(bytes(b) for b in blobs[valid])
+    matrix = np.frombuffer(payload, dtype=np.float32).reshape(-1, dimensions)
+    return matrix, valid
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def fetch_signature() -> Tuple:
+    """Cheap change marker for `route_embeddings` (row count + last write time)."""
+    df = fetch_df(
+        "SELECT COUNT(*) AS n, MAX(updated_at) AS last_update "
+        "FROM route_embeddings WHERE embedding IS NOT NULL"
+    )
+    if df.empty:
+        return (0, None)
+    return (int(df.at[0, "n"]), str(df.at[0, "last_update"]))
+
+
+def fetch_float32_vectors(route_ids: np.ndarray) -> np.ndarray:
+    """Exact stored vectors for a few routes (the rescoring step of quantized search)."""
+    route_ids = [int(r) for r in route_ids]
+    placeholders = ", ".join(["%s"] * len(route_ids))
+    df = fetch_df(
+        f"SELECT route_id, embedding FROM route_embeddings WHERE route_id IN ({placeholders})",
+        params=tuple(route_ids),
+    )
+    matrix, valid = decode_embeddings(df["embedding"])
+    by_id = dict(zip(df["route_id"].to_numpy(dtype=np.int64)[valid], matrix))
+    zeros = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+    return np.vstack([by_id.get(rid, zeros) for rid in route_ids])
+
+
+def _load_sql(quantization: str) -> Tuple[str, tuple]:
+    if quantization == "none":
+        return "SELECT route_id, embedding FROM route_embeddings WHERE embedding IS NOT NULL", ()
+    # Ship the compact blob; fall back to float32 only for rows not yet backfilled
+    sql = """
+        SELECT route_id, embedding_q,
+               IF(embedding_q IS NULL OR LENGTH(embedding_q) <> %s, embedding, NULL) AS embedding
+        FROM route_embeddings
+        WHERE embedding IS NOT NULL
+    """
+    return sql, (blob_size(quantization),)
+
+
+def _decode_chunk(chunk: pd.DataFrame, quantization: str) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    if quantization == "none":
+        vectors, valid = decode_embeddings(chunk["embedding"])
+        return chunk["route_id"].to_numpy(dtype=np.int64)[valid], normalize_rows(vectors), None
+
+    codes, scales, valid_q = decode_blobs(chunk["embedding_q"], quantization)
+    ids = [chunk["route_id"].to_numpy(dtype=np.int64)[valid_q]]
+    code_parts, scale_parts = [codes], [scales]
+    rest = chunk[~valid_q]
+    if not rest.empty:
+        vectors, valid = decode_embeddings(rest["embedding"])
+        extra_codes, extra_scales = quantize(normalize_rows(vectors), quantization)
+        ids.append(rest["route_id"].to_numpy(dtype=np.int64)[valid])
+        code_parts.append(extra_codes)
+        scale_parts.append(extra_scales)
+    merged_scales = None if scales is None else np.concatenate(scale_parts)
+    return np.concatenate(ids), np.concatenate(code_parts), merged_scales
+
+
+def load_embedding_index(chunksize: int = 10000, quantization: str = EMBEDDING_QUANTIZATION) -> EmbeddingIndex:
+    # Read the signature first: a write that lands during the load shows up
+    # as a changed signature on the next poll instead of being missed.
+    signature = fetch_signature()
+
+    # Stream the BLOBs in chunks straight into a preallocated matrix so the
+    # raw result set is never materialized in full.
+    dtype = {"none": np.float32, "float16": np.float16, "int8": np.int8}[quantization]
+    capacity = max(int(signature[0]), 1)
+    matrix = np.empty((capacity, EMBEDDING_DIMENSIONS), dtype=dtype)
+    scales = np.empty(capacity, dtype=np.float32) if quantization == "int8" else None
+    route_ids = np.empty(capacity, dtype=np.int64)
+    filled = 0
+    sql, params = _load_sql(quantization)
+    for chunk in iter_df_chunks(sql, params=params, chunksize=chunksize):
+        ids, codes, chunk_scales = _decode_chunk(chunk, quantization)
+        if filled + len(ids) > capacity:
+            # Rows inserted after the signature was read
+            capacity = max(2 * capacity, filled + len(ids))
+            matrix = np.resize(matrix, (capacity, EMBEDDING_DIMENSIONS))
+            route_ids = np.resize(route_ids, capacity)
+            scales = None if scales is None else np.resize(scales, capacity)
+        matrix[filled:filled + len(ids)] = codes
+        route_ids[filled:filled + len(ids)] = ids
+        if scales is not None:
+            scales[filled:filled + len(ids)] = chunk_scales
+        filled += len(ids)
+
+    return EmbeddingIndex(
+        route_ids[:filled],
+        matrix[:filled],
+        signature,
+        scales=None if scales is None else scales[:filled],
+        rescore_fn=None if quantization == "none" else fetch_float32_vectors,
+    )
+
+
+_index: Optional[EmbeddingIndex] = None
+_checked_at: float = 0.0
+_checked_version: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    """
+    Return the shared index, loading it on first use.
+
+    The table signature is re-read as soon as data_version moves and
+    otherwise at most every EMBEDDING_INDEX_REFRESH_SECONDS; the matrix is
+    reloaded if `route_embeddings` has changed.
+    """
+    global _index, _checked_at, _checked_version
+    version = current_data_version()
+    with _lock:
+        now = time.monotonic()
+        if _index is None:
+            _index = load_embedding_index()
+            _checked_at, _checked_version = now, version
+        elif version != _checked_version or now - _checked_at >= EMBEDDING_INDEX_REFRESH_SECONDS:
+            _checked_at, _checked_version = now, version
+            if fetch_signature() != _index.signature:
+                _index = load_embedding_index()
+        return _index
+
+
+def invalidate_embedding_index() -> None:
+    """Drop the resident index so the next search reloads it (call after writes)."""
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .model_loader import embed_texts
+
+# write(route_ids, embeddings, descriptions, content_hashes)
+WriteFn = Callable[[List[int], np.ndarray, List[str], List[str]], None]
+
+
+class BatchSizeTuner:
+    """
+    Hill-climbs the encode batch size on measured rows/sec.
+
+    Keeps growing while throughput holds up and backs off when a larger
+    batch got slower (e.g. memory pressure or padding to long texts).
+    """
+
+    def __init__(self, initial: int = 500, minimum: int = 64, maximum: int = 4096):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.batch_size = max(minimum, min(initial, maximum))
+        self._last_rate: Optional[float] = None
+
+    def record(self, rows: int, seconds: float) -> None:
+        if rows < self.batch_size or seconds <= 0:
+            return  # tail batches say nothing about the chosen size
+        rate = rows / seconds
+        if self._last_rate is None or rate >= 0.95 * self._last_rate:
+            self.batch_size = min(self.maximum, int(self.batch_size * 1.5))
+        else:
+            self.batch_size = max(self.minimum, int(self.batch_size * 0.75))
+        self._last_rate = rate
+
+
+class ProgressReport:
+    """Throttled rows/sec progress line for long embedding runs."""
+
+    def __init__(self, label: str = "Embedding", total: Optional[int] = None, every_seconds: float = 5.0):
+        self.label = label
+        self.total = total
+        self.every_seconds = every_seconds
+        self.started = time.perf_counter()
+        self._last_print = self.started
+
+    def update(self, rows_written: int, batch_size: int, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last_print < self.every_seconds:
+            return
+        self._last_print = now
+        elapsed = max(now - self.started, 1e-9)
+        of_total = f"/{self.total}" if self.total else ""
+        print(f"{self.label}: {rows_written}{of_total} rows written, "
+              f"{rows_written / elapsed:,.0f} rows/s, batch size {batch_size}")
+
+
+class _BackgroundWriter:
+    """Single writer thread fed through a bounded queue (back-pressure on the encoder)."""
+
+    def __init__(self, write: WriteFn, queue_size: int = 4):
+        self._write = write
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=queue_size)
+        self._error: Optional[BaseException] = None
+        self.rows_written = 0
+        self._thread = threading.Thread(target=self._run, name="embedding-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue  # drain after a failure so the producer never blocks forever
+            try:
+                self._write(*item)
+                self.rows_written += len(item[0])
+            except BaseException as exc:
+                self._error = exc
+
+    def submit(self, route_ids: List[int], embeddings: np.ndarray, descriptions: List[str],
+               content_hashes: List[str]) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put((route_ids, embeddings, descriptions, content_hashes))
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def run_embedding_pipeline(
+    chunks: Iterable[pd.DataFrame],
+    write: WriteFn,
+    batch_size: int = 500,
+    min_batch_size: int = 64,
+    max_batch_size: int = 4096,
+    queue_size: int = 4,
+    total: Optional[int] = None,
+    label: str = "Embedding",
+) -> Dict[str, Any]:
+    """
+    Encode and store route descriptions with encoding and DB writes overlapped.
+
+    Each chunk (route_id, description, content_hash) has its identical
+    descriptions collapsed before encoding. Unique texts are encoded in
+    adaptively sized batches on the calling thread while a background thread
+    writes the previous batch, so the model never waits on the database.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Rows to embed, e.g. the stale rows of each streamed chunk.
+        write (WriteFn): Persists one batch, e.g. `embed_routes.upsert_embeddings`.
+        batch_size (int): Initial number of unique texts per encode call.
+        min_batch_size (int): Lower bound for the tuner.
+        max_batch_size (int): Upper bound for the tuner.
+        queue_size (int): Encoded batches allowed to wait for the writer.
+        total (Optional[int]): Expected row count, only used for progress output.
+        label (str): Prefix for progress lines.
+
+    Returns:
+        Dict[str, Any]: rows, unique_texts, seconds and rows_per_second.
+    """
+    tuner = BatchSizeTuner(batch_size, min_batch_size, max_batch_size)
+    progress = ProgressReport(label, total)
+    writer = _BackgroundWriter(write, queue_size)
+    rows = unique_texts = 0
+    started = time.perf_counter()
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            codes, uniques = pd.factorize(chunk["description"].astype(str))
+            route_ids = chunk["route_id"].astype(int).to_numpy()
+            hashes = chunk["content_hash"].to_numpy()
+            descriptions = chunk["description"].astype(str).to_numpy()
+            rows += len(chunk)
+            unique_texts += len(uniques)
+
+            pos = 0
+            while pos < len(uniques):
+                n = tuner.batch_size
+                t0 = time.perf_counter()
+                vectors = np.asarray(embed_texts(list(uniques[pos:pos + n])), dtype=np.float32)
+                tuner.record(len(vectors), time.perf_counter() - t0)
+
+                # Every row whose text was in this encode batch can be written now
+                in_batch = (codes >= pos) & (codes < pos + n)
+                writer.submit(
+                    route_ids[in_batch].tolist(),
+                    vectors[codes[in_batch] - pos],
+                    descriptions[in_batch].tolist(),
+                    hashes[in_batch].tolist(),
+                )
+                pos += n
+                progress.update(writer.rows_written, tuner.batch_size)
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - started
+    progress.update(writer.rows_written, tuner.batch_size, force=True)
+    return {
+        "rows": rows,
+        "unique_texts": unique_texts,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+    }
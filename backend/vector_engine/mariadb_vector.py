@@ -0,0 +1,78 @@
+from __future__ import annotations
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import mysql.connector
+
+from backend.config.db_config import fetch_df
+from backend.config.settings import USE_MARIADB_VECTOR
+
+# MySQL/MariaDB error codes meaning "this server has no vector support":
+# unknown function, syntax error, unknown column type.
+_UNSUPPORTED_ERRNOS = {1064, 1305, 4161}
+
+_supported: Optional[bool] = None
+
+
+class VectorSearchUnavailable(RuntimeError):
+    """Raised when the server cannot run VEC_DISTANCE_COSINE queries."""
+
+
+def is_vector_supported() -> bool:
+    """False once the server has rejected a vector query (or the feature flag is off)."""
+    return USE_MARIADB_VECTOR and _supported is not False
+
+
+def _run(sql: str, params: tuple) -> pd.DataFrame:
+    global _supported
+    if not is_vector_supported():
+        raise VectorSearchUnavailable("MariaDB vector search is disabled or unsupported by the server.")
+    try:
+        df = fetch_df(sql, params=params)
+    except mysql.connector.Error as exc:
+        if getattr(exc, "errno", None) in _UNSUPPORTED_ERRNOS:
+            _supported = False
+        raise VectorSearchUnavailable(str(exc)) from exc
+    _supported = True
+    return df
+
+
+def fetch_route_embedding(route_id: int) -> Optional[np.ndarray]:
+    df = fetch_df("SELECT embedding FROM route_embeddings WHERE route_id = %s", params=(int(route_id),))
+    if df.empty or df.at[0, "embedding"] is None:
+        return None
+    return np.frombuffer(bytes(df.at[0, "embedding"]), dtype=np.float32)
+
+
+def vector_search(query: np.ndarray, top_k: int = 10, with_description: bool = False) -> pd.DataFrame:
+    """
+    Rank routes server-side with `ORDER BY VEC_DISTANCE_COSINE(...) LIMIT k`.
+
+    The query is bound as a constant float32 blob so the optimizer can use the
+    VECTOR index on `route_embeddings.embedding`; only k rows come back.
+    """
+    columns = "route_id, description" if with_description else "route_id"
+    sql = f"""
+        SELECT {columns},
+               VEC_DISTANCE_COSINE(embedding, %s) AS cosine_distance
+        FROM route_embeddings
+        ORDER BY VEC_DISTANCE_COSINE(embedding, %s)
+        LIMIT %s
+    """
+    blob = np.asarray(query, dtype=np.float32).tobytes()
+    return _run(sql, (blob, blob, int(top_k)))
+
+
+def vector_search_by_route(route_id: int, top_k: int = 10) -> pd.DataFrame:
+    if not is_vector_supported():
+        raise VectorSearchUnavailable("MariaDB vector search is disabled or unsupported by the server.")
+    target = fetch_route_embedding(route_id)
+    if target is None:
+        raise ValueError(f"Route ID {route_id} not found in database or has no embedding.")
+
+    # Ask for one extra row: the route itself comes back at distance 0
+    df = vector_search(target, top_k=top_k + 1)
+    df = df[df["route_id"] != route_id].head(top_k)
+    df = df.rename(columns={"route_id": "neighbor_route_id"})
+    return df[["neighbor_route_id", "cosine_distance"]].reset_index(drop=True)
@@ -1,11 +1,15 @@
 from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
 from functools import lru_cache
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Optional
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
-from backend.config.settings import EMBEDDING_MODEL_NAME
+from backend.config.settings import EMBEDDING_MODEL_NAME, QUERY_CACHE_DIR, QUERY_CACHE_SIZE
 
 
 @lru_cache(maxsize=1)
@@ -17,3 +21,109 @@ def embed_texts(texts: List[str]) -> np.ndarray:
     model = get_embedding_model()
     embeddings = model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
     return embeddings
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive cache key for free-text queries."""
+    return " ".join(str(text).lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of normalized query text -> embedding.
+
+    Keys include the model name, so switching EMBEDDING_MODEL_NAME never
+    serves stale vectors. With `cache_dir` set, entries are also written as
+    .npy files and survive restarts (the in-memory LRU stays the first tier).
+    """
+
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE, cache_dir: Optional[Path] = None,
+                 model_name: str = EMBEDDING_MODEL_NAME):
+        self.max_size = max_size
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.model_name = model_name
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\n{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        return self.cache_dir / f"{key}.npy" if self.cache_dir else None
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Like `embed_texts`, but only cache misses reach the model (in one batch)."""
+        keys = [self._key(t) for t in texts]
+        found: Dict[int, np.ndarray] = {}
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[i] = self._entries[key]
+                    self.hits += 1
+
+        for i, key in enumerate(keys):
+            if i in found:
+                continue
+            path = self._disk_path(key)
+            if path is not None and path.exists():
+                try:
+                    found[i] = np.load(path)
+                    self._remember(key, found[i])
+                    with self._lock:
+                        self.disk_hits += 1
+                    continue
+                except (OSError, ValueError):
+                    pass
+            missing.setdefault(key, []).append(i)
+
+        if missing:
+            with self._lock:
+                self.misses += len(missing)
+            first = [positions[0] for positions in missing.values()]
+            vectors = embed_texts([texts[i] for i in first])
+            for (key, positions), vector in zip(missing.items(), vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                for i in positions:
+                    found[i] = vector
+                path = self._disk_path(key)
+                if path is not None:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    np.save(path, vector)
+
+        return np.vstack([found[i] for i in range(len(texts))]) if texts else np.empty((0, 0), dtype=np.float32)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "model_name": self.model_name,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_query_cache() -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(QUERY_CACHE_SIZE, QUERY_CACHE_DIR or None)
+
+
+def embed_queries(texts: List[str]) -> np.ndarray:
+    """Embed user queries through the shared LRU cache (descriptions should use `embed_texts`)."""
+    return get_query_cache().embed(texts)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+import argparse
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.config.settings import EMBEDDING_DIMENSIONS
+
+QUANTIZATIONS = ("none", "float16", "int8")
+
+
+def blob_size(quantization: str, dimensions: int = EMBEDDING_DIMENSIONS) -> int:
+    """Bytes per stored vector: float16 halves float32, int8 is d bytes plus a float32 scale."""
+    if quantization == "float16":
+        return 2 * dimensions
+    if quantization == "int8":
+        return 4 + dimensions
+    return 4 * dimensions
+
+
+def quantize(matrix: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Compress a float32 (n, d) matrix.
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]: Codes (float32/float16/int8) and, for
+        int8, the per-vector float32 scales (value = code * scale).
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if quantization == "float16":
+        return matrix.astype(np.float16), None
+    if quantization == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return matrix, None
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    values = np.asarray(codes).astype(np.float32)
+    if scales is not None:
+        values *= np.asarray(scales, dtype=np.float32).reshape(-1, 1)
+    return values
+
+
+def encode_blobs(matrix: np.ndarray, quantization: str) -> list:
+    """Per-row bytes for the `embedding_q` column (int8 rows are scale + codes)."""
+    codes, scales = quantize(np.atleast_2d(matrix), quantization)
+    if scales is None:
+        return [row.tobytes() for row in codes]
+    return [scale.tobytes() + row.tobytes() for scale, row in zip(scales, codes)]
+
+
+def decode_blobs(
+    blobs: pd.Series, quantization: str, dimensions: int = EMBEDDING_DIMENSIONS
+) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+    """
+    Decode `embedding_q` blobs of the given format.
+
+    Returns codes, scales (int8 only) and a mask of the rows that held a blob
+    of the expected size.
+    """
+    expected = blob_size(quantization, dimensions)
+    valid = blobs.map(lambda b: b is not None and len(b) == expected).to_numpy(dtype=bool)
+    payload = np.frombuffer(b"".join(bytes(b) for b in blobs[valid]), dtype=np.uint8).reshape(-1, expected)
+    if quantization == "float16":
+        return payload.view(np.float16).reshape(-1, dimensions), None, valid
+    if quantization == "int8":
+        scales = np.ascontiguousarray(payload[:, :4]).view(np.float32).ravel()
+        codes = np.ascontiguousarray(payload[:, 4:]).view(np.int8)
+        return codes, scales, valid
+    return payload.view(np.float32).reshape(-1, dimensions), None, valid
+
+
+def quantization_report(sample_size: int = 200, top_k: int = 10, rescore_factor: int = 4, seed: int = 0) -> pd.DataFrame:
+    """
+    Recall of quantized search against the exact float32 ranking.
+
+    Builds each quantized variant in memory from the float32 index, then
+    compares top-k results for sampled routes with and without the float32
+    rescoring step. Memory is the size of the search matrix (plus scales).
+    """
+    from .embedding_index import EmbeddingIndex, load_embedding_index
+
+    exact = load_embedding_index(quantization="none")
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(exact), size=min(sample_size, len(exact)), replace=False)
+    truth = [set(exact.search(exact.vector(pos), top_k, exclude=pos)[0].tolist()) for pos in queries]
+
+    def exact_vectors(route_ids: np.ndarray) -> np.ndarray:
+        return exact.vectors(np.array([exact.position(r) for r in route_ids], dtype=np.int64))
+
+    rows = []
+    for quantization in QUANTIZATIONS:
+        codes, scales = quantize(exact.matrix, quantization)
+        for factor in ((1,) if quantization == "none" else (1, rescore_factor)):
+            index = EmbeddingIndex(
+                exact.route_ids, codes, exact.signature, scales=scales,
+                rescore_fn=exact_vectors, rescore_factor=factor,
+            )
+            hits = 0
+            for pos, expected in zip(queries, truth):
+                found = index.search(exact.vector(pos), top_k, exclude=pos)[0]
+                hits += len(expected.intersection(found.tolist()))
+            rows.append({
+                "quantization": quantization,
+                "rescore_factor": factor,
+                "matrix_mb": index.nbytes / 1e6,
+                f"recall_at_{top_k}": hits / max(sum(len(t) for t in truth), 1),
+            })
+    return pd.DataFrame(rows)
+
+
+def backfill_quantized(quantization: str, chunksize: int = 5000) -> int:
+    """Fill `embedding_q` from the float32 `embedding` column where missing or in another format."""
+    from backend.config.db_config import executemany_sql, iter_df_chunks
+    from .embedding_index import decode_embeddings, normalize_rows
+
+    sql = """
+        SELECT route_id, embedding FROM route_embeddings
+        WHERE embedding IS NOT NULL AND (embedding_q IS NULL OR LENGTH(embedding_q) <> %s)
+    """
+    updated = 0
+    for chunk in iter_df_chunks(sql, params=(blob_size(quantization),), chunksize=chunksize):
+        matrix, valid = decode_embeddings(chunk["embedding"])
+        blobs = encode_blobs(normalize_rows(matrix), quantization)
+        route_ids = chunk["route_id"].to_numpy(dtype=np.int64)[valid]
+        executemany_sql(
+            "UPDATE route_embeddings SET embedding_q = %s WHERE route_id = %s",
+            [(blob, int(rid)) for blob, rid in zip(blobs, route_ids)],
+        )
+        updated += len(route_ids)
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantized embedding storage and recall report")
+    parser.add_argument("--backfill", choices=QUANTIZATIONS[1:], help="Fill embedding_q in this format")
+    parser.add_argument("--report", action="store_true", help="Print recall vs exact float32 ranking")
+    args = parser.parse_args()
+
+    if args.backfill:
+        print(f"Wrote {backfill_quantized(args.backfill)} {args.backfill} embeddings to embedding_q")
+    if args.report:
+        print(quantization_report().to_string(index=False))
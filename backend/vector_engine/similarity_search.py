@@ -1,67 +1,230 @@
 from __future__ import annotations
-from typing import List, Tuple
+import time
+from typing import Iterable, List, Optional, Tuple
 
 import pandas as pd
 import numpy as np
 from backend.config.db_config import fetch_df
-from .model_loader import embed_texts
-
-
-def similar_routes_by_route_id(route_id: int, top_k: int = 10) -> pd.DataFrame:
-    # Fetch all embeddings
-    df = fetch_df("SELECT route_id, embedding FROM route_embeddings")
-    
-    # Drop rows with missing embeddings
-    df = df[df['embedding'].notna()].copy()
-    if df.empty:
-        return pd.DataFrame(columns=['neighbor_route_id', 'cosine_distance'])
-    
-    # Convert BLOB -> NumPy array
-    df['embedding'] = df['embedding'].apply(lambda b: np.frombuffer(b, dtype=np.float32))
-    
+from backend.config.settings import ANN_NPROBE, SIMILARITY_BACKEND
+from .ann_index import get_ann_index
+from .embedding_index import EmbeddingIndex, get_embedding_index
+from .mariadb_vector import (
+    VectorSearchUnavailable,
+    is_vector_supported,
+    vector_search,
+    vector_search_by_route,
+)
+from .model_loader import embed_queries
+
+SEARCH_BACKENDS = ("mariadb", "exact", "ivf")
+
+
+def fetch_route_descriptions(route_ids: List[int]) -> pd.DataFrame:
+    if not route_ids:
+        return pd.DataFrame(columns=['route_id', 'description'])
+    placeholders = ", ".join(["%s"] * len(route_ids))
+    sql = f"SELECT route_id, description FROM route_embeddings WHERE route_id IN ({placeholders})"
+    return fetch_df(sql, params=tuple(int(r) for r in route_ids))
+
+
+def fetch_route_distances(route_ids: List[int]) -> pd.DataFrame:
+    """Stored great-circle distance (routes.distance_km) for a handful of routes."""
+    if not route_ids:
+        return pd.DataFrame(columns=['route_id', 'distance_km'])
+    placeholders = ", ".join(["%s"] * len(route_ids))
+    sql = f"SELECT route_id, distance_km FROM routes WHERE route_id IN ({placeholders})"
+    return fetch_df(sql, params=tuple(int(r) for r in route_ids))
+
+
+def _with_score_and_distance(df: pd.DataFrame, id_col: str) -> pd.DataFrame:
+    """Add score (cosine similarity, 1 - cosine_distance) and the route's distance_km."""
+    df = df.copy()
+    df['score'] = 1.0 - df['cosine_distance'].astype(float)
+    distances = fetch_route_distances(df[id_col].dropna().astype(int).tolist())
+    distances = distances.rename(columns={'route_id': id_col})
+    return df.merge(distances, on=id_col, how='left')
+
+
+def _resolve_backend(backend: Optional[str]) -> str:
+    backend = (backend or SIMILARITY_BACKEND).lower()
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown similarity backend '{backend}', expected one of {SEARCH_BACKENDS}.")
+    return backend
+
+
+def _search(
+    index: EmbeddingIndex,
+    query: np.ndarray,
+    top_k: int,
+    exclude: Optional[int] = None,
+    backend: str = "exact",
+    nprobe: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    if backend == "ivf":
+        return get_ann_index(index).search(index, query, top_k, exclude=exclude, nprobe=nprobe or ANN_NPROBE)
+    return index.search(query, top_k, exclude=exclude)
+
+
+def similar_routes_by_route_id(
+    route_id: int, top_k: int = 10, backend: Optional[str] = None, nprobe: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Nearest routes to one route's embedding.
+
+    Returns:
+        pd.DataFrame: neighbor_route_id, cosine_distance, score and distance_km.
+    """
+    backend = _resolve_backend(backend)
+    if backend == "mariadb":
+        try:
+            return _with_score_and_distance(vector_search_by_route(route_id, top_k=top_k), 'neighbor_route_id')
+        except VectorSearchUnavailable:
+            backend = "exact"  # server lacks vector support: rank in Python instead
+
+    index = get_embedding_index()
+    if len(index) == 0:
+        return pd.DataFrame(columns=['neighbor_route_id', 'cosine_distance', 'score', 'distance_km'])
+
     # Extract target embedding
-    target_row = df.loc[df['route_id'] == route_id]
-    if target_row.empty:
+    position = index.position(route_id)
+    if position is None:
         raise ValueError(f"Route ID {route_id} not found in database or has no embedding.")
-    
-    target = target_row['embedding'].values[0]
-    target_norm = np.linalg.norm(target)
-    
-    # Compute cosine distances efficiently
-    df['cosine_distance'] = df['embedding'].apply(
-        lambda x: 1 - (np.dot(target, x) / (target_norm * np.linalg.norm(x)))
+
+    neighbor_ids, distances = _search(
+        index, index.vector(position), top_k, exclude=position, backend=backend, nprobe=nprobe
     )
-    
-    # Filter out the route itself, sort by similarity, and pick top_k
-    df = df[df['route_id'] != route_id].sort_values('cosine_distance').head(top_k)
-    
-    # Rename column for clarity
-    df = df.rename(columns={'route_id': 'neighbor_route_id'})
-    
-    return df[['neighbor_route_id', 'cosine_distance']].reset_index(drop=True)
 
+    df = pd.DataFrame({'neighbor_route_id': neighbor_ids, 'cosine_distance': distances})
+    return _with_score_and_distance(df, 'neighbor_route_id')
+
+
+def similar_routes_by_text(
+    query_text: str, top_k: int = 10, backend: Optional[str] = None, nprobe: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Routes whose description embedding is closest to a free-text query.
 
+    Returns:
+        pd.DataFrame: route_id, description, cosine_distance, score and distance_km.
+    """
+    backend = _resolve_backend(backend)
+    columns = ['route_id', 'description', 'cosine_distance', 'score', 'distance_km']
 
-def similar_routes_by_text(query_text: str, top_k: int = 10) -> pd.DataFrame:
     # Compute query embedding
-    query_vector = embed_texts([query_text])[0]
-    query_norm = np.linalg.norm(query_vector)
-    
-    # Fetch all embeddings
-    df = fetch_df("SELECT route_id, description, embedding FROM route_embeddings")
-    df = df[df['embedding'].notna()].copy()
-    if df.empty:
-        return pd.DataFrame(columns=['route_id', 'description', 'cosine_distance'])
-    
-    # Convert BLOB -> NumPy arrays
-    df['embedding'] = df['embedding'].apply(lambda b: np.frombuffer(b, dtype=np.float32))
-    
-    # Compute cosine similarity
-    df['cosine_distance'] = df['embedding'].apply(
-        lambda x: 1 - (np.dot(query_vector, x) / (query_norm * np.linalg.norm(x)))
-    )
-    
-    # Sort by similarity and take top_k
-    df = df.sort_values('cosine_distance').head(top_k)
-    
-    return df[['route_id', 'description', 'cosine_distance']].reset_index(drop=True)
+    query_vector = np.asarray(embed_queries([query_text])[0], dtype=np.float32)
+
+    if backend == "mariadb":
+        try:
+            df = vector_search(query_vector, top_k=top_k, with_description=True)
+            return _with_score_and_distance(df, 'route_id')[columns].reset_index(drop=True)
+        except VectorSearchUnavailable:
+            backend = "exact"  # server lacks vector support: rank in Python instead
+
+    index = get_embedding_index()
+    if len(index) == 0:
+        return pd.DataFrame(columns=columns)
+
+    route_ids, distances = _search(index, query_vector, top_k, backend=backend, nprobe=nprobe)
+    df = pd.DataFrame({'route_id': route_ids, 'cosine_distance': distances})
+
+    # Only the top_k descriptions cross the wire
+    descriptions = fetch_route_descriptions(route_ids.tolist())
+    df = df.merge(descriptions, on='route_id', how='left')
+
+    return _with_score_and_distance(df, 'route_id')[columns].reset_index(drop=True)
+
+
+def benchmark_backends(
+    sample_size: int = 50,
+    top_k: int = 10,
+    backends: Iterable[str] = SEARCH_BACKENDS,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Time `similar_routes_by_route_id` end to end for each backend.
+
+    Overlap is measured against the exact in-memory ranking, so it doubles as
+    a recall figure for the approximate backends (MariaDB's vector index is
+    approximate too). A backend that fell back is reported as such.
+    """
+    index = get_embedding_index()
+    rng = np.random.default_rng(seed)
+    route_ids = rng.choice(index.route_ids, size=min(sample_size, len(index)), replace=False)
+    truth = {
+        int(rid): set(similar_routes_by_route_id(int(rid), top_k, backend="exact")['neighbor_route_id'])
+        for rid in route_ids
+    }
+
+    rows = []
+    for backend in backends:
+        hits = 0
+        start = time.perf_counter()
+        for rid in route_ids:
+            found = similar_routes_by_route_id(int(rid), top_k, backend=backend)['neighbor_route_id']
+            hits += len(truth[int(rid)].intersection(found.tolist()))
+        elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(route_ids), 1)
+        fell_back = backend == "mariadb" and not is_vector_supported()
+        rows.append({
+            "backend": backend + (" (fallback: exact)" if fell_back else ""),
+            "mean_ms": elapsed_ms,
+            f"recall_at_{top_k}": hits / max(sum(len(t) for t in truth.values()), 1),
+        })
+    return pd.DataFrame(rows)
+
+
+def similar_routes_batch(
+    route_ids: Optional[List[int]] = None, texts: Optional[List[str]] = None, top_k: int = 10
+) -> pd.DataFrame:
+    """
+    Neighbours for many route IDs and/or free-text queries in one pass.
+
+    All uncached texts are encoded with a single `embed_texts` call and every query is
+    ranked against the resident index with matrix-matrix products.
+
+    Args:
+        route_ids (Optional[List[int]]): Routes to find neighbours for (each excluded from its own results).
+        texts (Optional[List[str]]): Free-text queries.
+        top_k (int): Neighbours per query.
+
+    Returns:
+        pd.DataFrame: Long format, one row per (query, neighbour) with columns
+        query_index (position of the query, route_ids first, then texts; repeated
+        queries keep separate positions), query_type, query, rank, route_id,
+        cosine_distance. Route IDs without an embedding produce a single row
+        with a null route_id.
+    """
+    route_ids = [int(r) for r in (route_ids or [])]
+    texts = [str(t) for t in (texts or [])]
+    columns = ['query_index', 'query_type', 'query', 'rank', 'route_id', 'cosine_distance']
+    index = get_embedding_index()
+    if len(index) == 0 or not (route_ids or texts):
+        return pd.DataFrame(columns=columns)
+
+    positions = np.array([index.position(r, default=-1) for r in route_ids], dtype=np.int64)
+    found = positions >= 0
+    query_blocks = [index.vectors(positions[found])]
+    if texts:
+        query_blocks.append(np.asarray(embed_queries(texts), dtype=np.float32))
+    queries = np.vstack(query_blocks)
+    exclude = np.concatenate([positions[found], np.full(len(texts), -1, dtype=np.int64)])
+
+    ids, distances = index.search_many(queries, top_k=top_k, exclude=exclude)
+    k = ids.shape[1]
+
+    labels = [(i, 'route', rid) for i, (rid, ok) in enumerate(zip(route_ids, found)) if ok]
+    labels += [(len(route_ids) + i, 'text', t) for i, t in enumerate(texts)]
+    df = pd.DataFrame({
+        'query_index': np.repeat([i for i, _, _ in labels], k),
+        'query_type': np.repeat([kind for _, kind, _ in labels], k),
+        'query': np.repeat(np.array([value for _, _, value in labels], dtype=object), k),
+        'rank': np.tile(np.arange(1, k + 1), len(labels)),
+        'route_id': ids.ravel(),
+        'cosine_distance': distances.ravel(),
+    })
+
+    missing = [(i, rid) for i, (rid, ok) in enumerate(zip(route_ids, found)) if not ok]
+    if missing:
+        df = pd.concat([df, pd.DataFrame({
+            'query_index': [i for i, _ in missing], 'query_type': 'route', 'query': [rid for _, rid in missing],
+        })], ignore_index=True)
+    return df[columns]
@@ -7,13 +7,13 @@ import sys
 
 # --- Import helpers ---
 try:
-    from frontend.utils.helpers import api_get, apply_global_theme, render_navbar, render_footer, inject_nav_js
+    from frontend.utils.helpers import api_get_with_headers, apply_global_theme, data_age_caption, render_navbar, render_footer, inject_nav_js
 except ModuleNotFoundError:
     _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
     _PROJECT_ROOT = os.path.dirname(os.path.dirname(_THIS_DIR))
     if _PROJECT_ROOT not in sys.path:
         sys.path.insert(0, _PROJECT_ROOT)
-    from frontend.utils.helpers import api_get, apply_global_theme, render_navbar, render_footer, inject_nav_js
+    from frontend.utils.helpers import api_get_with_headers, apply_global_theme, data_age_caption, render_navbar, render_footer, inject_nav_js
 
 # --- Page Config & Theme ---
 st.set_page_config(page_title="Route Search", layout="wide")
@@ -45,8 +45,9 @@ tab1, tab2 = st.tabs(["Top City Pairs", "By City/Country"])
 with tab1:
     st.subheader("Top City Pairs by Frequency")
     try:
-        data = api_get(api_base, "/routes/top-city-pairs", {"limit": limit})
+        data, headers = api_get_with_headers(api_base, "/routes/top-city-pairs", {"limit": limit})
         df = pd.DataFrame(data)
+        st.caption(data_age_caption(headers))
         st.dataframe(df, use_container_width=True)
         if not df.empty:
             fig = px.bar(
@@ -64,16 +65,29 @@ with tab1:
 with tab2:
     st.subheader("Filter by City Pair")
     try:
-        data2 = api_get(api_base, "/routes/top-city-pairs", {"limit": max(limit, 500)})
+        # Filtered and paged on the server; the cursors of the pages seen so far make "Previous" work
+        filters = {"source_city": source_q, "dest_city": dest_q, "min_flights": int(min_flights), "page_size": limit}
+        if st.session_state.get("city_pair_filters") != filters:
+            st.session_state["city_pair_filters"] = filters
+            st.session_state["city_pair_cursors"] = [None]
+        cursors = st.session_state["city_pair_cursors"]
+        params = {k: v for k, v in filters.items() if v}
+        if cursors[-1]:
+            params["cursor"] = cursors[-1]
+        data2, headers2 = api_get_with_headers(api_base, "/routes/top-city-pairs", params)
         df2 = pd.DataFrame(data2)
-        if source_q:
-            df2 = df2[df2["source_city"].str.contains(source_q, case=False, na=False)]
-        if dest_q:
-            df2 = df2[df2["dest_city"].str.contains(dest_q, case=False, na=False)]
-        if min_flights:
-            df2 = df2[df2["flights"] >= int(min_flights)]
-        df2 = df2.head(limit)
+        next_cursor = headers2.get("X-Next-Cursor")
+        st.caption(f"Page {len(cursors)} · {data_age_caption(headers2)}")
         st.dataframe(df2, use_container_width=True)
+        colp1, colp2, _ = st.columns([1, 1, 6])
+        with colp1:
+            if st.button("Previous", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with colp2:
+            if st.button("Next", disabled=not next_cursor):
+                cursors.append(next_cursor)
+                st.rerun()
         if not df2.empty:
             fig2 = px.bar(
                 df2.head(30),
@@ -4,7 +4,7 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from frontend.utils.helpers import api_get, apply_global_theme, render_navbar, render_footer, inject_nav_js
+from frontend.utils.helpers import api_get_with_headers, apply_global_theme, data_age_caption, render_navbar, render_footer, inject_nav_js
 
 render_navbar(active="hubs")
 inject_nav_js()
@@ -29,8 +29,12 @@ with tab_busiest:
     col1, col2 = st.columns([2, 1])
     with col2:
         limit = st.slider("How many hubs?", 5, 50, 20, key="hubs_limit")
+        with_criticality = st.checkbox("Show betweenness (criticality)", value=False, key="hubs_criticality")
     try:
-        df = pd.DataFrame(api_get(api_base, "/hubs/busiest", {"limit": limit}))
+        params = {"limit": limit, "include": "criticality"} if with_criticality else {"limit": limit}
+        data, headers = api_get_with_headers(api_base, "/hubs/busiest", params)
+        df = pd.DataFrame(data)
+        st.caption(data_age_caption(headers))
         st.dataframe(df, use_container_width=True)
         if not df.empty:
             fig = px.bar(df, x="name", y="degree", color="country", title="Busiest Hubs")
@@ -44,7 +48,9 @@ with tab_delay:
     with col2:
         limit2 = st.slider("How many entries?", 5, 100, 50, key="load_limit")
     try:
-        df2 = pd.DataFrame(api_get(api_base, "/hubs/load-delay", {"limit": limit2}))
+        data2, headers2 = api_get_with_headers(api_base, "/hubs/load-delay", {"limit": limit2})
+        df2 = pd.DataFrame(data2)
+        st.caption(data_age_caption(headers2))
         st.dataframe(df2, use_container_width=True)
         if not df2.empty:
             fig2 = px.scatter(
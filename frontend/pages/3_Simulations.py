@@ -14,7 +14,8 @@ api_base = st.session_state.get("api_base", os.getenv("AIRROUTEIQ_API", "http://
 col_a, col_b = st.columns([2, 1])
 with col_b:
     airport_id = st.number_input("Airport ID to close", min_value=1, value=507)
-    top_k = st.slider("Alternate routes (Top K)", 5, 50, 20)
+    top_k = st.slider("Re-routings per disrupted pair", 1, 10, 3)
+    limit_pairs = st.slider("Disrupted pairs (busiest first)", 10, 1000, 200)
     run = st.button("Run Simulation")
 
 with col_a:
@@ -25,15 +26,12 @@ with col_a:
 
     if run:
         try:
-            impacted = pd.DataFrame(api_get(api_base, "/simulate/closure", {"airport_id": airport_id}))
-            st.session_state['impacted_df'] = impacted
+            # One round trip; the API computes the closure and the re-routings concurrently
+            result = api_get(api_base, "/simulate/closure-alternates", {"airport_id": airport_id, "top_k": int(top_k), "limit": int(limit_pairs)})
+            st.session_state['impacted_df'] = pd.DataFrame(result['routes'])
+            st.session_state['alternates_df'] = pd.DataFrame(result['alternates'])
         except Exception as e:
             st.error(f"Failed to simulate closure: {e}")
-        try:
-            alternates = pd.DataFrame(api_get(api_base, "/simulate/alternates", {"airport_id": airport_id, "top_k": int(top_k)}))
-            st.session_state['alternates_df'] = alternates
-        except Exception as e:
-            st.error(f"Failed to fetch alternates: {e}")
 
     st.subheader("Impacted Routes")
     st.dataframe(st.session_state['impacted_df'], use_container_width=True)
@@ -56,5 +54,58 @@ st.download_button(
     disabled=st.session_state['alternates_df'].empty,
 )
 
+st.subheader("Carrier Grounding")
+gr_a, gr_b = st.columns([2, 1])
+with gr_b:
+    airline_ids = st.text_input("Airline IDs to ground (comma separated)", value="24")
+    run_grounding = st.button("Ground Carriers")
+
+with gr_a:
+    if run_grounding:
+        try:
+            st.session_state['grounding'] = api_get(api_base, "/simulate/grounding", {"airline_ids": airline_ids})
+        except Exception as e:
+            st.error(f"Failed to simulate grounding: {e}")
+    grounding = st.session_state.get('grounding')
+    if grounding:
+        summary = grounding['summary']
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Grounded routes", summary['grounded_routes'])
+        m2.metric("Affected pairs", summary['affected_pairs'])
+        m3.metric("Stranded pairs", summary['stranded_pairs'])
+        m4.metric("Stranded passengers", f"{summary['stranded_passengers']:,.0f}")
+        st.caption("Carriers able to absorb affected pairs")
+        st.dataframe(pd.DataFrame(grounding['absorbing_carriers']).head(20), use_container_width=True)
+        st.caption("Affected pairs (busiest first)")
+        st.dataframe(pd.DataFrame(grounding['pairs']), use_container_width=True)
+
+st.subheader("Monte Carlo Disruptions")
+st.caption("Routes or airports fail at random with their delay-risk score as probability; airports that lose enough routes close in turn.")
+mc_a, mc_b = st.columns([2, 1])
+with mc_b:
+    trials = st.number_input("Trials", min_value=100, max_value=5000, value=2000, step=500)
+    level = st.selectbox("Failing unit", ["route", "airport"])
+    risk = st.selectbox("Risk score", ["overall", "weather", "congestion", "infra"])
+    cascade_share = st.slider("Airport closes when this share of its routes fail", 0.1, 1.0, 0.5)
+    seed = st.number_input("Seed", min_value=0, value=42)
+    run_mc = st.button("Run Monte Carlo")
+
+with mc_a:
+    if run_mc:
+        try:
+            st.session_state['monte_carlo'] = api_get(api_base, "/simulate/monte-carlo", {
+                "trials": int(trials), "level": level, "risk": risk,
+                "cascade_share": float(cascade_share), "seed": int(seed),
+            })
+        except Exception as e:
+            st.error(f"Failed to run Monte Carlo simulation: {e}")
+    mc = st.session_state.get('monte_carlo')
+    if mc:
+        st.caption(f"{mc['trials_per_second']:.0f} trials/s, seed {mc['seed']}")
+        st.dataframe(pd.DataFrame(mc['summary']).T, use_container_width=True)
+        metric = st.selectbox("Distribution", list(mc['histograms']))
+        hist = mc['histograms'][metric]
+        st.bar_chart(pd.DataFrame({"trials": hist['counts']}, index=[round(e, 1) for e in hist['edges'][:-1]]))
+
 st.write("")
 render_footer()
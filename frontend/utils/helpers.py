@@ -1,17 +1,64 @@
 from __future__ import annotations
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
 import os
+import threading
 import requests
 import streamlit as st
 import streamlit.components.v1 as components
 
 
-def api_get(base_url: str, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+# Last payload per URL and its ETag, revalidated with If-None-Match (the API answers 304
+# until its data changes); shared across Streamlit reruns and sessions
+_ETAG_CACHE_SIZE = 256
+_etag_cache: "OrderedDict[str, Tuple[str, Any, Dict[str, str]]]" = OrderedDict()
+_etag_lock = threading.Lock()
+
+
+def _conditional_get(base_url: str, path: str, params: Optional[Dict[str, Any]]) -> Tuple[Any, Dict[str, str]]:
     url = base_url.rstrip("/") + path
-    resp = requests.get(url, params=params or {}, timeout=30)
+    key = requests.Request("GET", url, params=params or {}).prepare().url
+    with _etag_lock:
+        cached = _etag_cache.get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    resp = requests.get(url, params=params or {}, headers=headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        # Freshness headers of the 304 are current; the body is the cached one
+        return cached[1], {**cached[2], **dict(resp.headers)}
     resp.raise_for_status()
-    return resp.json()
+    payload = resp.json()
+    etag = resp.headers.get("ETag")
+    if etag:
+        with _etag_lock:
+            _etag_cache[key] = (etag, payload, dict(resp.headers))
+            _etag_cache.move_to_end(key)
+            while len(_etag_cache) > _ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+    return payload, dict(resp.headers)
+
+
+def api_get(base_url: str, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    return _conditional_get(base_url, path, params)[0]
+
+
+def api_get_with_headers(base_url: str, path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Any, Dict[str, str]]:
+    """Like api_get, also returning the response headers (e.g. X-Data-Age-Seconds)."""
+    return _conditional_get(base_url, path, params)
+
+
+def data_age_caption(headers: Dict[str, str]) -> str:
+    """Human-readable freshness of a response tagged by the API's X-Data-* headers."""
+    if headers.get("X-Data-Source") != "materialized":
+        return "Live data"
+    age = int(float(headers.get("X-Data-Age-Seconds", 0)))
+    if age < 120:
+        ago = f"{age} s"
+    elif age < 7200:
+        ago = f"{age // 60} min"
+    else:
+        ago = f"{age // 3600} h"
+    return f"Summary data refreshed {ago} ago ({headers.get('X-Data-Refreshed-At', 'unknown')})"
 
 
 def apply_global_theme() -> None:
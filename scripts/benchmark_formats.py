@@ -0,0 +1,51 @@
+from __future__ import annotations
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from backend.columnar import benchmark_formats
+
+
+def closure_routes_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic frame shaped like airport_closure_routes (IDs, airport names, passengers)."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Airport {i} International" for i in range(8000)], dtype=object)
+    return pd.DataFrame({
+        "airport_id": rng.integers(1, 14000, rows),
+        "route_id": np.arange(1, rows + 1),
+        "src_airport": names[rng.integers(0, names.size, rows)],
+        "dst_airport": names[rng.integers(0, names.size, rows)],
+        "est_passengers": rng.gamma(2.0, 5000.0, rows),
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare JSON records with Arrow IPC and Parquet serialization")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000, 500000], help="Synthetic frame sizes")
+    parser.add_argument("--source", choices=("synthetic", "closure-routes", "delay-risks"), default="synthetic",
+                        help="Benchmark a synthetic frame or a full table from MariaDB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.source == "synthetic":
+        frames = [(f"{rows} rows", closure_routes_frame(rows)) for rows in args.rows]
+    else:
+        from backend.analytics.dashboard_queries import iter_delay_risks
+        from backend.config.db_config import iter_df_chunks
+
+        chunks = iter_delay_risks() if args.source == "delay-risks" else iter_df_chunks(
+            "SELECT airport_id, route_id, src_airport, dst_airport, est_passengers FROM airport_closure_routes"
+        )
+        df = pd.concat(list(chunks), ignore_index=True)
+        frames = [(f"{args.source} ({len(df)} rows)", df)]
+
+    for label, df in frames:
+        print(label)
+        print(benchmark_formats(df, repeat=args.repeat).to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
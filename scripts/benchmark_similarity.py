@@ -0,0 +1,34 @@
+from __future__ import annotations
+import argparse
+
+from backend.vector_engine.ann_index import recall_report
+from backend.vector_engine.quantization import quantization_report
+from backend.vector_engine.similarity_search import SEARCH_BACKENDS, benchmark_backends
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare similarity search backends against the exact scan")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled query routes")
+    parser.add_argument("--top-k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="IVF probes to try")
+    parser.add_argument(
+        "--backends", nargs="+", default=list(SEARCH_BACKENDS), choices=SEARCH_BACKENDS,
+        help="Backends to time end to end (mariadb falls back to exact when unsupported)",
+    )
+    parser.add_argument("--quantization", action="store_true", help="Also report float16/int8 recall and memory")
+    args = parser.parse_args()
+
+    print("IVF recall vs exact:")
+    print(recall_report(sample_size=args.queries, top_k=args.top_k, nprobes=args.nprobe).to_string(index=False))
+    print()
+    print("End-to-end latency per backend:")
+    print(benchmark_backends(sample_size=args.queries, top_k=args.top_k, backends=args.backends).to_string(index=False))
+    if args.quantization:
+        print()
+        print("Quantized storage recall vs float32:")
+        print(quantization_report(sample_size=args.queries, top_k=args.top_k).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
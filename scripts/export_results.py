@@ -1,22 +1,52 @@
 from __future__ import annotations
 import argparse
 from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
 
 from backend.analytics.hub_analysis import busiest_hubs, hub_load_and_delay
-from backend.analytics.dashboard_queries import busiest_routes, delay_risk_overview
+from backend.analytics.dashboard_queries import busiest_routes, delay_risk_overview, iter_delay_risks
+from backend.columnar import COLUMNAR_FORMATS, write_columnar
+
+EXPORT_FORMATS = ("csv", *COLUMNAR_FORMATS)
+
+
+def write_csv_chunks(chunks: Iterable[pd.DataFrame], path: Path) -> int:
+    """Append chunks to one CSV (header once); returns rows written."""
+    rows = 0
+    with path.open("w", encoding="utf-8", newline="") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=rows == 0)
+            rows += len(chunk)
+    return rows
+
+
+def write_chunks(chunks: Iterable[pd.DataFrame], out: Path, name: str, fmt: str) -> int:
+    """Write `name`.csv / .arrow / .parquet under `out`; returns rows written."""
+    path = out / f"{name}.{fmt}"
+    if fmt == "csv":
+        return write_csv_chunks(chunks, path)
+    return write_columnar(chunks, path, fmt)
 
 
 def main() -> int:
-    parser = argparse.ArgumentParser(description="Export analytics to CSV")
+    parser = argparse.ArgumentParser(description="Export analytics to CSV, Arrow IPC or Parquet")
     parser.add_argument("--out", type=Path, default=Path("exports"), help="Output directory")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="File format")
+    parser.add_argument("--full", action="store_true", help="Also stream the full delay-risk listing")
     args = parser.parse_args()
 
     args.out.mkdir(parents=True, exist_ok=True)
 
-    busiest_hubs().to_csv(args.out / "busiest_hubs.csv", index=False)
-    hub_load_and_delay().to_csv(args.out / "hub_load_delay.csv", index=False)
-    busiest_routes().to_csv(args.out / "busiest_routes.csv", index=False)
-    delay_risk_overview().to_csv(args.out / "delay_risk_overview.csv", index=False)
+    write_chunks([busiest_hubs()], args.out, "busiest_hubs", args.format)
+    write_chunks([hub_load_and_delay()], args.out, "hub_load_delay", args.format)
+    write_chunks([busiest_routes()], args.out, "busiest_routes", args.format)
+    write_chunks([delay_risk_overview()], args.out, "delay_risk_overview", args.format)
+
+    if args.full:
+        rows = write_chunks(iter_delay_risks(), args.out, "delay_risks_full", args.format)
+        print(f"Streamed {rows} delay-risk rows")
 
     print(f"Exports written to {args.out}")
     return 0
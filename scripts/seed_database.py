@@ -2,14 +2,17 @@ from __future__ import annotations
 import argparse
 import sys
 
+from backend.analytics.closure_impact import refresh_closure_impact
+from backend.analytics.connectivity_index import refresh_connectivity_index
+from backend.analytics.hub_summaries import refresh_hub_summaries
 from backend.config.db_config import run_sql_file
 from backend.config.settings import SCRIPTS_DIR
 from backend.data_ingestion.load_airports import load_airports
 from backend.data_ingestion.load_airlines import load_airlines
 from backend.data_ingestion.load_routes import load_routes
 from backend.data_ingestion.generate_synthetic_descriptions import (
-    build_route_descriptions,
-    upsert_descriptions,
+    embed_description_chunks,
+    iter_route_descriptions,
 )
 from backend.vector_engine.embed_routes import embed_all
 
@@ -20,6 +23,9 @@ def main() -> int:
     parser.add_argument("--load", action="store_true", help="Load airports, airlines, routes")
     parser.add_argument("--describe", action="store_true", help="Generate synthetic descriptions")
     parser.add_argument("--embed", action="store_true", help="Generate embeddings")
+    parser.add_argument("--connectivity", action="store_true", help="Refresh the closure connectivity index")
+    parser.add_argument("--closure-impact", action="store_true", help="Refresh the materialized closure-impact tables")
+    parser.add_argument("--hub-summaries", action="store_true", help="Rebuild the hub and city-pair summary tables")
     parser.add_argument("--all", action="store_true", help="Run all steps")
     args = parser.parse_args()
 
@@ -35,14 +41,27 @@ def main() -> int:
         load_routes()
         print("Routes loaded")
 
+    if args.hub_summaries and not (args.all or args.load):
+        # load_routes already rebuilds them
+        refresh_hub_summaries()
+        print("Hub summaries refreshed")
+
+    if args.all or args.connectivity:
+        stats = refresh_connectivity_index()
+        print(f"Connectivity index refreshed ({stats['mode']}, {stats['airports']} airports)")
+
+    if args.all or args.closure_impact:
+        stats = refresh_closure_impact()
+        print(f"Closure impact refreshed ({stats['recomputed']} airports recomputed, {stats['removed']} removed)")
+
     if args.all or args.describe:
-        df = build_route_descriptions()
-        upsert_descriptions(df)
-        print("Descriptions generated")
+        # Descriptions are stored together with their embedding; unchanged
+        # routes (same content hash and model) are skipped.
+        encoded = embed_description_chunks(iter_route_descriptions())
+        print(f"Descriptions generated ({encoded} new/changed routes embedded)")
 
     if args.all or args.embed:
-        embed_all()
-        print("Embeddings generated")
+        print(f"Embeddings generated ({embed_all()} changed routes re-embedded)")
 
     return 0
 
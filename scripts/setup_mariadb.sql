@@ -56,9 +56,22 @@ CREATE TABLE IF NOT EXISTS routes (
   dest_airport_id INT,
   codeshare VARCHAR(8),
   stops INT,
-  equipment VARCHAR(64)
+  equipment VARCHAR(64),
+  distance_km DOUBLE
 ) ENGINE=ColumnStore;
 
+-- Existing installs: great-circle distance computed at ingest (route_distances.py)
+ALTER TABLE routes
+  ADD COLUMN IF NOT EXISTS distance_km DOUBLE;
+
+-- Great-circle distance per directed airport pair, filled with the routes
+CREATE TABLE IF NOT EXISTS airport_pair_distances (
+  source_airport_id INT NOT NULL,
+  dest_airport_id INT NOT NULL,
+  distance_km DOUBLE,
+  PRIMARY KEY (source_airport_id, dest_airport_id)
+) ENGINE=InnoDB;
+
 -- Synthetic passenger stats (ColumnStore for analytics)
 CREATE TABLE IF NOT EXISTS passenger_stats (
   stat_id BIGINT PRIMARY KEY AUTO_INCREMENT,
@@ -81,15 +94,106 @@ CREATE TABLE IF NOT EXISTS delay_risks (
 ) ENGINE=ColumnStore;
 
 -- Vector table for route semantic descriptions
--- Requires MariaDB Vector (10.11+ with vector plugin), else fallback: store as TEXT and a FLOAT array columns
+-- Requires MariaDB Vector (11.7+), else fallback: store as TEXT and a FLOAT array columns.
+-- The VECTOR INDEX (embedding must be NOT NULL) lets
+-- ORDER BY VEC_DISTANCE_COSINE(embedding, ?) LIMIT k be answered from the index.
 CREATE TABLE IF NOT EXISTS route_embeddings (
   route_id BIGINT PRIMARY KEY,
   description TEXT,
-  embedding VECTOR(384)
+  embedding VECTOR(384) NOT NULL,
+  content_hash CHAR(40),
+  model_name VARCHAR(255),
+  embedding_q VARBINARY(1536),
+  updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+  VECTOR INDEX idx_route_embedding_vec (embedding) M=8 DISTANCE=cosine
 );
 
+-- Existing installs: change marker polled by the in-memory embedding index
+ALTER TABLE route_embeddings
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+-- Existing installs: description hash + model used for incremental re-embedding
+ALTER TABLE route_embeddings
+  ADD COLUMN IF NOT EXISTS content_hash CHAR(40),
+  ADD COLUMN IF NOT EXISTS model_name VARCHAR(255);
+
+-- Existing installs: compact float16 / int8 copy of embedding (EMBEDDING_QUANTIZATION);
+-- the VECTOR column stays float32 for server-side search and rescoring
+ALTER TABLE route_embeddings
+  ADD COLUMN IF NOT EXISTS embedding_q VARBINARY(1536);
+
+-- Precomputed closure impact per airport (backend/analytics/connectivity_index.py)
+CREATE TABLE IF NOT EXISTS airport_connectivity (
+  airport_id INT PRIMARY KEY,
+  is_articulation_point TINYINT NOT NULL DEFAULT 0,
+  bridge_count INT NOT NULL DEFAULT 0,
+  isolated_airports INT NOT NULL DEFAULT 0,
+  disrupted_pairs BIGINT NOT NULL DEFAULT 0,
+  detour_pairs BIGINT NOT NULL DEFAULT 0,
+  disconnected_pairs BIGINT NOT NULL DEFAULT 0,
+  network_version VARCHAR(64) NOT NULL,
+  computed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+) ENGINE=InnoDB;
+
+-- Materialized closure impact per airport (backend/analytics/closure_impact.py);
+-- routes_hash fingerprints the routes touching the airport for incremental refreshes
+CREATE TABLE IF NOT EXISTS airport_closure_impact (
+  airport_id INT,
+  impacted_routes INT,
+  est_passengers DOUBLE,
+  top_pairs TEXT,
+  routes_hash CHAR(16),
+  computed_at DATETIME(6)
+) ENGINE=ColumnStore;
+
+CREATE TABLE IF NOT EXISTS airport_closure_routes (
+  airport_id INT,
+  route_id BIGINT,
+  src_airport VARCHAR(255),
+  dst_airport VARCHAR(255),
+  est_passengers DOUBLE,
+  computed_at DATETIME(6)
+) ENGINE=ColumnStore;
+
+-- Materialized dashboard aggregates (backend/analytics/hub_summaries.py), rebuilt
+-- after route ingest and by the scheduled refresh
+CREATE TABLE IF NOT EXISTS hub_degree_summary (
+  airport_id INT,
+  name VARCHAR(255),
+  city VARCHAR(255),
+  country VARCHAR(255),
+  degree BIGINT,
+  computed_at DATETIME(6)
+) ENGINE=ColumnStore;
+
+CREATE TABLE IF NOT EXISTS city_pair_frequency (
+  source_city VARCHAR(255),
+  dest_city VARCHAR(255),
+  flights BIGINT,
+  computed_at DATETIME(6)
+) ENGINE=ColumnStore;
+
+CREATE TABLE IF NOT EXISTS hub_load_delay_summary (
+  airport_id INT,
+  name VARCHAR(255),
+  city VARCHAR(255),
+  country VARCHAR(255),
+  total_passengers DOUBLE,
+  avg_delay DOUBLE,
+  computed_at DATETIME(6)
+) ENGINE=ColumnStore;
+
+-- Change stamp of everything the API serves; bumped by the loaders and refresh jobs
+-- (backend/config/data_version.py) to retire cached responses
+CREATE TABLE IF NOT EXISTS data_version (
+  id TINYINT PRIMARY KEY,
+  version BIGINT NOT NULL,
+  updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+) ENGINE=InnoDB;
+
 -- Helpful indexes
 CREATE INDEX IF NOT EXISTS idx_routes_src ON routes (source_airport_id);
 CREATE INDEX IF NOT EXISTS idx_routes_dst ON routes (dest_airport_id);
 CREATE INDEX IF NOT EXISTS idx_passenger_route ON passenger_stats (route_id);
 CREATE INDEX IF NOT EXISTS idx_delay_route ON delay_risks (route_id);
+CREATE INDEX IF NOT EXISTS idx_route_embeddings_updated ON route_embeddings (updated_at);